@@ -0,0 +1,177 @@
+# alarm_engine.py
+# Threshold, rate-of-change and state-change alarms evaluated on every status/ sample.
+import json
+import os
+import numpy as np
+from status_schema import NUMERIC_INDEX, FIELDS_BY_NAME
+
+ALARM_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alarm_rules.json")
+
+# Rule dictionaries, also the format of alarm_rules.json (a list of these):
+#   threshold: {"name", "kind": "threshold", "field", "above": bool, "limit" | "limit_field" (+ "scale"),
+#               "abs", "hysteresis", "debounce", "severity", "message"}
+#   rate:      same as threshold, but compares the field's change per second
+#   state:     {"name", "kind": "state", "field", "bad_values": [...], "severity", "message"}
+#              raises while the field is in bad_values; with no bad_values, every change is reported once
+DEFAULT_RULES = [
+    {"name": "cpu_temp_high", "kind": "threshold", "field": "cpu_temp", "above": True, "limit": 75.0,
+     "hysteresis": 5.0, "debounce": 3, "severity": "WARN", "message": "CPU temperature high"},
+    {"name": "cpu_temp_critical", "kind": "threshold", "field": "cpu_temp", "above": True, "limit": 85.0,
+     "hysteresis": 5.0, "debounce": 3, "severity": "ERROR", "message": "CPU temperature critical"},
+    {"name": "internal_temp_high", "kind": "threshold", "field": "internal_temperature", "above": True, "limit": 50.0,
+     "hysteresis": 3.0, "debounce": 5, "severity": "WARN", "message": "Internal temperature high"},
+    {"name": "internal_temp_rising", "kind": "rate", "field": "internal_temperature", "above": True, "limit": 0.5,
+     "hysteresis": 0.2, "debounce": 10, "severity": "WARN", "message": "Internal temperature rising fast"},
+    {"name": "ram_high", "kind": "threshold", "field": "ram_used_mb", "above": True, "limit_field": "ram_total_mb",
+     "scale": 0.9, "hysteresis": 20.0, "debounce": 5, "severity": "WARN", "message": "RAM usage above 90%"},
+    *({"name": f"thrust_saturation_{motor}", "kind": "threshold", "field": f"motor_thrust_{motor}", "abs": True,
+       "above": True, "limit_field": "motor_thrust_max_z" if motor.startswith("UP") else "motor_thrust_max_xy",
+       "scale": 0.98, "hysteresis": 0.05, "debounce": 5, "severity": "WARN", "message": f"Motor {motor} thrust saturated"}
+      for motor in ("FDX", "FSX", "RDX", "RSX", "UPFDX", "UPFSX", "UPRDX", "UPRSX")),
+    {"name": "bar_state_change", "kind": "state", "field": "bar_state", "severity": "WARN",
+     "message": "Barometer state changed"},
+    {"name": "imu_state_change", "kind": "state", "field": "imu_state", "severity": "WARN",
+     "message": "IMU state changed"},
+    {"name": "armed_change", "kind": "state", "field": "rov_armed", "severity": "INFO",
+     "message": "ROV armed state changed"},
+]
+
+SEVERITY_ORDER = {"INFO": 0, "WARN": 1, "ERROR": 2}
+
+
+def load_alarm_rules(path=ALARM_RULES_FILE):
+    """Rules from alarm_rules.json if present, otherwise DEFAULT_RULES"""
+    if not os.path.exists(path):
+        return DEFAULT_RULES
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read alarm rules from {path}, using defaults: {e}")
+        return DEFAULT_RULES
+
+
+class AlarmEvent:
+    """An alarm being raised or cleared (raised=False)"""
+    __slots__ = ("name", "severity", "message", "raised", "value")
+
+    def __init__(self, name, severity, message, raised, value=None):
+        self.name = name
+        self.severity = severity
+        self.message = message
+        self.raised = raised
+        self.value = value
+
+    def __str__(self):
+        state = "RAISED" if self.raised else "CLEARED"
+        value = "" if self.value is None else f" ({self.value})"
+        return f"[ALARM {state}] {self.message}{value}"
+
+
+class AlarmEngine:
+    """Evaluates alarm rules on status samples.
+
+    Threshold and rate rules are compiled into parallel NumPy arrays so every
+    sample is checked with a handful of vectorized operations, whatever the
+    number of rules. A rule raises after `debounce` consecutive violating
+    samples and clears once the value is back past limit -/+ hysteresis.
+    """
+    def __init__(self, rules):
+        numeric = [rule for rule in rules if rule.get("kind", "threshold") in ("threshold", "rate")]
+        self.state_rules = [rule for rule in rules if rule.get("kind") == "state"]
+        for rule in numeric + self.state_rules:
+            if rule["field"] not in FIELDS_BY_NAME:
+                raise ValueError(f"Alarm rule {rule['name']}: unknown status field {rule['field']}")
+
+        self.rules = numeric
+        self.columns = np.array([NUMERIC_INDEX[rule["field"]] for rule in numeric], dtype=int)
+        self.is_rate = np.array([rule.get("kind", "threshold") == "rate" for rule in numeric], dtype=bool)
+        self.any_rate = bool(self.is_rate.any())
+        self.use_abs = np.array([rule.get("abs", False) for rule in numeric], dtype=bool)
+        self.sign = np.array([1.0 if rule.get("above", True) else -1.0 for rule in numeric])
+        self.limit = np.array([rule.get("limit", 0.0) for rule in numeric], dtype=float)
+        self.limit_columns = np.array([NUMERIC_INDEX[rule["limit_field"]] if "limit_field" in rule else 0
+                                       for rule in numeric], dtype=int)
+        self.has_limit_field = np.array(["limit_field" in rule for rule in numeric], dtype=bool)
+        self.scale = np.array([rule.get("scale", 1.0) for rule in numeric], dtype=float)
+        self.hysteresis = np.array([rule.get("hysteresis", 0.0) for rule in numeric], dtype=float)
+        self.debounce = np.array([rule.get("debounce", 1) for rule in numeric], dtype=int)
+
+        self.violations = np.zeros(len(numeric), dtype=int)  # Consecutive violating samples
+        self.active = np.zeros(len(numeric), dtype=bool)
+        self.previous_row = None
+        self.previous_time = None
+        self.previous_states = {}
+        self.active_states = set()
+
+    def active_alarms(self):
+        """(name, severity, message) of every alarm currently raised"""
+        alarms = [(self.rules[i]["name"], self.rules[i].get("severity", "WARN"), self.rules[i]["message"])
+                  for i in np.flatnonzero(self.active)]
+        alarms += [(rule["name"], rule.get("severity", "WARN"), rule["message"])
+                   for rule in self.state_rules if rule["name"] in self.active_states]
+        return alarms
+
+    def process(self, row, record, sample_time):
+        """Check one sample: row from status_schema.extract_row, record from extract_record,
+        sample_time in seconds. Returns the list of AlarmEvents it caused."""
+        row = np.asarray(row, dtype=float)
+        events = []
+        if len(self.rules):
+            events.extend(self._process_numeric(row, sample_time))
+        events.extend(self._process_states(record))
+        self.previous_row = row
+        self.previous_time = sample_time
+        return events
+
+    def _process_numeric(self, row, sample_time):
+        values = row[self.columns]
+        if self.any_rate:
+            if self.previous_row is None or sample_time <= self.previous_time:
+                rates = np.zeros(len(values))
+            else:
+                rates = (values - self.previous_row[self.columns]) / (sample_time - self.previous_time)
+            values = np.where(self.is_rate, rates, values)
+        values = np.where(self.use_abs, np.abs(values), values)
+        reference = row[self.limit_columns]
+        # A limit field that isn't reported (<= 0) disables the rule: NaN never compares true
+        limits = np.where(self.has_limit_field, np.where(reference > 0, reference * self.scale, np.nan), self.limit)
+
+        margin = self.sign * (values - limits)  # > 0 means the rule is violated
+        violating = margin > 0
+        self.violations = np.where(violating, self.violations + 1, 0)
+        raise_now = ~self.active & (self.violations >= self.debounce)
+        # A value or limit that stops being reported (NaN) clears the alarm rather than latching it
+        clear_now = self.active & ((margin < -self.hysteresis) | np.isnan(margin))
+        if not (raise_now.any() or clear_now.any()):
+            return []
+        self.active = (self.active | raise_now) & ~clear_now
+
+        events = []
+        for i in np.flatnonzero(raise_now | clear_now):
+            rule = self.rules[i]
+            events.append(AlarmEvent(rule["name"], rule.get("severity", "WARN"), rule["message"],
+                                     bool(raise_now[i]), f"{values[i]:.3g}, limit {limits[i]:.3g}"))
+        return events
+
+    def _process_states(self, record):
+        events = []
+        for rule in self.state_rules:
+            name = rule["name"]
+            value = getattr(record, rule["field"])
+            bad_values = rule.get("bad_values")
+            if bad_values:
+                bad = value in bad_values
+                if bad != (name in self.active_states):
+                    if bad:
+                        self.active_states.add(name)
+                    else:
+                        self.active_states.discard(name)
+                    events.append(AlarmEvent(name, rule.get("severity", "WARN"), rule["message"], bad, value))
+            else:
+                previous = self.previous_states.get(name)
+                if previous is not None and value != previous:
+                    events.append(AlarmEvent(name, rule.get("severity", "INFO"), rule["message"], True,
+                                             f"{previous} -> {value}"))
+                self.previous_states[name] = value
+        return events
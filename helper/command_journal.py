@@ -0,0 +1,181 @@
+# command_journal.py
+# Journal of outbound commands, confirmed against the state changes they cause in later
+# status/ messages, with command-to-effect latency statistics.
+import collections
+import math
+import threading
+import time
+from status_schema import FIELDS_BY_NAME
+
+JOURNAL_SIZE = 500  # Entries kept; older ones drop out of the list and the statistics
+CONFIRM_TIMEOUT_S = 3.0  # A command whose effect isn't seen within this time is flagged
+REFERENCE_TOLERANCE = 1e-3  # How close reference_z must get to a DEPTH_REFERENCE_UPDATE value
+# Latency histogram bins (ms) for the distribution column
+LATENCY_BINS_MS = (0, 50, 100, 200, 500, 1000, 2000, math.inf)
+HISTOGRAM_BARS = " ▁▂▃▄▅▆▇█"
+
+CHANGED = "changed"  # Confirmed when any of the fields differs from its value at send time
+EQUALS = "equals"  # Confirmed when the field reaches the value sent with the command
+
+# Command key -> (status fields that show its effect, rule). Commands not listed
+# (e.g. the arm commands, which have no status field) are journaled without confirmation.
+CONFIRMATIONS = {
+    "ARM_ROV": (("rov_armed",), CHANGED),
+    "WORK_MODE": (("work_mode",), CHANGED),
+    "VERTICAL_MODE_TOGGLE": (("work_mode",), CHANGED),
+    "CHANGE_CONTROLLER_STATUS": (("controller_state_depth", "controller_state_pitch", "controller_state_roll"), CHANGED),
+    "CHANGE_DEPTH_STATUS": (("controller_state_depth",), CHANGED),
+    "CHANGE_PITCH_STATUS": (("controller_state_pitch",), CHANGED),
+    "CHANGE_ROLL_STATUS": (("controller_state_roll",), CHANGED),
+    "DEPTH_REFERENCE_UPDATE": (("reference_z",), EQUALS),
+}
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+UNCONFIRMED = "unconfirmed"
+UNVERIFIABLE = "unverifiable"  # No rule, or no status to compare with
+
+
+def status_value(message, field_name):
+    """Raw value of a status field (by schema name), or None"""
+    path = FIELDS_BY_NAME[field_name].path
+    value = message.get(path[0])
+    if len(path) == 2:
+        value = value.get(path[1]) if isinstance(value, dict) else None
+    return value
+
+
+class JournalEntry:
+    __slots__ = ("seq", "sent_at", "topic", "command", "value", "fields", "rule", "baseline", "outcome", "latency")
+
+    def __init__(self, seq, sent_at, topic, command, value):
+        self.seq = seq
+        self.sent_at = sent_at
+        self.topic = topic
+        self.command = command
+        self.value = value
+        self.fields = ()
+        self.rule = None
+        self.baseline = None
+        self.outcome = UNVERIFIABLE
+        self.latency = None  # Seconds from send to the confirming status/ message
+
+
+class CommandJournal:
+    """Thread-safe: record() runs on the Tk thread, on_status() on the MQTT thread.
+    version increases with every change, so views can skip redrawing when nothing happened."""
+    def __init__(self, size=JOURNAL_SIZE, timeout=CONFIRM_TIMEOUT_S):
+        self.entries = collections.deque(maxlen=size)
+        self.pending = []
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.version = 0
+
+    def record(self, topic, payload, last_status=None):
+        """Journal every command key of an outbound payload; last_status is the status/ message
+        current at send time (the baseline for toggles). Returns the new entries."""
+        sent_at = time.time()
+        new_entries = []
+        with self.lock:
+            for command, value in payload.items():
+                self.seq += 1
+                entry = JournalEntry(self.seq, sent_at, topic, command, value)
+                confirmation = CONFIRMATIONS.get(command)
+                if confirmation is not None and (last_status is not None or confirmation[1] == EQUALS):
+                    entry.fields, entry.rule = confirmation
+                    if entry.rule == CHANGED:
+                        entry.baseline = tuple(status_value(last_status, name) for name in entry.fields)
+                    entry.outcome = PENDING
+                    self.pending.append(entry)
+                self.entries.append(entry)
+                new_entries.append(entry)
+            self.version += 1
+        return new_entries
+
+    def _confirms(self, entry, message):
+        values = tuple(status_value(message, name) for name in entry.fields)
+        if entry.rule == CHANGED:
+            return any(value is not None and value != base for value, base in zip(values, entry.baseline))
+        try:
+            return abs(float(values[0]) - float(entry.value)) <= REFERENCE_TOLERANCE
+        except (TypeError, ValueError):
+            return False
+
+    def on_status(self, message, arrival):
+        """Confirm pending commands whose effect shows in this status/ message"""
+        if not isinstance(message, dict):
+            return
+        with self.lock:
+            if not self.pending:
+                return
+            still_pending = []
+            for entry in self.pending:
+                if self._confirms(entry, message):
+                    entry.outcome = CONFIRMED
+                    entry.latency = arrival - entry.sent_at
+                elif arrival - entry.sent_at > self.timeout:
+                    entry.outcome = UNCONFIRMED
+                else:
+                    still_pending.append(entry)
+            if len(still_pending) != len(self.pending):
+                self.version += 1
+            self.pending = still_pending
+
+    def expire(self, now=None):
+        """Flag pending commands past the timeout (also when no status/ arrives at all)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            expired = [entry for entry in self.pending if now - entry.sent_at > self.timeout]
+            if expired:
+                for entry in expired:
+                    entry.outcome = UNCONFIRMED
+                self.pending = [entry for entry in self.pending if entry.outcome == PENDING]
+                self.version += 1
+
+    def recent(self, n):
+        """The last n entries, newest first"""
+        with self.lock:
+            return list(self.entries)[:-n - 1:-1]
+
+    def stats(self):
+        """Per command: counts by outcome and latency percentiles (ms) with a histogram string"""
+        with self.lock:
+            entries = list(self.entries)
+        by_command = collections.defaultdict(list)
+        for entry in entries:
+            by_command[entry.command].append(entry)
+        stats = {}
+        for command, group in by_command.items():
+            latencies = sorted(entry.latency * 1000 for entry in group if entry.outcome == CONFIRMED)
+            counts = collections.Counter(entry.outcome for entry in group)
+            stats[command] = {
+                "sent": len(group),
+                CONFIRMED: counts[CONFIRMED],
+                UNCONFIRMED: counts[UNCONFIRMED],
+                PENDING: counts[PENDING],
+                UNVERIFIABLE: counts[UNVERIFIABLE],
+                "p50_ms": _percentile(latencies, 0.5),
+                "p95_ms": _percentile(latencies, 0.95),
+                "max_ms": latencies[-1] if latencies else math.nan,
+                "histogram": _histogram(latencies),
+            }
+        return stats
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else math.nan
+
+
+def _histogram(latencies_ms):
+    """One bar per LATENCY_BINS_MS interval, scaled to the fullest bin"""
+    if not latencies_ms:
+        return ""
+    counts = [0] * (len(LATENCY_BINS_MS) - 1)
+    for latency in latencies_ms:
+        for i in range(len(counts)):
+            if latency < LATENCY_BINS_MS[i + 1]:
+                counts[i] += 1
+                break
+    top = max(counts)
+    return "".join(HISTOGRAM_BARS[math.ceil(count / top * (len(HISTOGRAM_BARS) - 1))] for count in counts)
@@ -0,0 +1,212 @@
+# config_history.py
+# Content-addressed store of every configuration sent to or received from a vehicle,
+# with structural diffs and a history browser for the Config page.
+import collections
+import hashlib
+import json
+import os
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+from config_model import ConfigModel
+
+CONFIG_HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config_history")
+SNAPSHOT_CACHE_SIZE = 64  # Flattened snapshots kept in memory for diffing
+DIFF_VALUE_WIDTH = 60  # Characters of a value shown in the diff list
+
+
+def snapshot_hash(config):
+    """SHA-256 of the canonical JSON form (sorted keys), so key order doesn't create new snapshots"""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def diff_values(old, new):
+    """Structural diff of two flat {path: value} dicts: [(path, "added" | "removed" | "changed", old, new)]"""
+    changes = []
+    for path, value in old.items():
+        if path not in new:
+            changes.append((path, "removed", value, None))
+        elif new[path] != value:
+            changes.append((path, "changed", value, new[path]))
+    for path, value in new.items():
+        if path not in old:
+            changes.append((path, "added", None, value))
+    return changes
+
+
+class ConfigSnapshotStore:
+    """Snapshots stored once per content hash under objects/, plus one append-only index per vehicle.
+
+    The index lists (time, hash, source) and skips entries whose hash equals the
+    vehicle's previous one, so repeated identical configs cost nothing. Indexes
+    are read once and then kept in memory; flattened snapshots are cached for diffing.
+    """
+    def __init__(self, directory=CONFIG_HISTORY_DIR):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.indexes = {}  # Vehicle -> list of index entries, oldest first
+        self.flat_cache = collections.OrderedDict()  # Hash -> {path: value}, least recently used first
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def _index_path(self, vehicle):
+        return os.path.join(self.directory, f"index-{vehicle}.jsonl")
+
+    def entries(self, vehicle):
+        """Index entries {"time", "hash", "source"} of a vehicle, oldest first"""
+        if vehicle not in self.indexes:
+            entries = []
+            try:
+                with open(self._index_path(vehicle)) as f:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            pass  # A line cut short by a crash
+            except FileNotFoundError:
+                pass
+            self.indexes[vehicle] = entries
+        return self.indexes[vehicle]
+
+    def add(self, config, vehicle, source):
+        """Store a full configuration; returns its hash, or None if it equals the vehicle's latest snapshot"""
+        digest = snapshot_hash(config)
+        entries = self.entries(vehicle)
+        if entries and entries[-1]["hash"] == digest:
+            return None
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(config, f)
+            os.replace(temporary, path)  # Never leave a partial object under its hash
+        entry = {"time": time.time(), "hash": digest, "source": source}
+        with open(self._index_path(vehicle), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        entries.append(entry)
+        return digest
+
+    def load(self, digest):
+        """The nested configuration stored under a hash"""
+        with open(self._object_path(digest)) as f:
+            return json.load(f)
+
+    def flat(self, digest):
+        """{path: value} of a snapshot, cached"""
+        values = self.flat_cache.get(digest)
+        if values is None:
+            values = ConfigModel.from_nested(self.load(digest)).values
+            self.flat_cache[digest] = values
+            if len(self.flat_cache) > SNAPSHOT_CACHE_SIZE:
+                self.flat_cache.popitem(last=False)
+        else:
+            self.flat_cache.move_to_end(digest)
+        return values
+
+    def diff(self, old_digest, new_digest):
+        if old_digest == new_digest:
+            return []
+        return diff_values(self.flat(old_digest), self.flat(new_digest))
+
+
+class ConfigHistoryWindow(tk.Toplevel):
+    """Lists a vehicle's snapshots and diffs them.
+
+    With one snapshot selected the diff is against the one before it, with two
+    selected it is between them. on_rollback(config) is called with the newest
+    selected snapshot.
+    """
+    def __init__(self, parent, store, vehicle, on_rollback):
+        super().__init__(parent)
+        self.title(f"Configuration History - {vehicle}")
+        self.store = store
+        self.vehicle = vehicle
+        self.on_rollback = on_rollback
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(side="top", fill="x", padx=5, pady=5)
+        tk.Button(toolbar, text="Refresh", command=self.refresh).pack(side="left")
+        tk.Button(toolbar, text="Roll Back to Selected", command=self.rollback).pack(side="left", padx=5)
+        self.summary_var = tk.StringVar()
+        tk.Label(toolbar, textvariable=self.summary_var).pack(side="left", padx=10)
+
+        panes = ttk.PanedWindow(self, orient="vertical")
+        panes.pack(side="top", fill="both", expand=True, padx=5, pady=5)
+        self.snapshot_list = self._tree(panes, ("time", "source", "hash"), (160, 80, 120), "extended")
+        self.diff_list = self._tree(panes, ("path", "change", "old", "new"), (260, 70, 220, 220), "browse")
+        self.snapshot_list.bind("<<TreeviewSelect>>", lambda e: self.show_diff())
+        self.refresh()
+
+    def _tree(self, panes, columns, widths, selectmode):
+        frame = tk.Frame(panes)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode=selectmode, height=12)
+        for column, width in zip(columns, widths):
+            tree.heading(column, text=column.capitalize())
+            tree.column(column, width=width, stretch=column in ("path", "old", "new"))
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        panes.add(frame, weight=1)
+        return tree
+
+    def _row(self, entry):
+        return (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["time"])), entry["source"], entry["hash"][:12])
+
+    def refresh(self):
+        """Reload the snapshot list, newest first; item ids are index positions"""
+        self.snapshot_list.delete(*self.snapshot_list.get_children())
+        entries = self.store.entries(self.vehicle)
+        for i in range(len(entries) - 1, -1, -1):
+            self.snapshot_list.insert("", tk.END, iid=str(i), values=self._row(entries[i]))
+        self.summary_var.set(f"{len(entries)} snapshots")
+        self.diff_list.delete(*self.diff_list.get_children())
+
+    def add_latest(self):
+        """Show a snapshot just added to the store, keeping the current selection"""
+        entries = self.store.entries(self.vehicle)
+        self.snapshot_list.insert("", 0, iid=str(len(entries) - 1), values=self._row(entries[-1]))
+
+    def selected_positions(self):
+        return sorted(int(iid) for iid in self.snapshot_list.selection())
+
+    def show_diff(self):
+        positions = self.selected_positions()
+        self.diff_list.delete(*self.diff_list.get_children())
+        if not positions:
+            return
+        entries = self.store.entries(self.vehicle)
+        if len(positions) == 1:
+            if positions[0] == 0:
+                self.summary_var.set("First snapshot, nothing to compare with")
+                return
+            old, new = positions[0] - 1, positions[0]
+        else:
+            old, new = positions[0], positions[-1]
+        try:
+            changes = self.store.diff(entries[old]["hash"], entries[new]["hash"])
+        except (OSError, json.JSONDecodeError) as e:
+            self.summary_var.set(f"Can't read snapshot: {e}")
+            return
+        for path, change, old_value, new_value in changes:
+            self.diff_list.insert("", tk.END, values=(
+                ".".join(path), change,
+                "" if change == "added" else str(old_value)[:DIFF_VALUE_WIDTH],
+                "" if change == "removed" else str(new_value)[:DIFF_VALUE_WIDTH]))
+        self.summary_var.set(f"{len(changes)} difference(s) between {entries[old]['hash'][:12]} and {entries[new]['hash'][:12]}")
+
+    def rollback(self):
+        positions = self.selected_positions()
+        if not positions:
+            messagebox.showinfo("Roll Back", "Select the snapshot to roll back to.", parent=self)
+            return
+        entry = self.store.entries(self.vehicle)[positions[-1]]
+        try:
+            config = self.store.load(entry["hash"])
+        except (OSError, json.JSONDecodeError) as e:
+            messagebox.showerror("Roll Back", f"Can't read snapshot {entry['hash'][:12]}: {e}", parent=self)
+            return
+        self.on_rollback(config)
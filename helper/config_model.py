@@ -0,0 +1,179 @@
+# config_model.py
+# Oceanix configuration held as a flat index of typed leaves keyed by full path.
+import numpy as np
+
+# Separator for matching .mat variables to nested parameters by full path
+# (MATLAB names can't contain dots), e.g. DEPTH_CONTROLLER__Kp
+MAT_PATH_SEPARATOR = "__"
+
+
+def leaf_kind(value):
+    """Type tag of a configuration value"""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return "array"
+    return "str"
+
+
+def parse_text(kind, text):
+    """Convert text typed by the user to a value of the given kind; raises ValueError"""
+    text = text.strip()
+    if kind == "bool":
+        if text.lower() in ("true", "1"):
+            return True
+        if text.lower() in ("false", "0"):
+            return False
+        raise ValueError(f"expected true or false, got {text!r}")
+    if kind == "int":
+        return int(text)
+    if kind == "float":
+        return float(text)
+    if kind == "array":
+        raise ValueError("arrays can't be edited as text")
+    return text
+
+
+def to_plain(value):
+    """JSON-serializable form of a leaf value"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ConfigModel:
+    """Flat, path-indexed view of a nested configuration.
+
+    Leaves are stored in a dict keyed by the tuple of keys leading to them, so
+    get/set are O(1) and parameters with the same name in different sections
+    stay distinct. Sections and leaves are kept in document order so the nested
+    document can be rebuilt in the original key order.
+    """
+    def __init__(self):
+        self.values = {}  # Path tuple -> value, in document order
+        self.kinds = {}  # Path tuple -> leaf kind
+        self.order = []  # ("section" | "param", path) in document order
+        self.by_name = {}  # Leaf name -> [paths], for matching .mat variables
+        self.by_mat_name = {}  # Full path joined with MAT_PATH_SEPARATOR -> path
+
+    @classmethod
+    def from_nested(cls, config):
+        model = cls()
+        model._index(config, ())
+        return model
+
+    def _index(self, level, prefix):
+        for key, value in level.items():
+            path = prefix + (str(key),)
+            if isinstance(value, dict):
+                self.order.append(("section", path))
+                self._index(value, path)
+            else:
+                self.order.append(("param", path))
+                self.values[path] = value
+                self.kinds[path] = leaf_kind(value)
+                self.by_name.setdefault(path[-1], []).append(path)
+                self.by_mat_name[MAT_PATH_SEPARATOR.join(path)] = path
+
+    def __contains__(self, path):
+        return path in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, path, default=None):
+        return self.values.get(path, default)
+
+    def set(self, path, value):
+        """Replace an existing leaf; raises KeyError for unknown paths"""
+        if path not in self.values:
+            raise KeyError(path)
+        self.values[path] = value
+
+    def set_text(self, path, text):
+        """Set a leaf from user text, converted to the leaf's kind; returns True if the value changed"""
+        value = parse_text(self.kinds[path], text)
+        if self.values[path] == value and type(self.values[path]) is type(value):
+            return False
+        self.values[path] = value
+        return True
+
+    def rows(self):
+        """("section" | "param", path, value) in document order, for display"""
+        values = self.values
+        for kind, path in self.order:
+            yield (kind, path, values[path] if kind == "param" else None)
+
+    def update_from_mat(self, variables):
+        """Apply {name: value} from a .mat file in one pass.
+
+        A variable matches a parameter by full path (sections joined with
+        MAT_PATH_SEPARATOR) or by its leaf name when that name is unique.
+        Arrays are flattened (values may also come pre-flattened as lists). A value whose kind
+        doesn't fit the parameter (e.g. an array for a scalar) is rejected; the kind never changes.
+        Returns (updated paths, unknown names, ambiguous names, {rejected name: reason}).
+        """
+        updated, not_found, ambiguous, rejected = [], [], [], {}
+        for name, value in variables.items():
+            path = self.by_mat_name.get(name)
+            if path is None:
+                paths = self.by_name.get(name, ())
+                if len(paths) > 1:
+                    ambiguous.append(name)
+                    continue
+                if not paths:
+                    not_found.append(name)
+                    continue
+                path = paths[0]
+            if isinstance(value, np.ndarray):
+                value = value.flatten().tolist()
+            if isinstance(value, list):
+                if self.kinds[path] != "array" and len(value) == 1:
+                    value = value[0]  # MATLAB scalars load as 1x1 matrices
+            elif isinstance(value, np.generic):
+                value = value.item()
+            kind = self.kinds[path]
+            if kind == "int" and isinstance(value, float) and value.is_integer():
+                value = int(value)  # MATLAB stores integers as doubles
+            elif kind == "float" and leaf_kind(value) == "int":
+                value = float(value)
+            elif kind == "bool" and leaf_kind(value) in ("int", "float") and value in (0, 1):
+                value = bool(value)  # Logicals saved as doubles
+            if leaf_kind(value) != kind:
+                rejected[name] = f"expected {kind}, got {leaf_kind(value)}"
+                continue
+            self.values[path] = value
+            updated.append(path)
+        return updated, not_found, ambiguous, rejected
+
+    def changed_paths(self, values):
+        """Paths whose value differs from values (e.g. a snapshot of self.values), in document order"""
+        return [path for path, value in self.values.items() if path not in values or values[path] != value]
+
+    def to_patch(self, paths):
+        """Nested document holding only the given leaves, in the shape of the full config"""
+        patch = {}
+        for path in paths:
+            level = patch
+            for key in path[:-1]:
+                level = level.setdefault(key, {})
+            level[path[-1]] = to_plain(self.values[path])
+        return patch
+
+    def to_nested(self):
+        """Nested, JSON-serializable dict in the original key order"""
+        nested = {}
+        levels = {(): nested}
+        values = self.values
+        for kind, path in self.order:
+            if kind == "section":
+                levels[path] = levels[path[:-1]][path[-1]] = {}
+            else:
+                levels[path[:-1]][path[-1]] = to_plain(values[path])
+        return nested
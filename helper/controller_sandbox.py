@@ -0,0 +1,298 @@
+# controller_sandbox.py
+# Monte-Carlo preview of controller settings: runs the depth, pitch and roll loops on
+# thousands of perturbed plants at once (NumPy arrays over scenarios) and reports
+# stability margins and step-response statistics, for the running and the edited config.
+import math
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+import numpy as np
+from frame_scheduler import PRIORITY_LOW
+from system_identification import load_sections
+
+SCENARIOS = 2000
+MAX_SCENARIOS = 50000
+# Scenarios simulated at once: the step simulation holds several (chunk, steps) float arrays,
+# about 100 MB per axis at this size; larger runs go through in chunks
+SCENARIO_CHUNK = 2000
+SIM_DT = 0.01  # s
+STEP_DURATION_S = 15.0
+STEP_SIZE = {"z": 0.5, "pitch": 10.0, "roll": 10.0}  # Reference step per axis (m, deg)
+# Plant used when the config has no identified model (system_identification's observer section):
+# tau v' = -v + gain u + bias, input delay in s
+NOMINAL_PLANTS = {
+    "z": {"tau": 0.85, "gain": 0.024, "bias": -0.12, "delay": 0.02},
+    "pitch": {"tau": 0.4, "gain": 0.5, "bias": 0.0, "delay": 0.02},
+    "roll": {"tau": 0.4, "gain": 0.5, "bias": 0.0, "delay": 0.02},
+}
+DEFAULT_MAX_FORCE = {"z": 80.0, "pitch": 20.0, "roll": 20.0}
+# Spread of the scenarios: log-normal scale of tau and gain, extra delay, bias and noise
+PERTURBATION = {"tau": 0.3, "gain": 0.3, "extra_delay": 0.1, "bias": 0.5, "noise": {"z": 0.005, "pitch": 0.2, "roll": 0.2}}
+MARGIN_FREQUENCIES = np.logspace(-2, 3, 600)  # rad/s
+MIN_PHASE_MARGIN = 30.0  # deg; scenarios below are counted as poorly damped
+SETTLING_BAND = 0.02
+
+
+def controller_settings(values, axis, sections):
+    """PID gains, integral limit and force limit of an axis from flat {path: value}, or None if not configured"""
+    section = sections[axis]["controller"]
+    if (section, "Kp") not in values:
+        return None
+    max_force = values.get((section, "max_force"))
+    if max_force is None and sections[axis].get("max_force"):
+        max_force = values.get(tuple(sections[axis]["max_force"].split(".")))
+    return {
+        "kp": float(values.get((section, "Kp"), 0.0)),
+        "ki": float(values.get((section, "Ki"), 0.0)),
+        "kd": float(values.get((section, "Kd"), 0.0)),
+        "max_integral": float(values.get((section, "max_integral"), math.inf)),
+        "max_force": float(max_force or DEFAULT_MAX_FORCE[axis]),
+    }
+
+
+def plant_parameters(values, axis, sections):
+    """Identified plant from the axis' observer section where present, else NOMINAL_PLANTS"""
+    section = sections[axis]["observer"]
+    return {key: float(values.get((section, key), default)) for key, default in NOMINAL_PLANTS[axis].items()}
+
+
+def perturbed_plants(plant, n, rng):
+    """n scenarios around a plant; scenario 0 is the nominal plant"""
+    scenarios = {
+        "tau": plant["tau"] * np.exp(rng.normal(0, PERTURBATION["tau"], n)),
+        "gain": plant["gain"] * np.exp(rng.normal(0, PERTURBATION["gain"], n)),
+        "delay": plant["delay"] + rng.uniform(0, PERTURBATION["extra_delay"], n),
+        "bias": plant["bias"] * (1 + rng.normal(0, PERTURBATION["bias"], n)),
+    }
+    for key in ("tau", "gain", "delay", "bias"):
+        scenarios[key][0] = plant[key]
+    return scenarios
+
+
+def stability_margins(settings, plants):
+    """Gain margin (dB), phase margin (deg) and delay margin (s) per scenario of the loop
+    C(s) P(s) e^(-s delay), P(s) = gain / (s (tau s + 1)), on a frequency grid"""
+    w = MARGIN_FREQUENCIES[None, :]
+    s = 1j * w
+    tau, gain, delay = (plants[key][:, None] for key in ("tau", "gain", "delay"))
+    loop = (settings["kp"] + settings["ki"] / s + settings["kd"] * s) * gain / (s * (tau * s + 1)) * np.exp(-s * delay)
+    magnitude = np.abs(loop)
+    phase = np.degrees(np.unwrap(np.angle(loop), axis=1))
+    n = len(tau)
+    rows = np.arange(n)
+
+    # Gain crossover: last frequency where |L| drops through 1
+    above = magnitude >= 1
+    crossings = above[:, :-1] & ~above[:, 1:]
+    has_crossover = crossings.any(axis=1)
+    crossover = len(MARGIN_FREQUENCIES) - 2 - np.argmax(crossings[:, ::-1], axis=1)
+    phase_at_crossover = phase[rows, crossover]
+    # Phase may be offset by multiples of 360 after unwrapping; measure from the nearest -180
+    phase_margin = np.where(has_crossover, (phase_at_crossover + 180) % 360, np.inf)
+    phase_margin = np.where(phase_margin > 180, phase_margin - 360, phase_margin)
+    delay_margin = np.where(has_crossover, np.radians(phase_margin) / MARGIN_FREQUENCIES[crossover], np.inf)
+
+    # Phase crossover: first frequency where the phase passes -180 (mod 360) going down
+    wrapped = (phase + 180) % 360 - 180
+    passes = (wrapped[:, :-1] < -90) & (wrapped[:, 1:] > 90)  # Wrap-around from -180 to +180
+    has_phase_crossing = passes.any(axis=1)
+    phase_crossing = np.argmax(passes, axis=1)
+    gain_margin = np.where(has_phase_crossing, -20 * np.log10(magnitude[rows, phase_crossing]), np.inf)
+    return gain_margin, phase_margin, delay_margin
+
+
+def simulate_steps(settings, plants, noise, step, rng, dt=SIM_DT, duration=STEP_DURATION_S):
+    """Step responses of every scenario at once; returns (time, position array (n, steps))"""
+    n = len(plants["tau"])
+    steps = int(duration / dt)
+    delay_steps = np.round(plants["delay"] / dt).astype(int)
+    history = np.zeros((delay_steps.max() + 1, n))  # Past commands, for the input delay
+    rows = np.arange(n)
+    tau, gain, bias = plants["tau"], plants["gain"], plants["bias"]
+    kp, ki, kd = settings["kp"], settings["ki"], settings["kd"]
+    max_integral, max_force = settings["max_integral"], settings["max_force"]
+
+    position = np.zeros(n)
+    velocity = bias.copy()  # Start at the drift the bias causes, as if the loop had just been enabled
+    integral = np.zeros(n)
+    positions = np.empty((n, steps))
+    for k in range(steps):
+        measured = position + rng.normal(0, noise, n)
+        error = step - measured
+        integral = np.clip(integral + error * dt, -max_integral, max_integral)
+        command = np.clip(kp * error + ki * integral - kd * velocity, -max_force, max_force)
+        history[k % len(history)] = command
+        applied = history[(k - delay_steps) % len(history), rows]
+        velocity = velocity + (-velocity + gain * applied + bias) / tau * dt
+        position = position + velocity * dt
+        positions[:, k] = position
+    return np.arange(1, steps + 1) * dt, positions
+
+
+def step_metrics(t, positions, step):
+    """Overshoot (%), 2 % settling time (nan if not settled), IAE and a divergence flag per scenario"""
+    progress = positions / step
+    error = np.abs(step - positions)
+    overshoot = np.maximum(0.0, progress.max(axis=1) - 1.0) * 100
+    outside = np.abs(progress - 1.0) > SETTLING_BAND
+    last_outside = outside.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1)
+    settled = ~outside[:, -1]
+    settling = np.where(~outside.any(axis=1), 0.0, np.where(settled, t[np.minimum(last_outside + 1, len(t) - 1)], np.nan))
+    iae = np.trapezoid(error, t, axis=1)
+    diverged = ~np.isfinite(positions[:, -1]) | (error[:, -1] > abs(step))
+    return overshoot, settling, iae, diverged
+
+
+def evaluate(values, sections, n=SCENARIOS, seed=0):
+    """Margins and step statistics of every axis whose controller section (see
+    system_identification.load_sections) is in the flat config values.
+    The same seed gives the same scenarios, so two configs are compared on identical plants."""
+    results = {}
+    for axis in sections:
+        settings = controller_settings(values, axis, sections)
+        if settings is None:
+            continue
+        rng = np.random.default_rng(seed)
+        plants = perturbed_plants(plant_parameters(values, axis, sections), n, rng)
+        chunks = []
+        for start in range(0, n, SCENARIO_CHUNK):
+            chunk = {key: value[start:start + SCENARIO_CHUNK] for key, value in plants.items()}
+            margins = stability_margins(settings, chunk)
+            with np.errstate(over="ignore", invalid="ignore"):
+                t, positions = simulate_steps(settings, chunk, PERTURBATION["noise"][axis], STEP_SIZE[axis], rng)
+                chunks.append(margins + step_metrics(t, positions, STEP_SIZE[axis]))
+            del positions
+        # Per-scenario results of all chunks, combined before the statistics
+        gain_margin, phase_margin, delay_margin, overshoot, settling, iae, diverged = (
+            np.concatenate(columns) for columns in zip(*chunks))
+        results[axis] = {
+            "nominal": {"gain_margin": gain_margin[0], "phase_margin": phase_margin[0], "delay_margin": delay_margin[0],
+                        "overshoot": overshoot[0], "settling": settling[0], "iae": iae[0]},
+            "gain_margin_p5": np.percentile(gain_margin, 5),
+            "phase_margin_p5": np.percentile(phase_margin, 5),
+            "delay_margin_p5": np.percentile(delay_margin, 5),
+            "poorly_damped": float(np.mean(phase_margin < MIN_PHASE_MARGIN)),
+            "overshoot_p95": np.percentile(overshoot, 95),
+            "settling_p95": np.nanpercentile(settling, 95) if np.isfinite(settling).any() else np.nan,
+            "not_settled": float(np.mean(np.isnan(settling))),
+            "diverged": float(np.mean(diverged)),
+        }
+    return results
+
+
+# Table rows: label, value getter, format
+REPORT_ROWS = (
+    ("Phase margin (nominal)", lambda r: r["nominal"]["phase_margin"], "{:.1f} deg"),
+    ("Phase margin (5th pct)", lambda r: r["phase_margin_p5"], "{:.1f} deg"),
+    ("Gain margin (nominal)", lambda r: r["nominal"]["gain_margin"], "{:.1f} dB"),
+    ("Gain margin (5th pct)", lambda r: r["gain_margin_p5"], "{:.1f} dB"),
+    ("Delay margin (5th pct)", lambda r: r["delay_margin_p5"] * 1000, "{:.0f} ms"),
+    (f"Phase margin < {MIN_PHASE_MARGIN:.0f} deg", lambda r: r["poorly_damped"] * 100, "{:.1f} %"),
+    ("Overshoot (nominal)", lambda r: r["nominal"]["overshoot"], "{:.1f} %"),
+    ("Overshoot (95th pct)", lambda r: r["overshoot_p95"], "{:.1f} %"),
+    ("Settling (nominal)", lambda r: r["nominal"]["settling"], "{:.2f} s"),
+    ("Settling (95th pct)", lambda r: r["settling_p95"], "{:.2f} s"),
+    ("Not settled", lambda r: r["not_settled"] * 100, "{:.1f} %"),
+    ("Diverged", lambda r: r["diverged"] * 100, "{:.1f} %"),
+)
+
+
+class ControllerSandboxWindow(tk.Toplevel):
+    """Runs evaluate() for the running and the edited configuration on a worker thread and
+    shows them side by side. get_configs() returns (running values, edited values) as flat dicts."""
+    def __init__(self, parent, scheduler, title, get_configs):
+        super().__init__(parent)
+        self.title(f"Controller Sandbox - {title}")
+        self.task_name = f"{title} controller sandbox"
+        self.scheduler = scheduler
+        self.get_configs = get_configs
+        self.results = queue.Queue()
+        self.worker = None
+        self.poll_task = None
+        self.sections = load_sections()
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(side="top", fill="x", padx=5, pady=5)
+        self.run_button = tk.Button(toolbar, text="Run", command=self.run)
+        self.run_button.pack(side="left")
+        tk.Label(toolbar, text="Scenarios:").pack(side="left", padx=(10, 2))
+        self.scenarios_var = tk.IntVar(value=SCENARIOS)
+        tk.Spinbox(toolbar, from_=100, to=MAX_SCENARIOS, increment=500, width=7, textvariable=self.scenarios_var).pack(side="left")
+        self.status_var = tk.StringVar()
+        tk.Label(toolbar, textvariable=self.status_var).pack(side="left", padx=10)
+
+        self.table = ttk.Treeview(self, columns=("metric", "running", "edited"), show="tree headings", height=len(REPORT_ROWS) * 3 + 3)
+        self.table.column("#0", width=60)
+        for column, width in (("metric", 200), ("running", 120), ("edited", 120)):
+            self.table.heading(column, text=column.capitalize())
+            self.table.column(column, width=width, anchor="w" if column == "metric" else "e")
+        self.table.heading("#0", text="Axis")
+        self.table.pack(side="top", fill="both", expand=True, padx=5, pady=5)
+        self.run()
+
+    def run(self):
+        if self.worker is not None and self.worker.is_alive():
+            return
+        try:
+            running, edited = self.get_configs()
+            n = min(MAX_SCENARIOS, max(1, int(self.scenarios_var.get())))
+        except (ValueError, tk.TclError) as e:
+            self.status_var.set(f"Can't run: {e}")
+            return
+        self.run_button.config(state=tk.DISABLED)
+        self.status_var.set(f"Simulating {n} scenarios...")
+        self.worker = threading.Thread(target=self.evaluate_worker, args=(running, edited, n), daemon=True)
+        self.worker.start()
+        self.poll_task = self.scheduler.add_task(self.task_name, self.poll, 100, priority=PRIORITY_LOW, budget_ms=5)
+
+    def evaluate_worker(self, running, edited, n):
+        start = time.perf_counter()
+        try:
+            self.results.put((evaluate(running, self.sections, n), evaluate(edited, self.sections, n),
+                              time.perf_counter() - start))
+        except Exception as e:
+            self.results.put(e)
+
+    def poll(self):
+        try:
+            result = self.results.get_nowait()
+        except queue.Empty:
+            return
+        self.scheduler.remove_task(self.poll_task)
+        self.poll_task = None
+        if not self.winfo_exists():
+            return
+        self.run_button.config(state=tk.NORMAL)
+        if isinstance(result, Exception):
+            self.status_var.set(f"Simulation failed: {result}")
+            return
+        self.show(*result)
+
+    def show(self, running, edited, elapsed):
+        self.table.delete(*self.table.get_children())
+        axes = [axis for axis in self.sections if axis in running or axis in edited]
+        missing = [f"{self.sections[axis]['controller']}.Kp" for axis in self.sections if axis not in axes]
+        if not axes:
+            self.status_var.set("Nothing to preview")
+            messagebox.showwarning(
+                "No Controller Sections",
+                f"None of the controller parameters {', '.join(missing)} are in this configuration.\n"
+                "Name the vehicle's controller sections in helper/controller_sections.json.", parent=self)
+            return
+        for axis in axes:
+            parent = self.table.insert("", tk.END, text=axis, open=True)
+            for label, value, fmt in REPORT_ROWS:
+                cells = [fmt.format(value(results[axis])) if axis in results else "-" for results in (running, edited)]
+                self.table.insert(parent, tk.END, values=(label, *cells))
+        status = f"Done in {elapsed:.1f} s"
+        if missing:
+            status += f"; not in the configuration: {', '.join(missing)}"
+        self.status_var.set(status)
+
+    def destroy(self):
+        if self.poll_task is not None:
+            self.scheduler.remove_task(self.poll_task)
+            self.poll_task = None
+        super().destroy()
@@ -1,12 +1,18 @@
 # debug_mqtt_viewer_page.py
 import tkinter as tk
 from tkinter import ttk
-from mqtt_handler import register_callback, unregister_callback, MQTT_TOPIC_STATUS
+from mqtt_handler import get_default_session
+from frame_scheduler import PRIORITY_NORMAL, FRAME_INTERVAL_MS
+from status_schema import MOTOR_KEYS, FIELD_INDEX, FIELDS_BY_NAME, extract_record, extract_texts
+
+BAR_ZERO_Y = 150  # Canvas y of zero thrust
+BAR_PIXELS_PER_UNIT = 50  # 50 pixels per unit of thrust (2.5 units = 125 px)
 
 class DebugMQTTViewerPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
+        self.session = session or get_default_session()
 
         # Create a main canvas and a scrollbar
         main_canvas = tk.Canvas(self)
@@ -59,6 +65,58 @@ class DebugMQTTViewerPage(tk.Frame):
         self.obs_roll_var = tk.StringVar()
         self.obs_pitch_var = tk.StringVar()
 
+        # Status schema field shown by each text variable (display format comes from the schema)
+        field_vars = {
+            "bar_state": self.bar_state_var,
+            "imu_state": self.imu_state_var,
+            "rov_armed": self.rov_armed_var,
+            "depth": self.depth_var,
+            "Zspeed": self.Zspeed_var,
+            "pitch": self.pitch_var,
+            "angular_y": self.angular_y_var,
+            "roll": self.roll_var,
+            "angular_x": self.angular_x_var,
+            "yaw": self.yaw_var,
+            "force_pitch": self.force_pitch_var,
+            "force_roll": self.force_roll_var,
+            "force_z": self.force_z_var,
+            "motor_thrust_max_xy": self.motor_thrust_max_xy_var,
+            "motor_thrust_max_z": self.motor_thrust_max_z_var,
+            "reference_pitch": self.reference_pitch_var,
+            "reference_roll": self.reference_roll_var,
+            "reference_z": self.reference_z_var,
+            "cpu_temp": self.cpu_temp_var,
+            "cpu_usage": self.cpu_usage_var,
+            "ram_total_mb": self.ram_total_mb_var,
+            "ram_used_mb": self.ram_used_mb_var,
+            "internal_temperature": self.internal_temperature_var,
+            "external_temperature": self.external_temperature_var,
+            "error_integral_z": self.error_integral_z_var,
+            "error_integral_pitch": self.error_integral_pitch_var,
+            "error_integral_roll": self.error_integral_roll_var,
+            "obs_z": self.obs_z_var,
+            "obs_roll": self.obs_roll_var,
+            "obs_pitch": self.obs_pitch_var,
+            "work_mode": self.work_mode_var,
+        }
+        field_vars.update({f"controller_state_{key.lower()}": var for key, var in self.controller_state_vars.items()})
+        field_vars.update({f"pwm_{key}": var for key, var in self.pwm_vars.items()})
+        # (index in extract_texts output, variable, motor whose PWM canvas label mirrors it)
+        self.text_fields = [
+            (FIELD_INDEX[name], var, name[len("pwm_"):] if name.startswith("pwm_") else None)
+            for name, var in field_vars.items()
+        ]
+        self.thrust_fmt = FIELDS_BY_NAME["motor_thrust_FDX"].fmt
+
+        # Last values pushed to Tk, so only real changes are applied
+        self.displayed = {}
+        self.pending_message = None  # Latest status message, written by the MQTT thread
+        self.visible = False
+        # Rendering runs from the app's frame clock, only while the page is shown
+        self.refresh_task = controller.scheduler.add_task(
+            f"{self.session.name} status view", self.refresh, FRAME_INTERVAL_MS,
+            priority=PRIORITY_NORMAL, budget_ms=5, active=False)
+
 
         # Create a structured layout with frames for different groups of information
         # Top row: ROV Status and System Status
@@ -169,10 +227,11 @@ class DebugMQTTViewerPage(tk.Frame):
         self.motor_labels = {}
         self.pwm_labels = {}
         self.thrust_text_labels = {}
+        self.motor_bar_x = {}  # Bar centre x, cached so it never has to be read back from the canvas
         
-        motor_keys = ["FDX", "FSX", "RDX", "RSX", "UPFDX", "UPFSX", "UPRDX", "UPRSX"]
-        for i, key in enumerate(motor_keys):
+        for i, key in enumerate(MOTOR_KEYS):
             x = i * 65 + 75  # Increased padding to the right (from 45 to 75)
+            self.motor_bar_x[key] = x
             self.motor_labels[key] = self.canvas.create_rectangle(x-15, 150, x+15, 150, fill="blue")  # Centered at 150
             self.pwm_labels[key] = self.canvas.create_text(x, 250, text="N/A", font=("Arial", 10))  # Adjusted y position
             self.canvas.create_text(x, 270, text=key, font=("Arial", 10))  # Adjusted y position
@@ -192,75 +251,65 @@ class DebugMQTTViewerPage(tk.Frame):
         main_canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
-        register_callback(self.update_data)
+        self.session.register_callback(self.update_data)
+
+    def on_show(self):
+        """Catch up from the newest message and resume the refresh loop"""
+        self.visible = True
+        self.controller.scheduler.set_active(self.refresh_task, True)
+
+    def on_hide(self):
+        """Stop rendering; update_data keeps collecting the newest message"""
+        self.visible = False
+        self.controller.scheduler.set_active(self.refresh_task, False)
 
     def update_data(self, message, topic):
-        if topic != MQTT_TOPIC_STATUS:
+        """Keep the newest status message - runs in MQTT thread, rendering happens in refresh()"""
+        if topic != self.session.topic_status:
             return
+        self.pending_message = message
 
-        # Update the variables with the received message data
-        self.bar_state_var.set(message.get("bar_state", "N/A"))
-        self.imu_state_var.set(message.get("imu_state", "N/A"))
-        self.rov_armed_var.set(message.get("rov_armed", "N/A"))
+    def refresh(self):
+        """Render the newest pending message once per frame while visible - runs in main thread"""
+        message, self.pending_message = self.pending_message, None
+        if message is not None:
+            try:
+                self.render_message(message)
+            except Exception as e:
+                print(f"Error updating status view: {e}")
 
-        controller_state = message.get("controller_state", {})
-        for key, var in self.controller_state_vars.items():
-            var.set(controller_state.get(key, "N/A"))
+    def set_if_changed(self, key, var, text):
+        """Set a Tk variable only if its displayed text changes; returns True if it did"""
+        if self.displayed.get(key) == text:
+            return False
+        self.displayed[key] = text
+        var.set(text)
+        return True
 
-        motor_thrust = message.get("motor_thrust", {})
-        for key, var in self.motor_thrust_vars.items():
-            thrust = motor_thrust.get(key, "0.0")
-            thrust = float(thrust)  # Ensure thrust is a float
-            var.set(thrust)
-            self.update_motor_thrust_bar(key, thrust)
+    def render_message(self, message):
+        texts = extract_texts(message)
+        for index, var, pwm_motor in self.text_fields:
+            text = texts[index]
+            if self.set_if_changed(index, var, text) and pwm_motor is not None:
+                self.canvas.itemconfig(self.pwm_labels[pwm_motor], text=text)
 
-        pwm_values = message.get("pwm", {})
-        for key, var in self.pwm_vars.items():
-            pwm = pwm_values.get(key, "N/A")
-            var.set(pwm)
-            self.canvas.itemconfig(self.pwm_labels[key], text=f"{pwm}")
-
-        self.depth_var.set(message.get("depth", "N/A"))
-        self.Zspeed_var.set(message.get("Zspeed", "N/A"))
-        self.pitch_var.set(message.get("pitch", "N/A"))
-        self.angular_y_var.set(message.get("angular_y", "N/A")) 
-        self.roll_var.set(message.get("roll", "N/A"))
-        self.angular_x_var.set(message.get("angular_x", "N/A"))
-        self.yaw_var.set(message.get("yaw", "N/A"))
-        self.force_pitch_var.set(message.get("force_pitch", "N/A"))
-        self.force_roll_var.set(message.get("force_roll", "N/A"))
-        self.force_z_var.set(message.get("force_z", "N/A"))
-        self.motor_thrust_max_xy_var.set(message.get("motor_thrust_max_xy", "N/A"))
-        self.motor_thrust_max_z_var.set(message.get("motor_thrust_max_z", "N/A"))
-        self.reference_pitch_var.set(message.get("reference_pitch", "N/A"))
-        self.reference_roll_var.set(message.get("reference_roll", "N/A"))
-        self.reference_z_var.set(message.get("reference_z", "N/A"))
-        self.cpu_temp_var.set(message.get("cpu_temp", "N/A"))
-        self.cpu_usage_var.set(message.get("cpu_usage", "N/A"))
-        self.ram_total_mb_var.set(message.get("ram_total_mb", "N/A"))
-        self.ram_used_mb_var.set(message.get("ram_used_mb", "N/A"))
-        self.internal_temperature_var.set(message.get("internal_temperature", "N/A"))
-        self.external_temperature_var.set(message.get("external_temperature", "N/A"))
-        
-        error_integral = message.get("error_integral", {})
-        self.error_integral_z_var.set(error_integral.get("Z", "N/A"))
-        self.error_integral_pitch_var.set(error_integral.get("PITCH", "N/A"))
-        self.error_integral_roll_var.set(error_integral.get("ROLL", "N/A"))
-        
-        obs_states = message.get("obs_states", {})
-        self.obs_z_var.set(obs_states.get("z", "N/A"))
-        self.obs_roll_var.set(obs_states.get("roll", "N/A"))
-        self.obs_pitch_var.set(obs_states.get("pitch", "N/A"))
-        
-        self.work_mode_var.set(message.get("work_mode", "N/A"))
+        record = extract_record(message)
+        for key in MOTOR_KEYS:
+            self.update_motor_thrust_bar(key, getattr(record, f"motor_thrust_{key}"))
 
     def update_motor_thrust_bar(self, motor, thrust):
         # Convert thrust value to a height for the bar (max value +/- 2.5)
-        # New scale: 50 pixels per 2.5 units, centered at 150
-        height = 150 - (thrust * 50)  # 50 pixels per 2.5 units of thrust
-        x = self.canvas.coords(self.motor_labels[motor])[0] + 15
-        self.canvas.coords(self.motor_labels[motor], x-15, height, x+15, 150)
-        self.canvas.itemconfig(self.thrust_text_labels[motor], text=f"{thrust:.2f}")
+        # Scale: 50 pixels per unit, centered at 150; skipped if neither the bar nor the text would change
+        text = self.thrust_fmt.format(thrust)
+        key = ("motor_thrust", motor)
+        if self.displayed.get(key) == text:
+            return
+        self.displayed[key] = text
+        self.motor_thrust_vars[motor].set(thrust)
+        height = round(BAR_ZERO_Y - thrust * BAR_PIXELS_PER_UNIT)
+        x = self.motor_bar_x[motor]
+        self.canvas.coords(self.motor_labels[motor], x-15, height, x+15, BAR_ZERO_Y)
+        self.canvas.itemconfig(self.thrust_text_labels[motor], text=text)
 
     def __del__(self):
-        unregister_callback(self.update_data)
\ No newline at end of file
+        self.session.unregister_callback(self.update_data)
\ No newline at end of file
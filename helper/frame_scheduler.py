@@ -0,0 +1,154 @@
+# frame_scheduler.py
+# Single frame clock for all periodic GUI work, with per-frame time budget and stutter statistics.
+import collections
+import time
+
+PRIORITY_HIGH = 0  # Never deferred (alarms)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+FRAME_INTERVAL_MS = 33  # ~30 frames per second
+FRAME_BUDGET_FRACTION = 0.7  # Share of the frame periodic tasks may use; the rest is left for Tk events
+MAX_DEFERRAL_S = 1.0  # A deferred task runs anyway once it is this late
+STATS_FRAMES = 900  # Frame times kept for statistics (~30 s)
+STATS_REPORT_S = 30  # How often a stutter summary is printed (only if frames ran over)
+
+
+class FrameTask:
+    """A periodic callback owned by a page; see FrameScheduler.add_task"""
+    __slots__ = ("name", "callback", "interval", "priority", "budget", "active",
+                 "next_due", "cost", "runs", "deferred", "over_budget")
+
+    def __init__(self, name, callback, interval_ms, priority, budget_ms, active):
+        self.name = name
+        self.callback = callback
+        self.interval = interval_ms / 1000
+        self.priority = priority
+        self.budget = budget_ms / 1000
+        self.active = active
+        self.next_due = time.perf_counter()
+        self.cost = self.budget  # Moving average of the measured run time
+        self.runs = 0
+        self.deferred = 0
+        self.over_budget = 0
+
+
+class FrameScheduler:
+    """Runs registered tasks from one Tk after() loop.
+
+    Every frame the due tasks run in priority order. Once a task's expected cost
+    would push the frame past its budget, remaining NORMAL and LOW tasks wait for
+    the next frame, unless they are already MAX_DEFERRAL_S late. Frame times are
+    kept so stutter can be measured (frame_stats).
+    """
+    def __init__(self, root, frame_interval_ms=FRAME_INTERVAL_MS):
+        self.root = root
+        self.frame_interval = frame_interval_ms / 1000
+        self.frame_budget = self.frame_interval * FRAME_BUDGET_FRACTION
+        self.tasks = []
+        self.frame_times = collections.deque(maxlen=STATS_FRAMES)  # Work time per frame
+        self.frame_gaps = collections.deque(maxlen=STATS_FRAMES)  # Time between frame starts
+        self.frames = 0
+        self.frames_over_budget = 0
+        self.last_frame_start = None
+        self.last_report = time.perf_counter()
+        self.over_budget_at_last_report = 0
+        self.job = None
+
+    def add_task(self, name, callback, interval_ms, priority=PRIORITY_NORMAL, budget_ms=5, active=True):
+        """Call callback() every interval_ms while active; budget_ms is its expected cost"""
+        task = FrameTask(name, callback, interval_ms, priority, budget_ms, active)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.priority)
+        if self.job is None:
+            self.job = self.root.after(0, self.run_frame)
+        return task
+
+    def remove_task(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+
+    def set_active(self, task, active):
+        """Pause or resume a task; a resumed task runs on the next frame"""
+        if active and not task.active:
+            task.next_due = time.perf_counter()
+        task.active = active
+
+    def run_frame(self):
+        start = time.perf_counter()
+        if self.last_frame_start is not None:
+            self.frame_gaps.append(start - self.last_frame_start)
+        self.last_frame_start = start
+
+        ran_any = False
+        for task in list(self.tasks):
+            if not task.active or start < task.next_due:
+                continue
+            elapsed = time.perf_counter() - start
+            late = start - task.next_due
+            if (ran_any and task.priority != PRIORITY_HIGH and late < MAX_DEFERRAL_S
+                    and elapsed + task.cost > self.frame_budget):
+                task.deferred += 1
+                continue
+            self.run_task(task, start)
+            ran_any = True
+
+        work = time.perf_counter() - start
+        self.frame_times.append(work)
+        self.frames += 1
+        if work > self.frame_budget:
+            self.frames_over_budget += 1
+        if start - self.last_report >= STATS_REPORT_S:
+            self.report()
+        # Keep the frame cadence: subtract the time this frame took
+        delay = max(1, int((self.frame_interval - work) * 1000))
+        self.job = self.root.after(delay, self.run_frame)
+
+    def run_task(self, task, frame_start):
+        task_start = time.perf_counter()
+        try:
+            task.callback()
+        except Exception as e:
+            print(f"Error in frame task {task.name}: {e}")
+        cost = time.perf_counter() - task_start
+        task.cost = 0.8 * task.cost + 0.2 * cost
+        task.runs += 1
+        if cost > task.budget:
+            task.over_budget += 1
+        # Schedule from the previous due time so the task keeps its rate, but never catch up in bursts
+        task.next_due = max(task.next_due + task.interval, frame_start + task.interval / 2)
+
+    def frame_stats(self):
+        """Frame work time percentiles (ms), over-budget frames and per-task counters"""
+        times = sorted(self.frame_times)
+        gaps = sorted(self.frame_gaps)
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))] * 1000 if values else 0.0
+
+        return {
+            "frames": self.frames,
+            "frames_over_budget": self.frames_over_budget,
+            "work_p50_ms": percentile(times, 0.5),
+            "work_p95_ms": percentile(times, 0.95),
+            "work_max_ms": times[-1] * 1000 if times else 0.0,
+            "gap_p95_ms": percentile(gaps, 0.95),
+            "gap_max_ms": gaps[-1] * 1000 if gaps else 0.0,
+            "tasks": {task.name: {"runs": task.runs, "deferred": task.deferred, "over_budget": task.over_budget,
+                                  "cost_ms": task.cost * 1000} for task in self.tasks},
+        }
+
+    def report(self):
+        """Print a summary when frames ran over budget since the last report"""
+        self.last_report = time.perf_counter()
+        if self.frames_over_budget == self.over_budget_at_last_report:
+            return
+        self.over_budget_at_last_report = self.frames_over_budget
+        stats = self.frame_stats()
+        print(f"Frames: {stats['frames']} ({stats['frames_over_budget']} over {self.frame_budget * 1000:.0f} ms budget), "
+              f"work p50 {stats['work_p50_ms']:.1f} ms p95 {stats['work_p95_ms']:.1f} ms max {stats['work_max_ms']:.1f} ms, "
+              f"frame gap p95 {stats['gap_p95_ms']:.1f} ms max {stats['gap_max_ms']:.1f} ms")
+        for name, task in stats["tasks"].items():
+            if task["deferred"] or task["over_budget"]:
+                print(f"  {name:<30} cost {task['cost_ms']:6.1f} ms, {task['deferred']} deferred, "
+                      f"{task['over_budget']} over budget")
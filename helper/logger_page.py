@@ -3,12 +3,19 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 import time
 import re
-from mqtt_handler import register_callback, unregister_callback, MQTT_TOPIC_LOG
+import collections
+from frame_scheduler import PRIORITY_LOW
+from mqtt_handler import get_default_session
+
+FLUSH_INTERVAL_MS = 100  # How often buffered lines are written to the text area while visible
+MAX_PENDING_LINES = 5000  # Lines kept while the page is hidden; older ones are dropped
+MAX_LINES_PER_FLUSH = 500  # Bounds the work of one flush so a backlog is spread over several frames
 
 class LoggerPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
+        self.session = session or get_default_session()
         
         # Configure the layout
         self.columnconfigure(0, weight=1)
@@ -27,6 +34,9 @@ class LoggerPage(tk.Frame):
         
         # Show timestamp checkbox
         self.show_timestamp = tk.BooleanVar(value=True)
+        # Plain copy for the MQTT thread, which must not call into Tk
+        self.timestamps_enabled = True
+        self.show_timestamp.trace_add("write", self.on_show_timestamp_changed)
         tk.Checkbutton(header_frame, text="Show Timestamp", variable=self.show_timestamp).pack(side="right", padx=5)
         
         # Clear button
@@ -42,15 +52,35 @@ class LoggerPage(tk.Frame):
         self.log_area.tag_configure("WARN", foreground="orange")
         self.log_area.tag_configure("ERROR", foreground="red")
         
+        # Lines received but not yet shown: (timestamp prefix, message, tag)
+        self.pending_lines = collections.deque(maxlen=MAX_PENDING_LINES)
+        self.visible = False
+        self.flush_task = controller.scheduler.add_task(
+            f"{self.session.name} log flush", self.flush_pending, FLUSH_INTERVAL_MS,
+            priority=PRIORITY_LOW, budget_ms=5, active=False)
+        
         # Register to receive MQTT messages
-        register_callback(self.on_mqtt_message)
+        self.session.register_callback(self.on_mqtt_message)
         
+    def on_show(self):
+        """Write everything received while hidden, then keep flushing"""
+        self.visible = True
+        self.controller.scheduler.set_active(self.flush_task, True)
+    
+    def on_hide(self):
+        """Stop touching the text area; messages keep queueing in pending_lines"""
+        self.visible = False
+        self.controller.scheduler.set_active(self.flush_task, False)
+    
+    def on_show_timestamp_changed(self, *args):
+        self.timestamps_enabled = self.show_timestamp.get()
+    
     def on_mqtt_message(self, message, topic):
-        # Only process messages from the log/ topic
-        if topic == MQTT_TOPIC_LOG:
-            # Format timestamp if enabled
+        # Only process messages from the log/ topic - runs in MQTT thread
+        if topic == self.session.topic_log:
+            # Format timestamp if enabled (taken on arrival, not when shown)
             timestamp_prefix = ""
-            if self.show_timestamp.get():
+            if self.timestamps_enabled:
                 timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
                 timestamp_prefix = f"[{timestamp}] "
             
@@ -63,16 +93,27 @@ class LoggerPage(tk.Frame):
             elif "[ERROR]" in message:
                 tag = "ERROR"
             
-            # Format and display the message
+            self.pending_lines.append((timestamp_prefix, message, tag))
+    
+    def add_local_line(self, message, tag=None):
+        """Show a line generated by the helper itself (e.g. alarms) - safe from any thread"""
+        timestamp_prefix = time.strftime("[%Y-%m-%d %H:%M:%S] ") if self.timestamps_enabled else ""
+        if not message.endswith("\n"):
+            message += "\n"
+        self.pending_lines.append((timestamp_prefix, message, tag))
+    
+    def flush_pending(self):
+        """Insert pending lines in one go (up to MAX_LINES_PER_FLUSH) - runs in main thread while visible"""
+        if self.pending_lines:
             self.log_area.config(state=tk.NORMAL)
-            self.log_area.insert(tk.END, timestamp_prefix, "")
-            
-            # Insert the actual message with appropriate color tag
-            if tag:
-                self.log_area.insert(tk.END, message, tag)
-            else:
-                self.log_area.insert(tk.END, message)
-                
+            for _ in range(min(len(self.pending_lines), MAX_LINES_PER_FLUSH)):
+                timestamp_prefix, message, tag = self.pending_lines.popleft()
+                self.log_area.insert(tk.END, timestamp_prefix, "")
+                # Insert the actual message with appropriate color tag
+                if tag:
+                    self.log_area.insert(tk.END, message, tag)
+                else:
+                    self.log_area.insert(tk.END, message)
             self.log_area.config(state=tk.DISABLED)
             
             # Auto-scroll to the end if enabled
@@ -88,6 +129,6 @@ class LoggerPage(tk.Frame):
     def __del__(self):
         """Clean up by unregistering the callback when the page is destroyed."""
         try:
-            unregister_callback(self.on_mqtt_message)
+            self.session.unregister_callback(self.on_mqtt_message)
         except:
             pass
\ No newline at end of file
@@ -1,25 +1,71 @@
 # main_app.py
+import math
+import time
+STARTUP_BEGIN = time.perf_counter()
+
+import importlib
+import queue
 import tkinter as tk
 from tkinter import ttk
 
-# Import pages
-from debug_mqtt_viewer_page import DebugMQTTViewerPage
-from send_test_mqtt_page import SendTestMQTTPage
-from update_configuration_page import UpdateConfigurationPage
-from logger_page import LoggerPage
-from plotting_page import PlottingPage  # New plotting page
-
 # Import MQTT handler with additional functions
-from mqtt_handler import initialize_mqtt, register_connection_callback, MQTT_BROKER, MQTT_TOPIC_CONFIG, MQTT_TOPIC_COMMANDS, MQTT_TOPIC_AXES, MQTT_TOPIC_STATUS, MQTT_TOPIC_ARM
+from mqtt_handler import create_sessions, load_vehicles
+from status_schema import extract_row, extract_record, NUMERIC_INDEX
+from frame_scheduler import FrameScheduler, PRIORITY_HIGH
+
+# Pages are imported and built the first time they are shown, so heavy
+# dependencies (matplotlib, scipy) only load when their page is opened.
+PAGE_MODULES = {
+    "DebugMQTTViewerPage": "debug_mqtt_viewer_page",
+    "SendTestMQTTPage": "send_test_mqtt_page",
+    "UpdateConfigurationPage": "update_configuration_page",
+    "PlottingPage": "plotting_page",
+    "LoggerPage": "logger_page",
+}
+
+# Cheap pages that must not miss messages; built as soon as the window is up
+# (the Config page stores every received configuration in its history)
+PRELOAD_PAGES = ("LoggerPage", "UpdateConfigurationPage")
+
+ALARM_POLL_MS = 200  # How often alarm events are moved from the MQTT thread to the GUI
+ALARM_EVENT_DISPLAY_S = 5  # One-shot alarm events (state changes) stay on the banner this long
+ALARM_COLORS = {"INFO": "lightblue", "WARN": "orange", "ERROR": "red"}
+
+
+class StartupTimer:
+    """Records how long each startup phase took and prints a report"""
+    def __init__(self, begin):
+        self.begin = begin
+        self.last = begin
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        print("Startup times:")
+        for phase, duration in self.phases:
+            print(f"  {phase:<40} {duration * 1000:8.1f} ms")
+        print(f"  {'total':<40} {(self.last - self.begin) * 1000:8.1f} ms")
+
 
 class MainApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer or StartupTimer(time.perf_counter())
         self.title("Modular GUI with MQTT")
         self.geometry("800x900")
-        self.mqtt_connected = False
-        self.reconnect_scheduled = False
+        # One MQTT session per vehicle, each with its own pages, connection and alarms
+        self.sessions = create_sessions(load_vehicles())
+        self.sessions_by_name = {session.name: session for session in self.sessions}
+        self.session = self.sessions[0]  # Vehicle shown by the pages
+        self.mqtt_connected = {session.name: False for session in self.sessions}
+        self.reconnect_scheduled = {session.name: False for session in self.sessions}
         self.reconnect_delay = 5000  # 5 seconds
+        # All periodic GUI work (page refreshes, alarm polling) runs from this frame clock
+        self.scheduler = FrameScheduler(self)
 
         # Create a navigation bar
         nav_bar = tk.Frame(self, bg="lightgrey")
@@ -36,6 +82,14 @@ class MainApp(tk.Tk):
             command=self.toggle_mqtt_connection
         )
         self.connect_button.pack(side="left", padx=5, pady=5)
+
+        # Vehicle selector, only needed when more than one vehicle is configured
+        if len(self.sessions) > 1:
+            self.vehicle_var = tk.StringVar(value=self.session.name)
+            vehicle_selector = ttk.Combobox(nav_bar, textvariable=self.vehicle_var, state="readonly", width=12,
+                                            values=[session.name for session in self.sessions])
+            vehicle_selector.bind("<<ComboboxSelected>>", lambda e: self.select_vehicle(self.vehicle_var.get()))
+            vehicle_selector.pack(side="left", padx=5, pady=5)
         
         # Other navigation buttons (without MQTT Config)
         tk.Button(nav_bar, text="Status", command=lambda: self.show_frame("DebugMQTTViewerPage")).pack(side="left", padx=5, pady=5)
@@ -44,82 +98,215 @@ class MainApp(tk.Tk):
         tk.Button(nav_bar, text="Plots", command=lambda: self.show_frame("PlottingPage")).pack(side="left", padx=5, pady=5)
         tk.Button(nav_bar, text="Logger", command=lambda: self.show_frame("LoggerPage")).pack(side="left", padx=5, pady=5)
 
+        # Alarm banner, shown under the navigation bar only while alarms are active
+        self.alarm_banner = tk.Label(self, anchor="w", padx=10, font=("Arial", 10, "bold"))
+        self.alarm_banner_visible = False
+        self.alarm_engines = {}  # Per vehicle name
+        self.alarm_events = queue.Queue()  # Filled by the MQTT threads
+        self.recent_alarm_events = []  # (expiry time, vehicle name, AlarmEvent) for one-shot events
+        self.active_alarms = {}  # Vehicle name -> active (name, severity, message) alarms
+        
         # Create a container for the frames
-        container = ttk.Frame(self)
-        container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
-
-        self.frames = {}
-        # Include the new PlottingPage
-        for F in (DebugMQTTViewerPage, SendTestMQTTPage, UpdateConfigurationPage, PlottingPage, LoggerPage): 
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-
-        # Register callback for MQTT connection status changes
-        register_connection_callback(self.update_connection_status)
+        self.container = ttk.Frame(self)
+        self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+
+        self.frames = {}  # Pages built so far, by (vehicle name, page name)
+        self.current_page = None  # Key of the page on screen; only it renders
+
+        # Register callbacks for MQTT connection status changes
+        for session in self.sessions:
+            session.register_connection_callback(
+                lambda connected, session=session: self.update_connection_status(session, connected))
+        self.scheduler.add_task("alarms", self.poll_alarms, ALARM_POLL_MS, priority=PRIORITY_HIGH, budget_ms=2)
+        self.startup_timer.mark("main window")
         
         # Start with DebugMQTTViewerPage instead of MQTTConfigPage
         self.show_frame("DebugMQTTViewerPage")
+        self.startup_timer.mark("first page (DebugMQTTViewerPage)")
+        
+        # Once the window is up: report startup, then build pages that must run in the background
+        self.after_idle(self.finish_startup)
         
         # Automatically try to connect to MQTT at startup
         self.after(500, self.connect_to_mqtt)  # Short delay to let the UI initialize first
 
-    def update_connection_status(self, connected):
-        """Update connection status indicator based on MQTT connection status"""
-        self.mqtt_connected = connected
+    def finish_startup(self):
+        self.startup_timer.mark("first idle (window shown)")
+        self.startup_timer.report()
+        for session in self.sessions:
+            for page_name in PRELOAD_PAGES:
+                self.get_page(page_name, session)
+        self.start_alarm_engines()
+
+    def start_alarm_engines(self):
+        """Build one alarm engine per vehicle (NumPy import) after the window is up and feed it status/"""
+        from alarm_engine import AlarmEngine, load_alarm_rules
+        rules = load_alarm_rules()
+        for session in self.sessions:
+            try:
+                self.alarm_engines[session.name] = AlarmEngine(rules)
+            except (KeyError, ValueError) as e:
+                print(f"Invalid alarm rules, alarms disabled: {e}")
+                return
+            session.register_callback(lambda message, topic, session=session: self.check_alarms(session, message, topic))
+
+    def check_alarms(self, session, message, topic):
+        """Evaluate alarm rules on a status message - runs in the session's MQTT thread"""
+        if topic != session.topic_status or not isinstance(message, dict):
+            return
+        engine = self.alarm_engines[session.name]
+        try:
+            row = extract_row(message)
+            # The ROV's own timestamp where present: paho delivers messages in bursts, and
+            # arrival times ~1 ms apart would turn small changes into huge rates
+            stamp = row[NUMERIC_INDEX["timestamp"]]
+            sample_time = stamp if math.isfinite(stamp) else time.monotonic()
+            events = engine.process(row, extract_record(message), sample_time)
+        except Exception as e:
+            print(f"Error evaluating alarms: {e}")
+            return
+        if events:
+            self.alarm_events.put((session, events, engine.active_alarms()))
+
+    def poll_alarms(self):
+        """Log new alarm events and refresh the banner - runs in main thread"""
+        now = time.monotonic()
+        changed = False
+        try:
+            while True:
+                session, events, active = self.alarm_events.get_nowait()
+                self.active_alarms[session.name] = active
+                changed = True
+                logger = self.frames.get((session.name, "LoggerPage"))
+                for event in events:
+                    print(f"[{session.name}] {event}")
+                    if logger is not None:
+                        logger.add_local_line(str(event), event.severity)
+                    if event.raised and event.name not in (name for name, _, _ in active):
+                        self.recent_alarm_events.append((now + ALARM_EVENT_DISPLAY_S, session.name, event))
+        except queue.Empty:
+            pass
+        
+        expired = [item for item in self.recent_alarm_events if item[0] <= now]
+        if expired:
+            self.recent_alarm_events = [item for item in self.recent_alarm_events if item[0] > now]
+            changed = True
+        if changed:
+            self.update_alarm_banner()
+
+    def update_alarm_banner(self):
+        from alarm_engine import SEVERITY_ORDER
+        # Prefix messages with the vehicle name once there is more than one vehicle
+        prefix = (lambda vehicle: f"{vehicle}: ") if len(self.sessions) > 1 else (lambda vehicle: "")
+        alarms = [(severity, prefix(vehicle) + message)
+                  for vehicle, active in self.active_alarms.items() for _, severity, message in active]
+        alarms += [(event.severity, f"{prefix(vehicle)}{event.message} ({event.value})")
+                   for _, vehicle, event in self.recent_alarm_events]
+        if not alarms:
+            if self.alarm_banner_visible:
+                self.alarm_banner.pack_forget()
+                self.alarm_banner_visible = False
+            return
+        worst = max((severity for severity, _ in alarms), key=lambda severity: SEVERITY_ORDER.get(severity, 1))
+        self.alarm_banner.config(text="ALARM: " + " | ".join(message for _, message in alarms),
+                                 bg=ALARM_COLORS.get(worst, "orange"))
+        if not self.alarm_banner_visible:
+            self.alarm_banner.pack(side="top", fill="x", before=self.container)
+            self.alarm_banner_visible = True
+
+    def get_page(self, page_name, session=None):
+        """Return the page for a vehicle (the selected one by default), importing its module
+        and building it on first use"""
+        session = session or self.session
+        key = (session.name, page_name)
+        frame = self.frames.get(key)
+        if frame is not None:
+            return frame
+        started = time.perf_counter()
+        page_class = getattr(importlib.import_module(PAGE_MODULES[page_name]), page_name)
+        imported = time.perf_counter()
+        frame = page_class(parent=self.container, controller=self, session=session)
+        frame.grid(row=0, column=0, sticky="nsew")
+        self.frames[key] = frame
+        built = time.perf_counter()
+        print(f"Built {page_name} for {session.name}: import {(imported - started) * 1000:.1f} ms, construction {(built - imported) * 1000:.1f} ms")
+        return frame
+
+    def update_connection_status(self, session, connected):
+        """Track a session's connection; the indicator shows the selected vehicle"""
+        self.mqtt_connected[session.name] = connected
         if connected:
+            self.reconnect_scheduled[session.name] = False  # Connection successful, cancel any pending reconnect
+        elif not self.reconnect_scheduled[session.name]:
+            print(f"MQTT disconnected from {session.name}. Scheduling reconnection in {self.reconnect_delay / 1000} seconds.")
+            self.reconnect_scheduled[session.name] = True
+            self.after(self.reconnect_delay, lambda: self.attempt_reconnection(session))
+        if session is self.session:
+            self.show_connection_status()
+
+    def show_connection_status(self):
+        if self.mqtt_connected[self.session.name]:
             self.status_frame.config(bg="green")
-            self.connect_button.config(text="ROV Connected")
-            self.reconnect_scheduled = False  # Connection successful, cancel any pending reconnect
+            self.connect_button.config(text=f"{self.session.name} Connected")
         else:
             self.status_frame.config(bg="red")
-            self.connect_button.config(text="Connect to ROV")
-            if not self.reconnect_scheduled:
-                print(f"MQTT disconnected. Scheduling reconnection in {self.reconnect_delay / 1000} seconds.")
-                self.reconnect_scheduled = True
-                self.after(self.reconnect_delay, self.attempt_reconnection)
-
-    def attempt_reconnection(self):
-        """Attempt to reconnect to MQTT if not already connected."""
-        if not self.mqtt_connected:
-            print("Attempting to reconnect to MQTT...")
-            self.connect_to_mqtt() 
+            self.connect_button.config(text=f"Connect to {self.session.name}")
+
+    def attempt_reconnection(self, session):
+        """Attempt to reconnect a session if not already connected."""
+        if not self.mqtt_connected[session.name]:
+            print(f"Attempting to reconnect to {session.name}...")
+            self.connect_to_mqtt(session)
         # Regardless of outcome, allow update_connection_status to reschedule if needed
-        self.reconnect_scheduled = False
+        self.reconnect_scheduled[session.name] = False
 
-
-    def connect_to_mqtt(self):
-        """Connect to MQTT using default values"""
-        try:
-            # Use default MQTT settings
-            broker = MQTT_BROKER
-            result = initialize_mqtt(
-                broker, 
-                MQTT_TOPIC_CONFIG, 
-                MQTT_TOPIC_COMMANDS, 
-                MQTT_TOPIC_AXES,
-                MQTT_TOPIC_STATUS, 
-                MQTT_TOPIC_ARM
-            )
-            # Status will be updated by the callback
-        except Exception as e:
-            print(f"Error connecting to MQTT: {e}")
-            self.update_connection_status(False)
+    def connect_to_mqtt(self, session=None):
+        """Connect one session, or every session when none is given"""
+        for session in [session] if session is not None else self.sessions:
+            try:
+                session.connect()
+                # Status will be updated by the callback
+            except Exception as e:
+                print(f"Error connecting to {session.name}: {e}")
+                self.update_connection_status(session, False)
 
     def toggle_mqtt_connection(self):
-        """Handles connect/reconnect button click"""
-        if not self.mqtt_connected:
-            self.connect_to_mqtt()
+        """Handles connect/reconnect button click for the selected vehicle"""
+        if not self.mqtt_connected[self.session.name]:
+            self.connect_to_mqtt(self.session)
         # If already connected, button doesn't need to do anything
 
+    def select_vehicle(self, vehicle_name):
+        """Switch every page to another vehicle, keeping the same page on screen"""
+        session = self.sessions_by_name[vehicle_name]
+        if session is self.session:
+            return
+        self.session = session
+        self.show_connection_status()
+        if self.current_page is not None:
+            self.show_frame(self.current_page[1])
+
     def show_frame(self, page_name):
-        frame = self.frames[page_name]
+        """Raise a page of the selected vehicle (building it if needed) and drive the on_hide/on_show lifecycle"""
+        key = (self.session.name, page_name)
+        if key == self.current_page:
+            return
+        frame = self.get_page(page_name)
+        if self.current_page is not None:
+            previous = self.frames[self.current_page]
+            if hasattr(previous, "on_hide"):
+                previous.on_hide()
         frame.tkraise()
+        self.current_page = key
+        if hasattr(frame, "on_show"):
+            frame.on_show()
 
 
 if __name__ == "__main__":
-    app = MainApp()
+    startup_timer = StartupTimer(STARTUP_BEGIN)
+    startup_timer.mark("imports")
+    app = MainApp(startup_timer)
     app.mainloop()
+    app.scheduler.report()
@@ -0,0 +1,85 @@
+# mat_import.py
+# Reads the variables of a .mat file that match configuration parameters; safe to run from a worker thread.
+import numpy as np
+
+HDF5_MAT_VERSION = 2  # Major version scipy reports for v7.3 (HDF5-based) MAT files
+HDF5_INTERNAL_PREFIX = "#"  # MATLAB's own groups in v7.3 files (#refs#, #subsystem#)
+
+
+def plain_value(array):
+    """Flatten a loaded array to a list (the expensive part of an import, kept off the UI thread)"""
+    return np.asarray(array).ravel().tolist()
+
+
+def read_mat_variables(path, wanted, progress=None):
+    """Read the variables named in wanted from a .mat file without loading the others.
+
+    v4-v7 files are listed with whosmat and the selected variables loaded in one pass;
+    v7.3 files are read with h5py (optional dependency). Values come back
+    flattened to lists. progress(fraction, message) reports the steps of the import.
+    Returns ({name: list}, [names in the file that don't match], [names that couldn't be read]).
+    """
+    import scipy.io  # Deferred: only needed for .mat imports and slow to load
+    from scipy.io.matlab import matfile_version
+
+    with open(path, "rb") as f:
+        major, _ = matfile_version(f)
+    if major == HDF5_MAT_VERSION:
+        return _read_hdf5_variables(path, wanted, progress)
+
+    names = [name for name, _shape, _class in scipy.io.whosmat(path) if not name.startswith("__")]
+    selected = [name for name in names if name in wanted]
+    unmatched = [name for name in names if name not in wanted]
+    variables, unreadable = {}, []
+    if not selected:
+        return variables, unmatched, unreadable
+    if progress is not None:
+        progress(0.0, f"Reading {len(selected)} variables")
+    loaded = scipy.io.loadmat(path, variable_names=selected)  # One parse of the file for all of them
+    for i, name in enumerate(selected):
+        if progress is not None:
+            progress(0.5 + 0.5 * i / len(selected), f"Converting {name} ({i + 1}/{len(selected)})")
+        value = loaded.get(name)
+        if value is None or value.dtype.kind not in "biufU":
+            unreadable.append(name)  # Structs and cells have no configuration counterpart
+            continue
+        variables[name] = plain_value(value)
+    return variables, unmatched, unreadable
+
+
+def _read_hdf5_variables(path, wanted, progress):
+    try:
+        import h5py
+    except ImportError:
+        raise RuntimeError("This is a v7.3 (HDF5) MAT file; install h5py to import it")
+
+    variables, unreadable = {}, []
+    with h5py.File(path, "r") as f:
+        names = [name for name in f.keys() if not name.startswith(HDF5_INTERNAL_PREFIX)]
+        selected = [name for name in names if name in wanted]
+        unmatched = [name for name in names if name not in wanted]
+        for i, name in enumerate(selected):
+            if progress is not None:
+                progress(i / len(selected), f"Reading {name} ({i + 1}/{len(selected)})")
+            dataset = f[name]
+            if not isinstance(dataset, h5py.Dataset):
+                unreadable.append(name)  # Structs are groups
+                continue
+            matlab_class = dataset.attrs.get("MATLAB_class", b"double")
+            if isinstance(matlab_class, bytes):
+                matlab_class = matlab_class.decode()
+            if dataset.attrs.get("MATLAB_empty", 0):
+                variables[name] = []  # Empty arrays store their dimensions as data
+                continue
+            data = dataset[()]
+            if data.dtype.kind not in "biuf":
+                unreadable.append(name)  # Cells (object references) and complex values
+                continue
+            data = data.T  # HDF5 holds MATLAB's column-major arrays with the dimensions reversed
+            if matlab_class == "char":
+                variables[name] = ["".join(chr(c) for c in row) for row in np.atleast_2d(data)]
+            elif matlab_class == "logical":
+                variables[name] = plain_value(data.astype(bool))
+            else:
+                variables[name] = plain_value(data)
+    return variables, unmatched, unreadable
@@ -0,0 +1,250 @@
+# matrix_editor.py
+# Table editor for vector and matrix configuration parameters.
+import tkinter as tk
+from tkinter import ttk, messagebox
+import numpy as np
+
+VISIBLE_ROWS = 20  # Entry widgets are created for this window only and reused while scrolling
+VISIBLE_COLUMNS = 10
+CELL_WIDTH = 10
+
+
+def as_matrix(value):
+    """NumPy array of a list parameter; raises ValueError if it isn't a numeric vector or matrix"""
+    try:
+        array = np.array(value)
+    except ValueError:
+        raise ValueError("rows have different lengths")
+    if array.dtype.kind not in "biuf" or array.ndim not in (1, 2) or array.size == 0:
+        raise ValueError("only non-empty numeric vectors and matrices can be edited")
+    return array
+
+
+def shape_text(value):
+    """Shape of a list parameter for display, e.g. 6 or 4x8, without converting it"""
+    if value and isinstance(value[0], (list, tuple)):
+        return f"{len(value)}x{len(value[0])}"
+    return str(len(value))
+
+
+def parse_numbers(tokens):
+    """Float array from a list of strings; raises ValueError naming the first bad tokens"""
+    tokens = np.asarray(tokens, dtype=str)
+    try:
+        return tokens.astype(float)
+    except ValueError:
+        bad = [i for i, token in enumerate(tokens) if not _is_number(token)]
+        raise ValueError(f"{len(bad)} invalid value(s), first at element {bad[0]}: {str(tokens[bad[0]])!r}")
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def validate(values, integer):
+    """Vectorized checks of an edited array; returns a list of problems (empty if valid)"""
+    problems = []
+    not_finite = np.flatnonzero(~np.isfinite(values))
+    if len(not_finite):
+        problems.append(f"{len(not_finite)} value(s) are not finite, first at element {not_finite[0]}")
+    if integer:
+        fractional = np.flatnonzero(np.isfinite(values) & (values != np.round(values)))
+        if len(fractional):
+            problems.append(f"{len(fractional)} value(s) must be integers, first at element {fractional[0]}")
+    return problems
+
+
+class MatrixEditor(tk.Toplevel):
+    """Edits a list parameter (flat vector or list of rows) as a table backed by a NumPy array.
+
+    Raises ValueError (before creating the window) for values as_matrix rejects.
+    Only a VISIBLE_ROWS x VISIBLE_COLUMNS window of Entry widgets exists; scrolling
+    reloads them from the array, so size doesn't affect responsiveness.
+    on_apply(new_value) receives the edited value as a list with the original nesting.
+    """
+    def __init__(self, parent, title, value, on_apply):
+        original = as_matrix(value)
+        super().__init__(parent)
+        self.title(title)
+        self.on_apply = on_apply
+        self.dtype = original.dtype
+        self.integer = original.dtype.kind in "biu"
+        self.shape = original.shape
+        self.values = original.astype(float).ravel()
+        self.invalid = {}  # Element index -> text that didn't parse
+        # Display layout: matrices keep their columns, vectors wrap at a chosen width
+        self.columns = self.shape[1] if len(self.shape) == 2 else 1
+        self.row_offset = 0
+        self.column_offset = 0
+
+        toolbar = tk.Frame(self)
+        toolbar.pack(side="top", fill="x", padx=5, pady=5)
+        tk.Label(toolbar, text=f"Shape {'x'.join(str(n) for n in self.shape)}, {'int' if self.integer else 'float'}").pack(side="left")
+        if len(self.shape) == 1:
+            tk.Label(toolbar, text="Columns:").pack(side="left", padx=(10, 2))
+            self.columns_var = tk.IntVar(value=self.columns)
+            tk.Spinbox(toolbar, from_=1, to=max(1, len(self.values)), width=5, textvariable=self.columns_var,
+                       command=self.change_columns).pack(side="left")
+        tk.Button(toolbar, text="Paste", command=self.paste).pack(side="left", padx=5)
+        tk.Button(toolbar, text="Apply", command=self.apply).pack(side="right", padx=5)
+        tk.Button(toolbar, text="Cancel", command=self.destroy).pack(side="right")
+
+        table = tk.Frame(self)
+        table.pack(side="top", fill="both", expand=True, padx=5, pady=5)
+        self.column_labels = [tk.Label(table, width=CELL_WIDTH) for _ in range(VISIBLE_COLUMNS)]
+        for c, label in enumerate(self.column_labels):
+            label.grid(row=0, column=c + 1)
+        self.row_labels = [tk.Label(table, width=6, anchor="e") for _ in range(VISIBLE_ROWS)]
+        self.cells = []
+        for r in range(VISIBLE_ROWS):
+            self.row_labels[r].grid(row=r + 1, column=0)
+            row_cells = []
+            for c in range(VISIBLE_COLUMNS):
+                entry = tk.Entry(table, width=CELL_WIDTH)
+                entry.grid(row=r + 1, column=c + 1)
+                entry.bind("<FocusOut>", lambda e, r=r, c=c: self.commit_cell(r, c))
+                entry.bind("<Return>", lambda e, r=r, c=c: self.commit_cell(r, c))
+                row_cells.append(entry)
+            self.cells.append(row_cells)
+        self.entry_background = self.cells[0][0].cget("background")
+
+        self.vscroll = ttk.Scrollbar(table, orient="vertical", command=self.on_vscroll)
+        self.vscroll.grid(row=1, column=VISIBLE_COLUMNS + 1, rowspan=VISIBLE_ROWS, sticky="ns")
+        self.hscroll = ttk.Scrollbar(table, orient="horizontal", command=self.on_hscroll)
+        self.hscroll.grid(row=VISIBLE_ROWS + 1, column=1, columnspan=VISIBLE_COLUMNS, sticky="ew")
+        self.bind("<MouseWheel>", lambda e: self.scroll_rows(-1 if e.delta > 0 else 1))
+        self.bind("<Button-4>", lambda e: self.scroll_rows(-1))
+        self.bind("<Button-5>", lambda e: self.scroll_rows(1))
+        self.refresh()
+
+    @property
+    def total_rows(self):
+        return -(-len(self.values) // self.columns)
+
+    def index(self, r, c):
+        """Array index shown in visible cell (r, c), or None if outside the data"""
+        row, column = self.row_offset + r, self.column_offset + c
+        i = row * self.columns + column
+        return i if column < self.columns and i < len(self.values) else None
+
+    def refresh(self):
+        """Reload the visible window of cells from the array"""
+        for c, label in enumerate(self.column_labels):
+            column = self.column_offset + c
+            label.config(text=str(column) if column < self.columns else "")
+        for r in range(VISIBLE_ROWS):
+            row = self.row_offset + r
+            self.row_labels[r].config(text=str(row) if row < self.total_rows else "")
+            for c in range(VISIBLE_COLUMNS):
+                entry = self.cells[r][c]
+                i = self.index(r, c)
+                entry.config(state=tk.NORMAL)
+                entry.delete(0, tk.END)
+                if i is None:
+                    entry.config(state=tk.DISABLED, background=self.entry_background)
+                    continue
+                if i in self.invalid:
+                    entry.insert(0, self.invalid[i])
+                    entry.config(background="salmon")
+                else:
+                    value = self.values[i]
+                    entry.insert(0, str(int(value)) if self.integer and value == int(value) else f"{value:.6g}")
+                    entry.config(background=self.entry_background)
+        rows, columns = max(1, self.total_rows), max(1, self.columns)
+        self.vscroll.set(self.row_offset / rows, min(1.0, (self.row_offset + VISIBLE_ROWS) / rows))
+        self.hscroll.set(self.column_offset / columns, min(1.0, (self.column_offset + VISIBLE_COLUMNS) / columns))
+
+    def commit_cell(self, r, c):
+        """Parse one edited cell into the array"""
+        i = self.index(r, c)
+        if i is None:
+            return
+        text = self.cells[r][c].get()
+        try:
+            self.values[i] = float(text)
+            self.invalid.pop(i, None)
+            self.cells[r][c].config(background=self.entry_background)
+        except ValueError:
+            self.invalid[i] = text
+            self.cells[r][c].config(background="salmon")
+
+    def commit_visible(self):
+        for r in range(VISIBLE_ROWS):
+            for c in range(VISIBLE_COLUMNS):
+                if self.index(r, c) is not None:
+                    self.commit_cell(r, c)
+
+    def scroll_rows(self, delta):
+        self.set_offsets(self.row_offset + delta, self.column_offset)
+
+    def set_offsets(self, row_offset, column_offset):
+        row_offset = max(0, min(row_offset, self.total_rows - VISIBLE_ROWS))
+        column_offset = max(0, min(column_offset, self.columns - VISIBLE_COLUMNS))
+        if (row_offset, column_offset) != (self.row_offset, self.column_offset):
+            self.commit_visible()
+            self.row_offset, self.column_offset = row_offset, column_offset
+            self.refresh()
+
+    def _scroll_target(self, args, offset, total, page):
+        if args[0] == "moveto":
+            return int(float(args[1]) * total)
+        step = int(args[1])
+        return offset + (step * page if args[2] == "pages" else step)
+
+    def on_vscroll(self, *args):
+        self.set_offsets(self._scroll_target(args, self.row_offset, self.total_rows, VISIBLE_ROWS), self.column_offset)
+
+    def on_hscroll(self, *args):
+        self.set_offsets(self.row_offset, self._scroll_target(args, self.column_offset, self.columns, VISIBLE_COLUMNS))
+
+    def change_columns(self):
+        self.commit_visible()
+        try:
+            self.columns = max(1, int(self.columns_var.get()))
+        except (tk.TclError, ValueError):
+            return
+        self.row_offset = self.column_offset = 0
+        self.refresh()
+
+    def paste(self):
+        """Replace the whole array with clipboard text (rows on lines, values separated by spaces, commas or tabs)"""
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            messagebox.showwarning("Paste", "The clipboard is empty.", parent=self)
+            return
+        lines = [line.replace(",", " ").replace(";", " ").split() for line in text.strip().splitlines()]
+        lines = [line for line in lines if line]
+        try:
+            pasted = parse_numbers([token for line in lines for token in line])
+        except ValueError as e:
+            messagebox.showerror("Paste", str(e), parent=self)
+            return
+        if len(pasted) != len(self.values):
+            messagebox.showerror("Paste", f"Expected {len(self.values)} values, the clipboard holds {len(pasted)}.", parent=self)
+            return
+        if len(self.shape) == 2 and any(len(line) != self.shape[1] for line in lines) and len(lines) != 1:
+            messagebox.showerror("Paste", f"Expected {self.shape[0]} rows of {self.shape[1]} values.", parent=self)
+            return
+        self.values = pasted
+        self.invalid.clear()
+        self.refresh()
+
+    def apply(self):
+        self.commit_visible()
+        if self.invalid:
+            first = min(self.invalid)
+            messagebox.showerror("Invalid values", f"{len(self.invalid)} cell(s) are not numbers, first at element {first}: "
+                                 f"{self.invalid[first]!r}", parent=self)
+            return
+        problems = validate(self.values, self.integer)
+        if problems:
+            messagebox.showerror("Invalid values", "\n".join(problems), parent=self)
+            return
+        values = self.values.reshape(self.shape)
+        self.on_apply((values.astype(self.dtype) if self.integer else values).tolist())
+        self.destroy()
@@ -1,26 +1,27 @@
 # mqtt_config_page.py
 import tkinter as tk
-from mqtt_handler import initialize_mqtt, MQTT_BROKER, MQTT_TOPIC_CONFIG, MQTT_TOPIC_COMMANDS, MQTT_TOPIC_AXES, MQTT_TOPIC_STATUS, MQTT_TOPIC_ARM
+from mqtt_handler import get_default_session
 
 class MQTTConfigPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
+        self.session = session or get_default_session()
 
         # Default values
-        default_broker = MQTT_BROKER
-        default_topic_config = MQTT_TOPIC_CONFIG
-        default_topic_commands = MQTT_TOPIC_COMMANDS
-        default_topic_axes = MQTT_TOPIC_AXES
-        default_topic_status = MQTT_TOPIC_STATUS
-        default_topic_arm = MQTT_TOPIC_ARM
+        default_broker = self.session.brokers
+        default_topic_config = self.session.topic_config
+        default_topic_commands = self.session.topic_commands
+        default_topic_axes = self.session.topic_axes
+        default_topic_status = self.session.topic_status
+        default_topic_arm = self.session.topic_arm
 
         tk.Label(self, text="MQTT Broker:").grid(row=0, column=0, padx=10, pady=10)
         self.broker_entry_1 = tk.Entry(self)
-        self.broker_entry_1.insert(0, default_broker[0])  # Set default value
+        self.broker_entry_1.insert(0, default_broker[0] if default_broker else "")  # Set default value
         self.broker_entry_1.grid(row=0, column=1, padx=10, pady=10)
         self.broker_entry_2 = tk.Entry(self)
-        self.broker_entry_2.insert(0, default_broker[1])  # Set default value
+        self.broker_entry_2.insert(0, default_broker[1] if len(default_broker) > 1 else "")  # Fallback is optional
         self.broker_entry_2.grid(row=0, column=2, padx=10, pady=10)
 
         tk.Label(self, text="MQTT Topic Config:").grid(row=1, column=0, padx=10, pady=10)
@@ -56,9 +57,8 @@ class MQTTConfigPage(tk.Frame):
         #self.save_and_connect()
 
     def save_and_connect(self):
-        broker = list()
-        broker.append(self.broker_entry_1.get())
-        broker.append(self.broker_entry_2.get())
+        # An empty fallback entry means a single-broker vehicle
+        broker = [address.strip() for address in (self.broker_entry_1.get(), self.broker_entry_2.get()) if address.strip()]
         topic_config = self.topic_config_entry.get()
         topic_commands = self.topic_commands_entry.get()
         topic_axes = self.topic_axes_entry.get()
@@ -66,11 +66,16 @@ class MQTTConfigPage(tk.Frame):
         topic_arm = self.topic_arm_entry.get()
 
         try:
-            res = initialize_mqtt(broker, topic_config, topic_commands, topic_axes, topic_status, topic_arm)
+            self.session.brokers = broker
+            self.session.set_topics(topic_config, topic_commands, topic_axes, topic_status, topic_arm)
+            res = self.session.connect()
         except (TimeoutError, ConnectionRefusedError):
             self.connect_output_label.config(text="Failed to connect to MQTT broker", fg="red")
+            return
             
         if res == 0:
             self.connect_output_label.config(text=f"Connected successfully to MQTT broker {broker[0]}", fg="green")
         elif res == 10:
-            self.connect_output_label.config(text=f"Connected successfully to MQTT broker {broker[1]}", fg="green")
\ No newline at end of file
+            self.connect_output_label.config(text=f"Connected successfully to MQTT broker {broker[1]}", fg="green")
+        else:
+            self.connect_output_label.config(text="Failed to connect to MQTT broker", fg="red")
\ No newline at end of file
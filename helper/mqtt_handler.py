@@ -1,15 +1,11 @@
 import paho.mqtt.client as mqtt
+import collections
 import json
 import threading
 import os
+import time
 from datetime import datetime
 
-# Global MQTT client
-mqtt_client = None
-mqtt_callbacks = []
-connection_callbacks = []  # New: callbacks for connection status changes
-mqtt_connected = False  # New: track connection status
-
 # MQTT settings with default values
 MQTT_BROKER = ["10.0.0.254", "127.0.0.1"]
 MQTT_TOPIC_CONFIG = "config/"
@@ -19,103 +15,260 @@ MQTT_TOPIC_STATUS = "status/"
 MQTT_TOPIC_ARM = "arm_commands/"
 MQTT_TOPIC_LOG = "log/"
 
-def initialize_mqtt(broker, topic_config, topic_commands, topic_axes, topic_status, topic_arm):
-    global mqtt_client, MQTT_BROKER, MQTT_TOPIC_CONFIG, MQTT_TOPIC_COMMANDS, MQTT_TOPIC_AXES, MQTT_TOPIC_STATUS, MQTT_TOPIC_ARM
-    MQTT_BROKER = broker
-    MQTT_TOPIC_CONFIG = topic_config
-    MQTT_TOPIC_COMMANDS = topic_commands
-    MQTT_TOPIC_AXES = topic_axes
-    MQTT_TOPIC_STATUS = topic_status
-    MQTT_TOPIC_ARM = topic_arm
-
-    if mqtt_client is not None:
-        mqtt_client.disconnect()
-        notify_connection_status(False)
-
-    mqtt_client = mqtt.Client()
-    mqtt_client.on_connect = on_connect
-    mqtt_client.on_message = on_message
-    mqtt_client.on_disconnect = on_disconnect  # New: handle disconnection events
-    
-    try:
-        result = mqtt_client.connect(broker[0], 1883, 60)
-    except:
-        print(f"Failed to connect to {broker[0]}, trying {broker[1]}")
-        try:
-            result = mqtt_client.connect(broker[1], 1883, 60)
-            result += 10
-        except:
-            print(f"Failed to connect to both MQTT brokers")
-            notify_connection_status(False)
+# Vehicles the helper connects to, overridable with vehicles.json next to this file:
+# [{"name": ..., "brokers": [primary, fallback], "topic_prefix": ...}, ...]
+VEHICLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vehicles.json")
+DEFAULT_VEHICLES = [{"name": "ROV", "brokers": MQTT_BROKER, "topic_prefix": ""}]
+
+# Last decoded message on a topic: arrival time (time.time()) and the session-wide sequence number
+CachedMessage = collections.namedtuple("CachedMessage", ["message", "timestamp", "seq"])
+
+
+class MQTTSession:
+    """One connection to a vehicle's broker with its own topic namespace, dispatch and state cache.
+
+    Each session runs its own paho network thread, so a busy stream only delays
+    its own callbacks.
+    """
+    def __init__(self, name, brokers=MQTT_BROKER, topic_prefix=""):
+        self.configure(name, brokers, topic_prefix)
+        self.client = None
+        self.connected = False
+        self.callbacks = []
+        # Callback -> live messages held back while its replay runs, delivered after it in order
+        self.replaying = {}
+        self.connection_callbacks = []
+        self.last_messages = {}  # Topic -> CachedMessage, replayed to callbacks registered later
+        self.seq = 0
+        # Guards callbacks, cache and seq; never held while a callback runs, since callbacks
+        # may wait on the Tk thread, which registers callbacks itself
+        self.lock = threading.RLock()
+
+    def configure(self, name, brokers, topic_prefix=""):
+        """Set the vehicle name, broker addresses and the prefix put in front of every topic"""
+        self.name = name
+        self.brokers = list(brokers)
+        self.set_topics(
+            topic_prefix + MQTT_TOPIC_CONFIG,
+            topic_prefix + MQTT_TOPIC_COMMANDS,
+            topic_prefix + MQTT_TOPIC_AXES,
+            topic_prefix + MQTT_TOPIC_STATUS,
+            topic_prefix + MQTT_TOPIC_ARM,
+            topic_prefix + MQTT_TOPIC_LOG,
+        )
+
+    def set_topics(self, topic_config, topic_commands, topic_axes, topic_status, topic_arm, topic_log=None):
+        self.topic_config = topic_config
+        self.topic_commands = topic_commands
+        self.topic_axes = topic_axes
+        self.topic_status = topic_status
+        self.topic_arm = topic_arm
+        if topic_log is not None:
+            self.topic_log = topic_log
+
+    def connect(self):
+        """Connect to the first reachable broker. Returns 10 * the broker's index (0 for the primary,
+        10 for the fallback) plus paho's result code, or -1 on failure."""
+        if self.client is not None:
+            self.client.disconnect()
+            self.notify_connection_status(False)
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.on_disconnect = self.on_disconnect
+
+        result = -1
+        for i, broker in enumerate(self.brokers):
+            try:
+                result = self.client.connect(broker, 1883, 60) + 10 * i
+                break
+            except:
+                print(f"[{self.name}] Failed to connect to {broker}")
+        if result < 0:
+            print(f"[{self.name}] Failed to connect to {'any configured MQTT broker' if self.brokers else 'an MQTT broker: none configured'}")
+            self.notify_connection_status(False)
             return -1
 
-    mqtt_thread = threading.Thread(target=mqtt_client.loop_forever)
-    mqtt_thread.daemon = True
-    mqtt_thread.start()
-
-    mqtt_client.subscribe(MQTT_TOPIC_CONFIG)
-    mqtt_client.subscribe(MQTT_TOPIC_LOG)
-    mqtt_client.subscribe(MQTT_TOPIC_STATUS)
-    mqtt_client.subscribe(MQTT_TOPIC_COMMANDS)
-    return result
-
-def on_connect(client, userdata, flags, rc):
-    global mqtt_connected
-    if rc == 0:
-        print("Connected successfully to MQTT broker!")
-        mqtt_connected = True
-        notify_connection_status(True)
-    else:
-        print(f"Failed to connect, return code {rc}")
-        mqtt_connected = False
-        notify_connection_status(False)
-
-def on_disconnect(client, userdata, rc):
-    global mqtt_connected
-    print(f"Disconnected from MQTT broker with code {rc}")
-    mqtt_connected = False
-    notify_connection_status(False)
+        mqtt_thread = threading.Thread(target=self.client.loop_forever, name=f"mqtt-{self.name}")
+        mqtt_thread.daemon = True
+        mqtt_thread.start()
+        return result
 
-def notify_connection_status(status):
-    """Notify all registered callbacks about connection status changes"""
-    for callback in connection_callbacks:
+    def disconnect(self):
+        if self.client is not None:
+            self.client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print(f"[{self.name}] Connected successfully to MQTT broker!")
+            # Subscribed here so the subscriptions come back after paho reconnects
+            for topic in (self.topic_config, self.topic_log, self.topic_status, self.topic_commands):
+                client.subscribe(topic)
+            self.connected = True
+            self.notify_connection_status(True)
+        else:
+            print(f"[{self.name}] Failed to connect, return code {rc}")
+            self.connected = False
+            self.notify_connection_status(False)
+
+    def on_disconnect(self, client, userdata, rc):
+        print(f"[{self.name}] Disconnected from MQTT broker with code {rc}")
+        self.connected = False
+        self.notify_connection_status(False)
+
+    def notify_connection_status(self, status):
+        """Notify all registered callbacks about connection status changes"""
+        for callback in list(self.connection_callbacks):
+            try:
+                callback(status)
+            except Exception as e:
+                print(f"Error in connection status callback: {e}")
+
+    def register_connection_callback(self, callback):
+        """Register a callback function that accepts a boolean connected parameter"""
+        self.connection_callbacks.append(callback)
+        # Immediately notify about current status
+        if self.client is not None:
+            callback(self.connected)
+
+    def on_message(self, client, userdata, msg):
+        try:
+            message = json.loads(msg.payload.decode('utf-8'))
+        except json.JSONDecodeError:
+            if msg.topic == self.topic_log:
+                message = msg.payload.decode('utf-8')
+            else:
+                print(f"[{self.name}] Failed to decode JSON message")
+                return
+        self.dispatch(message, msg.topic)
+
+    def dispatch(self, message, topic):
+        """Cache the message and hand it to every registered callback"""
+        with self.lock:
+            self.seq += 1
+            self.last_messages[topic] = CachedMessage(message, time.time(), self.seq)
+            callbacks = []
+            for callback in self.callbacks:
+                held = self.replaying.get(callback)
+                if held is not None:
+                    held.append((message, topic))
+                else:
+                    callbacks.append(callback)
+        for callback in callbacks:
+            self.call(callback, message, topic)
+
+    def call(self, callback, message, topic):
         try:
-            callback(status)
+            callback(message, topic)
         except Exception as e:
-            print(f"Error in connection status callback: {e}")
+            print(f"[{self.name}] Error in MQTT callback: {e}")
 
-def register_connection_callback(callback):
-    """Register a callback function that accepts a boolean connected parameter"""
-    connection_callbacks.append(callback)
-    # Immediately notify about current status
-    if mqtt_client is not None:
-        callback(mqtt_connected)
+    def last_message(self, topic):
+        """CachedMessage for the topic, or None if nothing arrived yet"""
+        with self.lock:
+            return self.last_messages.get(topic)
 
-def on_message(client, userdata, msg):
-    try:
-        message = json.loads(msg.payload.decode('utf-8'))
-        for callback in mqtt_callbacks:
-            callback(message, msg.topic)
-    except json.JSONDecodeError:
-        if msg.topic == MQTT_TOPIC_LOG:
-            message = msg.payload.decode('utf-8')
-            for callback in mqtt_callbacks:
-                callback(message, msg.topic)
+    def register_callback(self, callback, replay=True):
+        """
+        Register a callback function that accepts (message, topic) parameters.
+        With replay, it is called right away with the cached last message of every topic, oldest first.
+        log/ lines are events rather than state and aren't replayed. Live messages arriving during
+        the replay are held back and delivered after it, on the registering thread, so the callback
+        never runs on two threads at once and never sees a cached message after a newer one.
+        """
+        with self.lock:
+            self.callbacks.append(callback)
+            if not replay:
+                return
+            cached_messages = sorted(self.last_messages.items(), key=lambda item: item[1].seq)
+            self.replaying[callback] = held = collections.deque()
+        for topic, cached in cached_messages:
+            if topic != self.topic_log:
+                self.call(callback, cached.message, topic)
+        while True:
+            with self.lock:
+                if not held:
+                    del self.replaying[callback]  # Later messages go straight from dispatch
+                    return
+                message, topic = held.popleft()
+            self.call(callback, message, topic)
+
+    def unregister_callback(self, callback):
+        with self.lock:
+            self.callbacks.remove(callback)
+            if callback in self.replaying:
+                self.replaying[callback].clear()
+
+    def send_message(self, topic, payload):
+        if self.client is not None:
+            self.client.publish(topic, json.dumps(payload))
+            print(f"[{self.name}] Sent to {topic}: {payload}")
         else:
-            print("Failed to decode JSON message")
+            print(f"[{self.name}] MQTT client is not initialized")
+
+
+def load_vehicles(path=VEHICLES_FILE):
+    """Vehicle definitions from vehicles.json if present, otherwise DEFAULT_VEHICLES"""
+    if not os.path.exists(path):
+        return DEFAULT_VEHICLES
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read vehicles from {path}, using defaults: {e}")
+        return DEFAULT_VEHICLES
+
+
+# Session used by the module-level functions below (the first vehicle)
+default_session = MQTTSession("ROV")
+
+
+def get_default_session():
+    return default_session
+
+
+def create_sessions(vehicles):
+    """One session per vehicle definition; the first one is the default session"""
+    sessions = []
+    for i, vehicle in enumerate(vehicles):
+        session = default_session if i == 0 else MQTTSession(vehicle["name"])
+        session.configure(vehicle["name"], vehicle.get("brokers", MQTT_BROKER), vehicle.get("topic_prefix", ""))
+        sessions.append(session)
+    return sessions
+
+
+def find_session(sessions, name=None):
+    """The session of the named vehicle, or the first one without a name; raises ValueError for
+    an unknown name rather than falling back to another vehicle"""
+    if not name:
+        return sessions[0]
+    for session in sessions:
+        if session.name == name:
+            return session
+    raise ValueError(f"unknown vehicle {name}; known: {', '.join(session.name for session in sessions)}")
+
+
+def initialize_mqtt(broker, topic_config, topic_commands, topic_axes, topic_status, topic_arm):
+    """Reconfigure and connect the default session"""
+    default_session.brokers = list(broker)
+    default_session.set_topics(topic_config, topic_commands, topic_axes, topic_status, topic_arm)
+    return default_session.connect()
+
+def notify_connection_status(status):
+    default_session.notify_connection_status(status)
+
+def register_connection_callback(callback):
+    default_session.register_connection_callback(callback)
 
-def register_callback(callback):
+def register_callback(callback, replay=True):
     """
     Register a callback function that accepts (message, topic) parameters.
     """
-    mqtt_callbacks.append(callback)
+    default_session.register_callback(callback, replay)
 
 def unregister_callback(callback):
-    mqtt_callbacks.remove(callback)
+    default_session.unregister_callback(callback)
 
 def mqtt_send_message(topic, payload):
-    if mqtt_client is not None:
-        mqtt_client.publish(topic, json.dumps(payload))
-        print(f"Sent to {topic}: {payload}")
-    else:
-        print("MQTT client is not initialized")
\ No newline at end of file
+    default_session.send_message(topic, payload)
@@ -0,0 +1,294 @@
+# param_sweep.py
+# Automated controller tuning: sends each candidate parameter set, steps the depth
+# reference through state_commands/, records the response and ranks the candidates.
+#
+#   python param_sweep.py --simulate --grid DEPTH_CONTROLLER.Kp=40,60,80 --grid DEPTH_CONTROLLER.Kd=20,40
+#   python param_sweep.py --vehicle ROV --sets candidates.json --start-depth 1.0 --step 0.5 --output sweep.csv
+#
+# candidates.json is a list of {"SECTION.key": value, ...} parameter sets.
+import argparse
+import csv
+import itertools
+import json
+import threading
+import time
+import numpy as np
+from config_model import ConfigModel, parse_text
+from mqtt_handler import create_sessions, find_session, load_vehicles
+from rov_simulator import RovSimulator, STATUS_RATE_HZ
+from status_schema import NUMERIC_INDEX, extract_row
+
+ACK_TIMEOUT_S = 5.0  # Same limit as the Config page
+CONNECT_TIMEOUT_S = 5.0
+SETTLING_BAND = 0.02  # Settling time: last exit from +-2 % of the step
+METRICS = ("iae", "itae", "overshoot_pct", "rise_time", "settling_time", "effort")
+SAMPLE_COLUMNS = ("depth", "reference_z", "force_z")
+
+
+def parse_grid(specs):
+    """["SECTION.key=v1,v2", ...] -> list of {path string: value text}, the cartesian product"""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Expected SECTION.key=value1,value2,... got {spec!r}")
+        axes.append([(name.strip(), value.strip()) for value in values.split(",")])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+
+def load_sets(path):
+    with open(path) as f:
+        sets = json.load(f)
+    if not isinstance(sets, list) or not all(isinstance(s, dict) for s in sets):
+        raise ValueError(f"{path} should hold a list of {{\"SECTION.key\": value}} objects")
+    return sets
+
+
+def score_step(samples, start, target):
+    """Step response metrics of an (n, 4) array of time, depth, reference_z, force_z"""
+    t = samples[:, 0] - samples[0, 0]
+    depth = samples[:, 1]
+    force = samples[:, 3]
+    error = np.abs(target - depth)
+    progress = (depth - start) / (target - start)  # 0 at the start depth, 1 at the target
+    duration = t[-1] if len(t) > 1 else np.nan
+
+    def first_time(mask):
+        index = np.flatnonzero(mask)
+        return t[index[0]] if len(index) else np.nan
+
+    outside = np.flatnonzero(np.abs(progress - 1.0) > SETTLING_BAND)
+    if not len(outside):
+        settling_time = 0.0
+    elif outside[-1] == len(t) - 1:
+        settling_time = np.nan  # Still outside the band at the end of the window
+    else:
+        settling_time = t[outside[-1] + 1]
+    return {
+        "iae": np.trapezoid(error, t),
+        "itae": np.trapezoid(t * error, t),
+        "overshoot_pct": max(0.0, np.max(progress) - 1.0) * 100,
+        "rise_time": first_time(progress >= 0.9) - first_time(progress >= 0.1),
+        "settling_time": settling_time,
+        "effort": np.trapezoid(np.abs(force), t) / duration,
+    }
+
+
+class SimulatorBackend:
+    """Runs the candidates on an in-process RovSimulator, faster than real time"""
+    def __init__(self, simulator, rate=STATUS_RATE_HZ):
+        self.simulator = simulator
+        self.period = 1.0 / rate
+
+    def config(self):
+        return self.simulator.model.to_nested()
+
+    def apply(self, patch):
+        return not self.simulator.apply_config(patch)
+
+    def set_reference(self, depth):
+        self.simulator.handle_command({"DEPTH_REFERENCE_UPDATE": depth})
+
+    def run(self, duration):
+        rows = []
+        for _ in range(int(round(duration / self.period))):
+            self.simulator.run(self.period)
+            rows.append((self.simulator.t, *_sample(extract_row(self.simulator.status_message()))))
+        return np.array(rows)
+
+
+class MqttBackend:
+    """Runs the candidates on a vehicle (or rov_simulator.py) through its MQTT session"""
+    def __init__(self, session):
+        self.session = session
+        self.condition = threading.Condition()
+        self.configs = []  # config/ documents received since the last request
+        self.recording = None  # (arrival, sample) while run() records
+        session.register_callback(self.on_message, replay=False)
+
+    def connect(self):
+        if self.session.connect() < 0:
+            return False
+        deadline = time.time() + CONNECT_TIMEOUT_S
+        while not self.session.connected and time.time() < deadline:
+            time.sleep(0.1)
+        return self.session.connected
+
+    def on_message(self, message, topic):
+        if topic == self.session.topic_config and isinstance(message, dict):
+            with self.condition:
+                self.configs.append(message)
+                self.condition.notify_all()
+        elif topic == self.session.topic_status and isinstance(message, dict):
+            recording = self.recording
+            if recording is not None:
+                recording.append((time.time(), *_sample(extract_row(message))))
+
+    def _wait_for_config(self, accept):
+        deadline = time.time() + ACK_TIMEOUT_S
+        with self.condition:
+            while True:
+                for config in self.configs:
+                    if accept(config):
+                        self.configs.clear()
+                        return config
+                self.configs.clear()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def config(self):
+        with self.condition:
+            self.configs.clear()
+        self.session.send_message(self.session.topic_commands, {"REQUEST_CONFIG": 0})
+        return self._wait_for_config(lambda config: True)
+
+    def apply(self, patch):
+        """Send a patch and wait until the vehicle reports every value in it"""
+        expected = ConfigModel.from_nested(patch).values
+        own_echo = [True]  # The broker hands our own publish back once
+
+        def confirms(config):
+            if own_echo[0] and config == patch:
+                own_echo[0] = False
+                return False
+            values = ConfigModel.from_nested(config).values
+            return all(values.get(path) == value for path, value in expected.items())
+
+        with self.condition:
+            self.configs.clear()
+        self.session.send_message(self.session.topic_config, patch)
+        return self._wait_for_config(confirms) is not None
+
+    def set_reference(self, depth):
+        self.session.send_message(self.session.topic_commands, {"DEPTH_REFERENCE_UPDATE": depth})
+
+    def run(self, duration):
+        self.recording = []
+        time.sleep(duration)
+        rows, self.recording = self.recording, None
+        return np.array(rows).reshape(-1, 1 + len(SAMPLE_COLUMNS))
+
+
+def _sample(row):
+    return tuple(row[NUMERIC_INDEX[name]] for name in SAMPLE_COLUMNS)
+
+
+def run_sweep(backend, candidates, start_depth, step, settle_s, window_s):
+    """Apply each candidate, step the reference from start_depth to start_depth + step and score
+    the response. The swept parameters are restored afterwards. Returns one result dict per candidate."""
+    base = backend.config()
+    if base is None:
+        raise RuntimeError("The vehicle didn't report its configuration")
+    model = ConfigModel.from_nested(base)
+    original = dict(model.values)
+
+    # Resolve and type every candidate up front, so a typo fails before anything is sent
+    resolved = []
+    for candidate in candidates:
+        values = {}
+        for name, value in candidate.items():
+            path = tuple(name.split("."))
+            if path not in model:
+                raise ValueError(f"Unknown parameter {name}")
+            values[path] = parse_text(model.kinds[path], str(value))
+        resolved.append((candidate, values))
+    swept = sorted({path for _, values in resolved for path in values}, key=list(original).index)
+
+    results = []
+    target = start_depth + step
+    try:
+        for i, (candidate, values) in enumerate(resolved, start=1):
+            label = ", ".join(f"{name}={value}" for name, value in candidate.items())
+            print(f"[{i}/{len(resolved)}] {label}")
+            for path, value in values.items():
+                model.set(path, value)
+            result = {"candidate": label, **{name: np.nan for name in METRICS}}
+            if not backend.apply(model.to_patch(list(values))):
+                print("  no confirmation from the vehicle, skipped")
+                result["error"] = "not confirmed"
+                results.append(result)
+                continue
+            backend.set_reference(start_depth)
+            backend.run(settle_s)
+            backend.set_reference(target)
+            samples = backend.run(window_s)
+            if len(samples) < 2:
+                print("  no status/ samples recorded")
+                result["error"] = "no samples"
+            else:
+                result.update(score_step(samples, start_depth, target))
+                print("  " + "  ".join(f"{name} {result[name]:.3f}" for name in METRICS))
+            results.append(result)
+    finally:
+        for path in swept:
+            model.set(path, original[path])
+        if swept and not backend.apply(model.to_patch(swept)):
+            print("Warning: the vehicle didn't confirm the restored parameters")
+        backend.set_reference(start_depth)
+    return results
+
+
+def rank(results, metric):
+    """Best first; candidates without a value for metric go last"""
+    return sorted(results, key=lambda result: (np.isnan(result[metric]), result[metric]))
+
+
+def print_table(results, metric):
+    width = max([len("candidate")] + [len(result["candidate"]) for result in results])
+    print(f"\nRanked by {metric}:")
+    print(f"{'#':>3}  {'candidate':<{width}}  " + "  ".join(f"{name:>13}" for name in METRICS))
+    for position, result in enumerate(results, start=1):
+        cells = "  ".join(f"{result[name]:13.3f}" for name in METRICS)
+        print(f"{position:3d}  {result['candidate']:<{width}}  {cells}  {result.get('error', '')}")
+
+
+def write_csv(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "candidate", *METRICS, "error"])
+        for position, result in enumerate(results, start=1):
+            writer.writerow([position, result["candidate"], *(result[name] for name in METRICS), result.get("error", "")])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep controller parameters over depth steps and rank them")
+    parser.add_argument("--grid", action="append", default=[], metavar="SECTION.key=v1,v2",
+                        help="Values of one parameter; several --grid options are combined")
+    parser.add_argument("--sets", help="JSON file with a list of parameter sets (instead of --grid)")
+    parser.add_argument("--simulate", action="store_true", help="Run on the built-in simulator instead of a vehicle")
+    parser.add_argument("--vehicle", help="Vehicle name from vehicles.json (default: the first)")
+    parser.add_argument("--start-depth", type=float, default=0.5, help="Depth held before each step (m)")
+    parser.add_argument("--step", type=float, default=0.5, help="Size of the reference step (m)")
+    parser.add_argument("--settle", type=float, default=10.0, help="Seconds at the start depth before the step")
+    parser.add_argument("--window", type=float, default=15.0, help="Seconds of response recorded after the step")
+    parser.add_argument("--rank", choices=METRICS, default="iae", help="Metric the table is sorted by")
+    parser.add_argument("--output", help="Also write the ranked table to this CSV file")
+    args = parser.parse_args()
+
+    if args.step == 0:
+        parser.error("--step must not be 0: the metrics are relative to the step size")
+    if args.settle <= 0 or args.window <= 0:
+        parser.error("--settle and --window must be positive")
+    candidates = load_sets(args.sets) if args.sets else parse_grid(args.grid)
+    if not candidates or candidates == [{}]:
+        parser.error("give the candidates with --grid or --sets")
+
+    if args.simulate:
+        backend = SimulatorBackend(RovSimulator())
+    else:
+        try:
+            session = find_session(create_sessions(load_vehicles()), args.vehicle)
+        except ValueError as e:
+            parser.error(str(e))
+        backend = MqttBackend(session)
+        if not backend.connect():
+            raise SystemExit(f"Could not connect to {session.name}")
+        print(f"{len(candidates)} candidates, about {len(candidates) * (args.settle + args.window) / 60:.1f} min")
+
+    results = rank(run_sweep(backend, candidates, args.start_depth, args.step, args.settle, args.window), args.rank)
+    print_table(results, args.rank)
+    if args.output:
+        write_csv(args.output, results)
+        print(f"Wrote {args.output}")
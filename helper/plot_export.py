@@ -0,0 +1,44 @@
+# plot_export.py
+# Writes a snapshot of the plot buffers to disk; safe to run from a worker thread.
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from plot_layout import create_plot_axes, update_plot_lines
+
+EXPORT_FORMATS = ("csv", "npz", "png", "svg")
+
+
+def export_snapshot(data, columns, time_window, base_path, formats=EXPORT_FORMATS, dpi=300, progress=None):
+    """Write a (n, n_columns) sample snapshot as <base_path>.<format> for each format.
+
+    Data formats (csv, npz) hold every buffered sample; image formats use an
+    off-screen Agg figure with the same layout as the live plots.
+    progress(fraction, message) is called after each step. Returns the written paths.
+    """
+    def report(done, message):
+        if progress is not None:
+            progress(done / len(formats), message)
+
+    column_index = {name: i for i, name in enumerate(columns)}
+    written = []
+    fig = None
+    for step, fmt in enumerate(formats):
+        path = f"{base_path}.{fmt}"
+        report(step, f"Writing {path}")
+        if fmt == "csv":
+            # %.17g round-trips a float64: epoch timestamps and long relative times keep full resolution
+            np.savetxt(path, data, delimiter=",", header=",".join(columns), comments="", fmt="%.17g")
+        elif fmt == "npz":
+            np.savez_compressed(path, **{name: data[:, i] for name, i in column_index.items()})
+        elif fmt in ("png", "svg"):
+            if fig is None:
+                fig = Figure(figsize=(12, 8), dpi=100)
+                FigureCanvasAgg(fig)
+                axes, lines = create_plot_axes(fig)
+                update_plot_lines(axes, lines, data, column_index, time_window)
+            fig.savefig(path, format=fmt, dpi=dpi)
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        written.append(path)
+    report(len(formats), "Export complete")
+    return written
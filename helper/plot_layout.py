@@ -0,0 +1,72 @@
+# plot_layout.py
+# Figure layout shared by the live plots, the out-of-process renderer and exports.
+# Kept free of tkinter so it can be used from a separate process or off-screen.
+
+from status_schema import NUMERIC_FIELD_NAMES
+
+# Columns of the plot sample buffer: sample time, then every numeric status field
+# (so exports carry the full status record, not just what is drawn)
+PLOT_COLUMNS = ("time",) + NUMERIC_FIELD_NAMES
+
+# One entry per subplot of the 2x3 grid: title, y label and (column, style, label, alpha) lines
+SUBPLOTS = (
+    ("Depth vs Reference", "Depth (m)", (
+        ("depth", "b-", "Depth", 1.0),
+        ("reference_z", "r-", "Reference", 1.0))),
+    ("Pitch vs Reference", "Pitch (deg)", (
+        ("pitch", "b-", "Pitch", 1.0),
+        ("reference_pitch", "r-", "Reference", 1.0))),
+    ("Roll vs Reference", "Roll (deg)", (
+        ("roll", "b-", "Roll", 1.0),
+        ("reference_roll", "r-", "Reference", 1.0))),
+    ("Depth Error Integral & Force", "Value", (
+        ("error_integral_z", "g-", "Error Integral", 1.0),
+        ("force_z", "m-", "Force", 0.7))),
+    ("Pitch Error Integral & Force", "Value", (
+        ("error_integral_pitch", "g-", "Error Integral", 1.0),
+        ("force_pitch", "m-", "Force", 0.7))),
+    ("Roll Error Integral & Force", "Value", (
+        ("error_integral_roll", "g-", "Error Integral", 1.0),
+        ("force_roll", "m-", "Force", 0.7))),
+)
+
+
+def create_plot_axes(fig):
+    """Add the 2x3 subplots to fig and return (axes, lines) where lines maps column -> Line2D"""
+    fig.subplots_adjust(hspace=0.4, wspace=0.3)
+    axes = []
+    lines = {}
+    for i, (title, ylabel, line_specs) in enumerate(SUBPLOTS):
+        ax = fig.add_subplot(2, 3, i + 1)
+        for column, style, label, alpha in line_specs:
+            lines[column], = ax.plot([], [], style, label=label, alpha=alpha)
+        ax.set_title(title)
+        ax.set_xlabel('Time (s)')
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        ax.legend()
+        axes.append(ax)
+    return axes, lines
+
+
+def update_plot_lines(axes, lines, data, column_index, time_window):
+    """Load a (n, n_columns) sample block into the lines and rescale the axes.
+    Returns False if there was nothing to plot."""
+    if len(data) == 0:
+        return False
+    timestamps = data[:, column_index["time"]]
+    for column, line in lines.items():
+        line.set_data(timestamps, data[:, column_index[column]])
+
+    # Adjust x-axis limits
+    if len(timestamps) > 1:
+        x_min = max(0, timestamps[-1] - time_window)
+        x_max = timestamps[-1] + 0.1  # Add a small margin
+        for ax in axes:
+            ax.set_xlim(x_min, x_max)
+
+    # Auto-adjust y-axis limits
+    for ax in axes:
+        ax.relim()
+        ax.autoscale_view()
+    return True
@@ -0,0 +1,110 @@
+# plot_render_process.py
+# Rasterizes the live plots in a separate process so matplotlib doesn't hold the GUI process's GIL.
+import base64
+import io
+import multiprocessing
+import queue
+import time
+
+from plot_layout import PLOT_COLUMNS
+
+
+def render_loop(shm_name, control_queue, frame_queue, frame_interval, time_window, rows_wanted):
+    """Process entry point: read the shared ring, draw with Agg, send frames as base64 PNG"""
+    # Imported here so only the child process pays for matplotlib
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from plot_layout import create_plot_axes, update_plot_lines
+    from shared_telemetry import SharedTelemetryRing
+
+    ring = SharedTelemetryRing.attach(shm_name, PLOT_COLUMNS)
+    fig = Figure(figsize=(12, 8), dpi=100)
+    FigureCanvasAgg(fig)
+    axes, lines = create_plot_axes(fig)
+    drawn_sequence = -1
+    size_changed = False
+
+    try:
+        while True:
+            started = time.monotonic()
+
+            # Apply all pending control messages
+            try:
+                while True:
+                    command, *args = control_queue.get_nowait()
+                    if command == "stop":
+                        return
+                    elif command == "size":
+                        width, height = args
+                        fig.set_size_inches(width / fig.dpi, height / fig.dpi)
+                        size_changed = True
+                    elif command == "window":
+                        time_window, rows_wanted = args
+                        size_changed = True
+            except queue.Empty:
+                pass
+
+            if ring.total_written != drawn_sequence or size_changed:
+                data, drawn_sequence = ring.latest(rows_wanted)
+                size_changed = False
+                if update_plot_lines(axes, lines, data, ring.column_index, time_window):
+                    buffer = io.BytesIO()
+                    fig.savefig(buffer, format="png")
+                    frame = base64.b64encode(buffer.getvalue()).decode("ascii")
+                    # Keep only the newest frame for the GUI
+                    try:
+                        frame_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    try:
+                        frame_queue.put_nowait(frame)
+                    except queue.Full:
+                        pass
+
+            time.sleep(max(0.0, frame_interval - (time.monotonic() - started)))
+    finally:
+        ring.close()
+
+
+class PlotRenderProcess:
+    """Owns the shared telemetry ring and the renderer child process (GUI side)"""
+    def __init__(self, capacity, frame_interval, time_window, rows_wanted):
+        from shared_telemetry import SharedTelemetryRing
+        self.ring = SharedTelemetryRing.create(PLOT_COLUMNS, capacity)
+        context = multiprocessing.get_context("spawn")  # No forking a process that runs Tk threads
+        self.control_queue = context.Queue()
+        self.frame_queue = context.Queue(maxsize=1)
+        self.process = context.Process(
+            target=render_loop,
+            args=(self.ring.name, self.control_queue, self.frame_queue, frame_interval, time_window, rows_wanted),
+            daemon=True,
+        )
+        self.process.start()
+
+    def append_rows(self, rows):
+        self.ring.append_rows(rows)
+
+    def clear(self):
+        self.ring.clear()
+
+    def set_size(self, width, height):
+        self.control_queue.put(("size", width, height))
+
+    def set_window(self, time_window, rows_wanted):
+        self.control_queue.put(("window", time_window, rows_wanted))
+
+    def latest_frame(self):
+        """Newest rendered frame (base64 PNG) or None if nothing new arrived"""
+        try:
+            return self.frame_queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        self.control_queue.put(("stop",))
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
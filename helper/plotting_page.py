@@ -1,62 +1,79 @@
 import tkinter as tk
-from tkinter import ttk
-import matplotlib.pyplot as plt
+from tkinter import ttk, filedialog, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
 import numpy as np
 import time
-import collections
 import threading
 import queue
-from mqtt_handler import register_callback, unregister_callback, MQTT_TOPIC_STATUS
+import math
+from mqtt_handler import get_default_session
+from sample_buffer import SampleRingBuffer
+from spectrum_panel import SpectrumPanel
+from plot_layout import PLOT_COLUMNS, create_plot_axes, update_plot_lines
+from status_schema import NUMERIC_INDEX, extract_rows, extract_record
+from plot_render_process import PlotRenderProcess
+from frame_scheduler import PRIORITY_NORMAL, PRIORITY_LOW, FRAME_INTERVAL_MS
 
 class PlottingPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
+        self.session = session or get_default_session()
         
         # Configuration parameters
         self.time_window = 30  # 30 seconds window
-        self.update_freq = 10  # Expected 10Hz update frequency
+        self.update_freq = 10  # Nominal 10Hz update frequency, used until the real rate is measured
         self.plot_refresh_rate = 200  # Refresh plots every 200ms (5Hz)
-        self.buffer_size = self.time_window * self.update_freq  # Buffer size for 30 seconds at 10Hz
+        self.buffer_margin = 1.2  # Extra room so rate jitter doesn't shorten the window
+        self.min_buffer_size = 50
+        self.max_buffer_size = 50000
+        self.buffer_size = self.compute_buffer_size(self.update_freq)
+
+        # Arrival rate estimation (exponential moving average of inter-arrival intervals)
+        self.rate_ema_alpha = 0.1
+        self.rate_resize_tolerance = 0.25  # Resize buffers when the rate drifts more than 25%
+        self.max_arrival_gap = 2.0  # Intervals longer than this are pauses, not the publish rate
+        self.mean_interval = None
+        self.last_arrival = None
+        self.sized_for_rate = self.update_freq
+        self.source_time_offset = None
+        self.measured_rate_var = tk.StringVar(value="Rate: -- Hz")
         
         # Queue for thread-safe data transfer
         self.data_queue = queue.Queue()
         self.processing_active = False
         self.worker_thread = None
         
-        # Initialize data buffers with deques for efficient appending/popping
-        self.timestamps = collections.deque(maxlen=self.buffer_size)
-        
-        # Data buffers for each plot
-        # Depth plot and reference
-        self.depth_data = collections.deque(maxlen=self.buffer_size)
-        self.depth_ref_data = collections.deque(maxlen=self.buffer_size)
-        
-        # Pitch plot and reference
-        self.pitch_data = collections.deque(maxlen=self.buffer_size)
-        self.pitch_ref_data = collections.deque(maxlen=self.buffer_size)
-        
-        # Roll plot and reference
-        self.roll_data = collections.deque(maxlen=self.buffer_size)
-        self.roll_ref_data = collections.deque(maxlen=self.buffer_size)
-        
-        # Error integrals
-        self.depth_error_integral = collections.deque(maxlen=self.buffer_size)
-        self.depth_force = collections.deque(maxlen=self.buffer_size)
-        self.pitch_error_integral = collections.deque(maxlen=self.buffer_size)
-        self.pitch_force = collections.deque(maxlen=self.buffer_size)
-        self.roll_error_integral = collections.deque(maxlen=self.buffer_size)
-        self.roll_force = collections.deque(maxlen=self.buffer_size)
+        # Sample buffer: one row per status message, one column per plotted signal
+        self.samples = SampleRingBuffer(PLOT_COLUMNS, self.buffer_size)
         
         # Controller status variables
         self.depth_controller_status = tk.StringVar(value="DEPTH Controller: Unknown")
         self.pitch_controller_status = tk.StringVar(value="PITCH Controller: Unknown")
         self.roll_controller_status = tk.StringVar(value="ROLL Controller: Unknown")
+        self.latest_controller_state = None  # (DEPTH, PITCH, ROLL), written by the worker thread
+        self.displayed_controller_state = None
+        
+        # Out-of-process renderer (PlotRenderProcess), only while that render mode is on
+        self.render_process = None
+        
+        # Background export state
+        self.export_thread = None
+        self.export_progress_queue = queue.Queue()
         
         # Plot state
+        self.visible = False
         self.plotting_active = False
+        # Plot redraws and export progress run from the app's frame clock
+        self.plot_task = controller.scheduler.add_task(
+            f"{self.session.name} plots", self.update_plots, self.plot_refresh_rate,
+            priority=PRIORITY_NORMAL, budget_ms=40, active=False)
+        # The controller status labels follow the frame clock itself, not the 5 Hz plot refresh
+        self.status_task = controller.scheduler.add_task(
+            f"{self.session.name} controller status", self.update_controller_status, FRAME_INTERVAL_MS,
+            priority=PRIORITY_NORMAL, budget_ms=2, active=False)
+        self.export_task = None
         self.start_time = None
         
         # Thread lock for data access
@@ -66,7 +83,7 @@ class PlottingPage(tk.Frame):
         self.create_layout()
         
         # Register MQTT callback
-        register_callback(self.process_mqtt_data)
+        self.session.register_callback(self.process_mqtt_data)
         
     def create_layout(self):
         # Create top control frame
@@ -85,34 +102,57 @@ class PlottingPage(tk.Frame):
         self.window_selector.pack(side=tk.LEFT, padx=5)
         self.window_selector.bind("<<ComboboxSelected>>", self.update_time_window)
         
-        # Create plot frame
-        plot_frame = ttk.Frame(self, padding=10)
-        plot_frame.pack(fill=tk.BOTH, expand=True)
+        # Measured telemetry rate
+        ttk.Label(control_frame, textvariable=self.measured_rate_var).pack(side=tk.LEFT, padx=10)
         
-        # Create a figure with 2 rows and 3 columns
-        self.fig = Figure(figsize=(12, 8), dpi=100)
-        self.fig.subplots_adjust(hspace=0.4, wspace=0.3)
+        # Render plots in a separate process (keeps the GUI responsive under heavy plotting)
+        self.external_render = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Render in Separate Process", variable=self.external_render,
+                        command=self.toggle_render_mode).pack(side=tk.LEFT, padx=10)
         
-        # Create subplots
-        self.ax_depth = self.fig.add_subplot(2, 3, 1)
-        self.ax_pitch = self.fig.add_subplot(2, 3, 2)
-        self.ax_roll = self.fig.add_subplot(2, 3, 3)
-        self.ax_depth_error = self.fig.add_subplot(2, 3, 4)
-        self.ax_pitch_error = self.fig.add_subplot(2, 3, 5)
-        self.ax_roll_error = self.fig.add_subplot(2, 3, 6)
+        # Spectrum panel toggle
+        self.show_spectrum = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Show Spectrum", variable=self.show_spectrum,
+                        command=self.toggle_spectrum).pack(side=tk.LEFT, padx=10)
         
-        # Initialize plots
-        self.initialize_plots()
+        # Export plots and data in the background
+        self.export_button = ttk.Button(control_frame, text="Export...", command=self.start_export)
+        self.export_button.pack(side=tk.LEFT, padx=5)
+        self.export_progress = ttk.Progressbar(control_frame, length=100, maximum=1.0)
+        self.export_progress.pack(side=tk.LEFT, padx=5)
+        self.export_status_var = tk.StringVar(value="")
+        ttk.Label(control_frame, textvariable=self.export_status_var).pack(side=tk.LEFT, padx=5)
+        
+        # Plots on the left, optional spectrum panel on the right
+        content_frame = ttk.Frame(self)
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Create plot frame
+        plot_frame = ttk.Frame(content_frame, padding=10)
+        plot_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Spectrum panel, packed only while enabled
+        self.spectrum_panel = SpectrumPanel(content_frame)
+        self.spectrum_seq = 0  # Sample buffer sequence already fed to the spectrum
+        
+        # Create a figure with 2 rows and 3 columns of subplots (see plot_layout)
+        self.fig = Figure(figsize=(12, 8), dpi=100)
+        self.axes, self.plot_lines = create_plot_axes(self.fig)
         
         # Create canvas
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
         
+        # Image label showing frames from the render process, swapped in for the canvas
+        self.frame_label = tk.Label(plot_frame)
+        self.frame_label.bind("<Configure>", self.on_frame_label_resize)
+        self.frame_image = None
+        
         # Add toolbar
-        toolbar_frame = ttk.Frame(plot_frame)
-        toolbar_frame.pack(side=tk.BOTTOM, fill=tk.X)
-        toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame)
+        self.toolbar_frame = ttk.Frame(plot_frame)
+        self.toolbar_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        toolbar = NavigationToolbar2Tk(self.canvas, self.toolbar_frame)
         toolbar.update()
         
         # Status labels
@@ -124,62 +164,107 @@ class PlottingPage(tk.Frame):
         ttk.Label(status_frame, textvariable=self.pitch_controller_status).grid(row=0, column=1, padx=10)
         ttk.Label(status_frame, textvariable=self.roll_controller_status).grid(row=0, column=2, padx=10)
         
-    def initialize_plots(self):
-        # Initialize empty plots
-        # Depth plot
-        self.depth_line, = self.ax_depth.plot([], [], 'b-', label='Depth')
-        self.depth_ref_line, = self.ax_depth.plot([], [], 'r-', label='Reference')
-        self.ax_depth.set_title('Depth vs Reference')
-        self.ax_depth.set_xlabel('Time (s)')
-        self.ax_depth.set_ylabel('Depth (m)')
-        self.ax_depth.grid(True)
-        self.ax_depth.legend()
-        
-        # Pitch plot
-        self.pitch_line, = self.ax_pitch.plot([], [], 'b-', label='Pitch')
-        self.pitch_ref_line, = self.ax_pitch.plot([], [], 'r-', label='Reference')
-        self.ax_pitch.set_title('Pitch vs Reference')
-        self.ax_pitch.set_xlabel('Time (s)')
-        self.ax_pitch.set_ylabel('Pitch (deg)')
-        self.ax_pitch.grid(True)
-        self.ax_pitch.legend()
-        
-        # Roll plot
-        self.roll_line, = self.ax_roll.plot([], [], 'b-', label='Roll')
-        self.roll_ref_line, = self.ax_roll.plot([], [], 'r-', label='Reference')
-        self.ax_roll.set_title('Roll vs Reference')
-        self.ax_roll.set_xlabel('Time (s)')
-        self.ax_roll.set_ylabel('Roll (deg)')
-        self.ax_roll.grid(True)
-        self.ax_roll.legend()
-        
-        # Depth error integral plot
-        self.depth_error_line, = self.ax_depth_error.plot([], [], 'g-', label='Error Integral')
-        self.depth_force_line, = self.ax_depth_error.plot([], [], 'm-', label='Force', alpha=0.7)
-        self.ax_depth_error.set_title('Depth Error Integral & Force')
-        self.ax_depth_error.set_xlabel('Time (s)')
-        self.ax_depth_error.set_ylabel('Value')
-        self.ax_depth_error.grid(True)
-        self.ax_depth_error.legend()
-        
-        # Pitch error integral plot
-        self.pitch_error_line, = self.ax_pitch_error.plot([], [], 'g-', label='Error Integral')
-        self.pitch_force_line, = self.ax_pitch_error.plot([], [], 'm-', label='Force', alpha=0.7)
-        self.ax_pitch_error.set_title('Pitch Error Integral & Force')
-        self.ax_pitch_error.set_xlabel('Time (s)')
-        self.ax_pitch_error.set_ylabel('Value')
-        self.ax_pitch_error.grid(True)
-        self.ax_pitch_error.legend()
-        
-        # Roll error integral plot
-        self.roll_error_line, = self.ax_roll_error.plot([], [], 'g-', label='Error Integral')
-        self.roll_force_line, = self.ax_roll_error.plot([], [], 'm-', label='Force', alpha=0.7)
-        self.ax_roll_error.set_title('Roll Error Integral & Force')
-        self.ax_roll_error.set_xlabel('Time (s)')
-        self.ax_roll_error.set_ylabel('Value')
-        self.ax_roll_error.grid(True)
-        self.ax_roll_error.legend()
+    def toggle_spectrum(self):
+        """Show or hide the spectrum panel next to the plots"""
+        if self.show_spectrum.get():
+            self.spectrum_panel.needs_history = True
+            self.spectrum_panel.pack(side=tk.RIGHT, fill=tk.BOTH)
+        else:
+            self.spectrum_panel.pack_forget()
+    
+    def toggle_render_mode(self):
+        """Switch between drawing in this process and the shared-memory render process"""
+        canvas_widget = self.canvas.get_tk_widget()
+        if self.external_render.get():
+            self.render_process = PlotRenderProcess(
+                capacity=self.max_buffer_size,
+                frame_interval=self.plot_refresh_rate / 1000,
+                time_window=self.time_window,
+                rows_wanted=self.buffer_size,
+            )
+            # Seed the ring with what is already buffered
+            with self.data_lock:
+                self.render_process.append_rows(self.samples.latest())
+            canvas_widget.pack_forget()
+            self.toolbar_frame.pack_forget()
+            self.frame_label.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        else:
+            with self.data_lock:
+                render_process, self.render_process = self.render_process, None
+            if render_process is not None:
+                render_process.stop()
+            self.frame_label.pack_forget()
+            self.frame_image = None
+            self.toolbar_frame.pack(side=tk.BOTTOM, fill=tk.X)
+            canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+    
+    def on_frame_label_resize(self, event):
+        """Render frames at the size the label is shown at"""
+        if self.render_process is not None and event.width > 1 and event.height > 1:
+            self.render_process.set_size(event.width, event.height)
+    
+    def show_rendered_frame(self):
+        """Display the newest frame from the render process, if any"""
+        frame = self.render_process.latest_frame()
+        if frame is not None:
+            self.frame_image = tk.PhotoImage(data=frame)
+            self.frame_label.config(image=self.frame_image)
+    
+    def start_export(self):
+        """Snapshot the buffers and export them on a worker thread"""
+        if self.export_thread is not None and self.export_thread.is_alive():
+            messagebox.showinfo("Export", "An export is already running.")
+            return
+        
+        with self.data_lock:
+            data = self.samples.latest()
+        if len(data) == 0:
+            messagebox.showwarning("Export", "No plot data to export.")
+            return
         
+        base_path = filedialog.asksaveasfilename(
+            title="Export Plots and Data (CSV, NPZ, PNG, SVG)",
+            initialfile=time.strftime("plots_%Y%m%d_%H%M%S"),
+        )
+        if not base_path:
+            return  # User cancelled
+        
+        self.export_button.config(state=tk.DISABLED)
+        self.export_progress["value"] = 0
+        self.export_thread = threading.Thread(
+            target=self.export_worker,
+            args=(data, self.samples.columns, self.time_window, base_path),
+            daemon=True,
+        )
+        self.export_thread.start()
+        self.export_task = self.controller.scheduler.add_task(
+            f"{self.session.name} export progress", self.poll_export_progress, 100, priority=PRIORITY_LOW, budget_ms=1)
+    
+    def export_worker(self, data, columns, time_window, base_path):
+        """Runs in the export thread; reports progress through export_progress_queue"""
+        try:
+            from plot_export import export_snapshot  # Deferred until the first export
+            export_snapshot(data, columns, time_window, base_path,
+                            progress=lambda fraction, message: self.export_progress_queue.put((fraction, message)))
+        except Exception as e:
+            self.export_progress_queue.put((None, f"Export failed: {e}"))
+    
+    def poll_export_progress(self):
+        """Show export progress - runs in main thread until the export thread finishes"""
+        try:
+            while True:
+                fraction, message = self.export_progress_queue.get_nowait()
+                if fraction is not None:
+                    self.export_progress["value"] = fraction
+                self.export_status_var.set(message)
+        except queue.Empty:
+            pass
+        
+        if not self.export_thread.is_alive() and self.export_progress_queue.empty():
+            self.controller.scheduler.remove_task(self.export_task)
+            self.export_task = None
+            self.export_button.config(state=tk.NORMAL)
+    
     def toggle_plotting(self):
         self.plotting_active = not self.plotting_active
         
@@ -187,9 +272,14 @@ class PlottingPage(tk.Frame):
             # Start plotting
             self.start_button.config(text="Stop Plotting")
             self.start_time = time.time()
+            self.source_time_offset = None
+            self.last_arrival = None
+            self.mean_interval = None  # Measure this session's rate afresh
+            self.measured_rate_var.set("Rate: -- Hz")
             
             # Clear existing data
             self.clear_data()
+            self.spectrum_panel.needs_history = True
             
             # Start the data processing thread
             self.processing_active = True
@@ -197,11 +287,12 @@ class PlottingPage(tk.Frame):
             self.worker_thread.daemon = True
             self.worker_thread.start()
             
-            # Schedule first update in the main thread
-            self.after(self.plot_refresh_rate, self.update_plots)
+            # Start redrawing from the main thread
+            self.update_plot_task()
         else:
             # Stop plotting
             self.start_button.config(text="Start Plotting")
+            self.update_plot_task()
             
             # Stop the data processing thread
             self.processing_active = False
@@ -210,191 +301,196 @@ class PlottingPage(tk.Frame):
     
     def clear_data(self):
         """Clear all data buffers"""
-        self.timestamps.clear()
-        self.depth_data.clear()
-        self.depth_ref_data.clear()
-        self.pitch_data.clear()
-        self.pitch_ref_data.clear()
-        self.roll_data.clear()
-        self.roll_ref_data.clear()
-        self.depth_error_integral.clear()
-        self.depth_force.clear()
-        self.pitch_error_integral.clear()
-        self.pitch_force.clear()
-        self.roll_error_integral.clear()
-        self.roll_force.clear()
+        with self.data_lock:
+            self.samples.clear()
+            if self.render_process is not None:
+                self.render_process.clear()
+        
+    def compute_buffer_size(self, rate):
+        """Number of samples needed to hold the time window at the given rate"""
+        size = math.ceil(self.time_window * rate * self.buffer_margin)
+        return max(self.min_buffer_size, min(self.max_buffer_size, size))
+    
+    def resize_buffers(self, rate):
+        """Resize all data buffers for the given rate, keeping the most recent samples.
+        Caller must hold data_lock if the worker thread is running."""
+        self.buffer_size = self.compute_buffer_size(rate)
+        self.sized_for_rate = rate
+        self.samples.resize(self.buffer_size)
+        if self.render_process is not None:
+            self.render_process.set_window(self.time_window, self.buffer_size)
         
     def update_time_window(self, event=None):
         """Update the time window for the plots"""
         try:
             self.time_window = int(self.window_selector.get())
-            self.buffer_size = self.time_window * self.update_freq
-            
-            # Update buffer sizes
-            self.timestamps = collections.deque(list(self.timestamps)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.depth_data = collections.deque(list(self.depth_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.depth_ref_data = collections.deque(list(self.depth_ref_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.pitch_data = collections.deque(list(self.pitch_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.pitch_ref_data = collections.deque(list(self.pitch_ref_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.roll_data = collections.deque(list(self.roll_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.roll_ref_data = collections.deque(list(self.roll_ref_data)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.depth_error_integral = collections.deque(list(self.depth_error_integral)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.depth_force = collections.deque(list(self.depth_force)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.pitch_error_integral = collections.deque(list(self.pitch_error_integral)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.pitch_force = collections.deque(list(self.pitch_force)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.roll_error_integral = collections.deque(list(self.roll_error_integral)[-self.buffer_size:], maxlen=self.buffer_size)
-            self.roll_force = collections.deque(list(self.roll_force)[-self.buffer_size:], maxlen=self.buffer_size)
-            
+            with self.data_lock:
+                self.resize_buffers(self.sized_for_rate)
         except ValueError:
             print("Invalid time window value")
+    
+    def measured_rate(self):
+        """Current estimate of the status message rate in Hz, or None if not measured yet"""
+        mean_interval = self.mean_interval
+        if not mean_interval:
+            return None
+        return 1.0 / mean_interval
+    
+    def record_arrival(self, arrival_time):
+        """Update the arrival rate estimate - runs in MQTT thread"""
+        if self.last_arrival is not None:
+            interval = arrival_time - self.last_arrival
+            if 0 < interval < self.max_arrival_gap:
+                if self.mean_interval is None:
+                    self.mean_interval = interval
+                else:
+                    self.mean_interval += self.rate_ema_alpha * (interval - self.mean_interval)
+        self.last_arrival = arrival_time
+    
+    def sample_times(self, arrival_times, source_times):
+        """Times of a batch of samples relative to start_time.
+        Uses the ROV timestamp where present (aligned to the local clock on the first
+        stamped sample), otherwise the time each message was received."""
+        times = arrival_times - self.start_time
+        stamped = ~np.isnan(source_times)
+        if stamped.any():
+            if self.source_time_offset is None:
+                first = np.flatnonzero(stamped)[0]
+                self.source_time_offset = source_times[first] - times[first]
+            times[stamped] = source_times[stamped] - self.source_time_offset
+        return times
+    
+    def adapt_buffer_size(self):
+        """Resize buffers if the measured rate has drifted from the one they were sized for.
+        Caller must hold data_lock."""
+        rate = self.measured_rate()
+        if rate is None:
+            return
+        if abs(rate - self.sized_for_rate) > self.rate_resize_tolerance * self.sized_for_rate:
+            self.resize_buffers(rate)
+            print(f"Plot buffers resized to {self.buffer_size} samples for {rate:.1f} Hz")
             
+    def extract_batch(self, batch):
+        """Turn a batch of (arrival time, status message) into sample rows (see PLOT_COLUMNS)"""
+        values = extract_rows([message for _, message in batch])
+        arrival_times = np.array([arrival_time for arrival_time, _ in batch])
+        times = self.sample_times(arrival_times, values[:, NUMERIC_INDEX["timestamp"]])
+        return np.column_stack((times, values))
+    
+    def drain_queue(self, timeout):
+        """Block for the first queued message, then take everything else already waiting"""
+        batch = [self.data_queue.get(timeout=timeout)]
+        try:
+            while True:
+                batch.append(self.data_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+    
     def data_processing_thread(self):
-        """Worker thread that processes data from the queue"""
+        """Worker thread that drains the queue and appends each batch in one go"""
         while self.processing_active:
             try:
-                # Get message data from the queue with a timeout
-                message = self.data_queue.get(timeout=0.1)
-                
-                # Get current timestamp relative to start time
-                current_time = time.time() - self.start_time
-                
-                # Process message data
-                with self.data_lock:
-                    self.timestamps.append(current_time)
-                    
-                    # Extract data from MQTT message
-                    try:
-                        self.depth_data.append(float(message.get("depth", 0)))
-                        self.depth_ref_data.append(float(message.get("reference_z", 0)))
-                        
-                        self.pitch_data.append(float(message.get("pitch", 0)))
-                        self.pitch_ref_data.append(float(message.get("reference_pitch", 0)))
-                        
-                        self.roll_data.append(float(message.get("roll", 0)))
-                        self.roll_ref_data.append(float(message.get("reference_roll", 0)))
-                        
-                        # Error integrals and forces
-                        error_integral = message.get("error_integral", {})
-                        self.depth_error_integral.append(float(error_integral.get("Z", 0)))
-                        self.depth_force.append(float(message.get("force_z", 0)))
-                        
-                        self.pitch_error_integral.append(float(error_integral.get("PITCH", 0)))
-                        self.pitch_force.append(float(message.get("force_pitch", 0)))
-                        
-                        self.roll_error_integral.append(float(error_integral.get("ROLL", 0)))
-                        self.roll_force.append(float(message.get("force_roll", 0)))
-                    except (ValueError, TypeError) as e:
-                        print(f"Error processing data: {e}")
-                
-                # Update controller status (GUI update must be done in main thread)
-                controller_state = message.get("controller_state", {})
-                self.after_idle(self.update_controller_status, controller_state)
-                
-                # Mark the task as done
-                self.data_queue.task_done()
+                batch = self.drain_queue(timeout=0.1)
             except queue.Empty:
                 # No data in queue, just continue
-                pass
+                continue
+            
+            try:
+                # Missing or malformed fields come back as schema defaults
+                rows = self.extract_batch(batch)
+                
+                # Only the newest controller state matters; the GUI picks it up at frame rate
+                record = extract_record(batch[-1][1])
+                self.latest_controller_state = (
+                    record.controller_state_depth, record.controller_state_pitch, record.controller_state_roll)
+                
+                if len(rows):
+                    with self.data_lock:
+                        self.adapt_buffer_size()
+                        self.samples.append_rows(rows)
+                        if self.render_process is not None:
+                            self.render_process.append_rows(rows)
             except Exception as e:
                 print(f"Error in data processing thread: {e}")
     
-    def update_controller_status(self, controller_state):
-        """Update controller status in the main thread"""
-        self.depth_controller_status.set(f"DEPTH Controller: {controller_state.get('DEPTH', 'Unknown')}")
-        self.pitch_controller_status.set(f"PITCH Controller: {controller_state.get('PITCH', 'Unknown')}")
-        self.roll_controller_status.set(f"ROLL Controller: {controller_state.get('ROLL', 'Unknown')}")
+    def update_controller_status(self):
+        """Update controller status labels if the state changed - runs in main thread"""
+        controller_state = self.latest_controller_state
+        if controller_state is None or controller_state == self.displayed_controller_state:
+            return
+        self.displayed_controller_state = controller_state
+        depth, pitch, roll = controller_state
+        self.depth_controller_status.set(f"DEPTH Controller: {depth}")
+        self.pitch_controller_status.set(f"PITCH Controller: {pitch}")
+        self.roll_controller_status.set(f"ROLL Controller: {roll}")
     
     def process_mqtt_data(self, message, topic):
         """Process incoming MQTT data - runs in MQTT thread"""
-        if topic != MQTT_TOPIC_STATUS or not self.plotting_active:
+        if topic != self.session.topic_status or not self.plotting_active:
             return
         
+        # Stamp the message as soon as it arrives
+        arrival_time = time.time()
+        self.record_arrival(arrival_time)
+        
         # Initialize start time if not set
         if self.start_time is None:
-            self.start_time = time.time()
+            self.start_time = arrival_time
         
         # Put the message in the queue for processing
-        self.data_queue.put(message)
+        self.data_queue.put((arrival_time, message))
         
+    def on_show(self):
+        """Resume periodic redraws from the current buffer"""
+        self.visible = True
+        self.update_plot_task()
+    
+    def on_hide(self):
+        """Stop drawing; the worker thread keeps filling the buffer"""
+        self.visible = False
+        self.update_plot_task()
+    
+    def update_plot_task(self):
+        """Redraw only while plotting and on screen"""
+        active = self.plotting_active and self.visible
+        self.controller.scheduler.set_active(self.plot_task, active)
+        self.controller.scheduler.set_active(self.status_task, active)
+    
     def update_plots(self):
-        """Update all plot lines with current data - runs in main thread"""
-        if not self.plotting_active:
-            return
+        """Update all plot lines with current data - runs in main thread from the frame clock"""
         
-        with self.data_lock:
-            if len(self.timestamps) > 0:
-                # Convert deques to numpy arrays for plotting
-                timestamps = np.array(self.timestamps)
-                
-                # Create local copies of data for plotting to minimize lock time
-                depth_data = np.array(self.depth_data)
-                depth_ref_data = np.array(self.depth_ref_data)
-                pitch_data = np.array(self.pitch_data)
-                pitch_ref_data = np.array(self.pitch_ref_data)
-                roll_data = np.array(self.roll_data)
-                roll_ref_data = np.array(self.roll_ref_data)
-                depth_error_integral = np.array(self.depth_error_integral)
-                depth_force = np.array(self.depth_force)
-                pitch_error_integral = np.array(self.pitch_error_integral)
-                pitch_force = np.array(self.pitch_force)
-                roll_error_integral = np.array(self.roll_error_integral)
-                roll_force = np.array(self.roll_force)
-                
-                # Calculate x-axis limits outside the lock
-                if len(timestamps) > 1:
-                    x_min = max(0, timestamps[-1] - self.time_window)
-                    x_max = timestamps[-1] + 0.1  # Add a small margin
-        
-        # Update the plots with the local data copies (no lock needed)
-        if len(self.timestamps) > 0:
-            # Update depth plot
-            self.depth_line.set_data(timestamps, depth_data)
-            self.depth_ref_line.set_data(timestamps, depth_ref_data)
-            
-            # Update pitch plot
-            self.pitch_line.set_data(timestamps, pitch_data)
-            self.pitch_ref_line.set_data(timestamps, pitch_ref_data)
-            
-            # Update roll plot
-            self.roll_line.set_data(timestamps, roll_data)
-            self.roll_ref_line.set_data(timestamps, roll_ref_data)
-            
-            # Update error integral plots
-            self.depth_error_line.set_data(timestamps, depth_error_integral)
-            self.depth_force_line.set_data(timestamps, depth_force)
-            
-            self.pitch_error_line.set_data(timestamps, pitch_error_integral)
-            self.pitch_force_line.set_data(timestamps, pitch_force)
-            
-            self.roll_error_line.set_data(timestamps, roll_error_integral)
-            self.roll_force_line.set_data(timestamps, roll_force)
-            
-            # Adjust x-axis limits
-            if len(timestamps) > 1:
-                self.ax_depth.set_xlim(x_min, x_max)
-                self.ax_pitch.set_xlim(x_min, x_max)
-                self.ax_roll.set_xlim(x_min, x_max)
-                self.ax_depth_error.set_xlim(x_min, x_max)
-                self.ax_pitch_error.set_xlim(x_min, x_max)
-                self.ax_roll_error.set_xlim(x_min, x_max)
-            
-            # Auto-adjust y-axis limits if we have data
-            if len(depth_data) > 0:
-                for ax in [self.ax_depth, self.ax_pitch, self.ax_roll, 
-                           self.ax_depth_error, self.ax_pitch_error, self.ax_roll_error]:
-                    ax.relim()
-                    ax.autoscale_view()
-            
-            # Draw updated plots
-            self.canvas.draw_idle()
+        rate = self.measured_rate()
+        if rate is not None:
+            self.measured_rate_var.set(f"Rate: {rate:.1f} Hz")
         
-        # Schedule next update
-        if self.plotting_active:
-            self.after(self.plot_refresh_rate, self.update_plots)
+        # Copy the buffer once under the lock, plot from the copy
+        with self.data_lock:
+            if self.render_process is None:
+                data = self.samples.latest()
+            if self.show_spectrum.get():
+                if self.spectrum_panel.needs_history:
+                    spectrum_rows = self.samples.latest(self.spectrum_panel.spectrum.window_size)
+                    self.spectrum_seq = self.samples.total_written
+                else:
+                    spectrum_rows, self.spectrum_seq = self.samples.rows_since(self.spectrum_seq)
+        
+        if self.show_spectrum.get():
+            self.spectrum_panel.feed(spectrum_rows, self.samples.column_index, rate)
+            self.spectrum_panel.redraw()
+        
+        if self.render_process is not None:
+            # The render process draws; just show what it produced
+            self.show_rendered_frame()
+        elif update_plot_lines(self.axes, self.plot_lines, data, self.samples.column_index, self.time_window):
+            # Draw now rather than at idle, so the frame clock accounts for the cost
+            self.canvas.draw()
     
     def __del__(self):
         """Clean up when the page is destroyed"""
         self.processing_active = False
         if self.worker_thread and self.worker_thread.is_alive():
             self.worker_thread.join(timeout=1.0)
-        unregister_callback(self.process_mqtt_data)
+        if self.render_process is not None:
+            self.render_process.stop()
+        self.session.unregister_callback(self.process_mqtt_data)
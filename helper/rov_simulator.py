@@ -0,0 +1,169 @@
+# rov_simulator.py
+# Heave-only stand-in for Oceanix: a depth PID on simple vehicle dynamics, driven by the
+# same config/ and state_commands/ messages and publishing status/ like the ROV.
+# Used in-process by param_sweep.py, or over MQTT in place of the vehicle:
+#
+#   python rov_simulator.py --vehicle ROV --rate 50
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from config_model import ConfigModel
+from mqtt_handler import create_sessions, find_session, load_vehicles
+
+SIM_DT = 0.005  # Integration step (s)
+STATUS_RATE_HZ = 50
+
+# Parameters the simulator understands; other config keys are accepted and echoed unchanged
+DEFAULT_CONFIG = {
+    "DEPTH_CONTROLLER": {"Kp": 60.0, "Ki": 5.0, "Kd": 40.0, "max_integral": 20.0},
+    "THRUSTERS": {"max_force_z": 80.0, "time_constant": 0.15},
+    "DYNAMICS": {"mass": 25.0, "added_mass": 10.0, "linear_damping": 15.0,
+                 "quadratic_damping": 40.0, "net_buoyancy": 5.0, "depth_noise": 0.005},
+}
+
+
+class RovSimulator:
+    """Depth loop of the ROV (depth positive down). Not thread-safe; serve() adds the locking."""
+    def __init__(self, config=None, seed=0):
+        self.model = ConfigModel.from_nested(config or DEFAULT_CONFIG)
+        self.random = random.Random(seed)
+        self.t = 0.0
+        self.depth = 0.0
+        self.velocity = 0.0
+        self.force = 0.0
+        self.integral = 0.0
+        self.reference = 0.0
+        self.depth_enabled = True
+        self.load_parameters()
+
+    def load_parameters(self):
+        get = self.model.get
+        self.kp = get(("DEPTH_CONTROLLER", "Kp"), 0.0)
+        self.ki = get(("DEPTH_CONTROLLER", "Ki"), 0.0)
+        self.kd = get(("DEPTH_CONTROLLER", "Kd"), 0.0)
+        self.max_integral = get(("DEPTH_CONTROLLER", "max_integral"), math.inf)
+        self.max_force = get(("THRUSTERS", "max_force_z"), 80.0)
+        self.time_constant = max(get(("THRUSTERS", "time_constant"), 0.1), SIM_DT)
+        self.mass = get(("DYNAMICS", "mass"), 25.0) + get(("DYNAMICS", "added_mass"), 0.0)
+        self.linear_damping = get(("DYNAMICS", "linear_damping"), 0.0)
+        self.quadratic_damping = get(("DYNAMICS", "quadratic_damping"), 0.0)
+        self.net_buoyancy = get(("DYNAMICS", "net_buoyancy"), 0.0)
+        self.depth_noise = get(("DYNAMICS", "depth_noise"), 0.0)
+
+    def apply_config(self, config):
+        """Merge a full or partial config document; returns the paths it didn't know"""
+        unknown = []
+        for path, value in ConfigModel.from_nested(config).values.items():
+            if path in self.model:
+                self.model.set(path, value)
+            else:
+                unknown.append(path)
+        self.load_parameters()
+        return unknown
+
+    def handle_command(self, command):
+        if "DEPTH_REFERENCE_UPDATE" in command:
+            self.reference = float(command["DEPTH_REFERENCE_UPDATE"])
+        if "CHANGE_DEPTH_STATUS" in command:
+            self.depth_enabled = not self.depth_enabled
+            self.integral = 0.0
+
+    def step(self, dt=SIM_DT):
+        measured = self.depth + self.random.gauss(0.0, self.depth_noise)
+        error = self.reference - measured
+        command = 0.0
+        if self.depth_enabled:
+            self.integral = max(-self.max_integral, min(self.max_integral, self.integral + error * dt))
+            # Derivative on the measured speed, so reference steps don't kick the thrusters
+            command = self.kp * error + self.ki * self.integral - self.kd * self.velocity
+            command = max(-self.max_force, min(self.max_force, command))
+        self.force += (command - self.force) * dt / self.time_constant
+        drag = self.linear_damping * self.velocity + self.quadratic_damping * self.velocity * abs(self.velocity)
+        # Positive net buoyancy pushes the vehicle up (negative depth direction)
+        acceleration = (self.force - self.net_buoyancy - drag) / self.mass
+        self.velocity += acceleration * dt
+        self.depth = max(0.0, self.depth + self.velocity * dt)  # Can't fly above the surface
+        if self.depth == 0.0 and self.velocity < 0:
+            self.velocity = 0.0
+        self.t += dt
+
+    def run(self, duration, dt=SIM_DT):
+        for _ in range(int(round(duration / dt))):
+            self.step(dt)
+
+    def status_message(self):
+        """status/ message with the fields the depth loop produces, shaped like the ROV's"""
+        state = "ENABLED" if self.depth_enabled else "DISABLED"
+        return {
+            "rov_armed": "ARMED",
+            "work_mode": "SIMULATION",
+            "controller_state": {"DEPTH": state, "PITCH": "DISABLED", "ROLL": "DISABLED"},
+            "depth": self.depth,
+            "Zspeed": self.velocity,
+            "reference_z": self.reference,
+            "force_z": self.force,
+            "error_integral": {"Z": self.integral, "PITCH": 0.0, "ROLL": 0.0},
+            "timestamp": self.t,
+        }
+
+
+def serve(session, rate, seed=0):
+    """Answer a vehicle's topics on its broker in real time until interrupted"""
+    simulator = RovSimulator(seed=seed)
+    lock = threading.Lock()
+    published = {"config": None}  # Last config we published, so our own echo is ignored
+
+    def publish_config():
+        published["config"] = simulator.model.to_nested()
+        session.send_message(session.topic_config, published["config"])
+
+    def on_message(message, topic):
+        if not isinstance(message, dict):
+            return
+        with lock:
+            if topic == session.topic_config:
+                if message == published["config"]:
+                    return
+                unknown = simulator.apply_config(message)
+                if unknown:
+                    print(f"Ignored unknown parameters: {', '.join('.'.join(path) for path in unknown)}")
+                publish_config()  # Report the resulting configuration, as the ROV does
+            elif topic == session.topic_commands:
+                if "REQUEST_CONFIG" in message:
+                    publish_config()
+                simulator.handle_command(message)
+
+    session.register_callback(on_message, replay=False)
+    if session.connect() < 0:
+        return
+    print(f"Simulating {session.name} on {session.brokers}, status/ at {rate} Hz")
+    period = 1.0 / rate
+    next_time = time.perf_counter()
+    try:
+        while True:
+            with lock:
+                simulator.run(period)
+                status = simulator.status_message()
+            session.client.publish(session.topic_status, json.dumps(status))  # send_message would log every sample
+            next_time += period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+    except KeyboardInterrupt:
+        print("Stopping simulator")
+    finally:
+        session.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the ROV's depth loop over MQTT")
+    parser.add_argument("--vehicle", help="Vehicle name from vehicles.json (default: the first)")
+    parser.add_argument("--rate", type=float, default=STATUS_RATE_HZ, help="status/ rate (Hz)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the depth sensor noise")
+    args = parser.parse_args()
+    try:
+        session = find_session(create_sessions(load_vehicles()), args.vehicle)
+    except ValueError as e:
+        parser.error(str(e))
+    serve(session, args.rate, args.seed)
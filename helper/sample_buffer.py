@@ -0,0 +1,75 @@
+# sample_buffer.py
+import numpy as np
+
+class SampleRingBuffer:
+    """Fixed-capacity ring buffer of float samples: one row per sample, one column per field.
+
+    Not thread-safe on its own; callers share it under their own lock.
+    """
+    def __init__(self, columns, capacity):
+        self.columns = tuple(columns)
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        self.capacity = int(capacity)
+        self.data = np.zeros((self.capacity, len(self.columns)))
+        self.write_index = 0  # Slot the next row goes into
+        self.count = 0  # Number of valid rows
+        self.total_written = 0  # Rows ever written, used as a sequence number by readers
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.write_index = 0
+        self.count = 0
+
+    def append_rows(self, rows):
+        """Append a (n, n_columns) block of rows, overwriting the oldest ones when full"""
+        rows = np.asarray(rows, dtype=float)
+        n = len(rows)
+        if n == 0:
+            return
+        self.total_written += n
+        if n >= self.capacity:
+            self.data[:] = rows[-self.capacity:]
+            self.write_index = 0
+            self.count = self.capacity
+            return
+        end = self.write_index + n
+        if end <= self.capacity:
+            self.data[self.write_index:end] = rows
+        else:
+            split = self.capacity - self.write_index
+            self.data[self.write_index:] = rows[:split]
+            self.data[:n - split] = rows[split:]
+        self.write_index = end % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def latest(self, n=None):
+        """Copy of the last n rows (all valid rows by default), oldest first"""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.write_index - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.data[start:start + n].copy()
+        return np.concatenate((self.data[start:], self.data[:self.write_index]))
+
+    def rows_since(self, sequence):
+        """Rows written after the given total_written value, plus the new sequence value.
+        Rows already overwritten are skipped."""
+        missing = self.total_written - sequence
+        return self.latest(max(0, missing)), self.total_written
+
+    def column(self, name):
+        """Copy of one column, oldest first"""
+        return self.latest()[:, self.column_index[name]]
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the most recent rows"""
+        capacity = int(capacity)
+        if capacity == self.capacity:
+            return
+        kept = self.latest(capacity)
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(self.columns)))
+        self.count = len(kept)
+        self.data[:self.count] = kept
+        self.write_index = self.count % capacity
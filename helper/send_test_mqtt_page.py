@@ -1,12 +1,19 @@
 # send_test_mqtt_page.py
+import time
 import tkinter as tk
 from tkinter import ttk
-from mqtt_handler import mqtt_send_message, MQTT_TOPIC_COMMANDS, MQTT_TOPIC_AXES, MQTT_TOPIC_ARM
+from mqtt_handler import get_default_session
+from frame_scheduler import PRIORITY_LOW
+from command_journal import CommandJournal, CONFIRMED, UNCONFIRMED, PENDING, LATENCY_BINS_MS
+
+JOURNAL_ROWS = 8  # Recent commands shown in the journal panel
+JOURNAL_REFRESH_MS = 250
 
 class SendTestMQTTPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
+        self.session = session or get_default_session()
         self.slider_labels = {}
         
         # Main container with some padding
@@ -103,6 +110,36 @@ class SendTestMQTTPage(tk.Frame):
         ttk.Button(nipper_frame, text="Close Nipper", command=self.close_nipper).pack(fill=tk.X, pady=2)
         ttk.Button(nipper_frame, text="Stop Nipper", command=self.stop_nipper).pack(fill=tk.X, pady=2)
 
+        # Command Journal Panel: every command with the status/ change that confirmed it
+        self.journal = CommandJournal()
+        self.journal_version = -1
+        journal_frame = ttk.LabelFrame(main_frame, text="Command Journal", padding=10)
+        journal_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        self.journal_list = ttk.Treeview(journal_frame, columns=("time", "command", "value", "outcome", "latency"),
+                                         show="headings", height=JOURNAL_ROWS)
+        for column, width in (("time", 90), ("command", 190), ("value", 60), ("outcome", 90), ("latency", 80)):
+            self.journal_list.heading(column, text=column.capitalize())
+            self.journal_list.column(column, width=width)
+        self.journal_list.tag_configure(UNCONFIRMED, background="salmon")
+        self.journal_list.tag_configure(PENDING, background="lightyellow")
+        self.journal_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+
+        bins = "/".join(f"{int(edge)}" for edge in LATENCY_BINS_MS[1:-1])
+        self.journal_stats = ttk.Treeview(journal_frame, columns=("command", "sent", "confirmed", "unconfirmed", "p50", "p95", "max", "distribution"),
+                                          show="headings", height=JOURNAL_ROWS)
+        for column, width, title in (("command", 190, "Command"), ("sent", 45, "Sent"), ("confirmed", 75, "Confirmed"),
+                                     ("unconfirmed", 85, "Unconfirmed"), ("p50", 65, "p50 ms"), ("p95", 65, "p95 ms"),
+                                     ("max", 65, "max ms"), ("distribution", 110, f"<{bins}+ ms")):
+            self.journal_stats.heading(column, text=title)
+            self.journal_stats.column(column, width=width)
+        self.journal_stats.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.journal_task = controller.scheduler.add_task(
+            f"{self.session.name} command journal", self.refresh_journal, JOURNAL_REFRESH_MS,
+            priority=PRIORITY_LOW, budget_ms=5, active=False)
+        self.session.register_callback(self.on_mqtt_message, replay=False)
+
     def create_styled_slider(self, parent, label, row, col):
         slider_container = tk.Frame(parent, padx=10, pady=5)
         slider_container.grid(row=row, column=col, sticky="ew")
@@ -126,13 +163,51 @@ class SendTestMQTTPage(tk.Frame):
         return slider
 
     def send_message(self, topic, payload):
-        mqtt_send_message(topic, payload)
+        # Stick setpoints stream continuously from the sliders; everything else is journaled
+        if topic != self.session.topic_axes:
+            cached = self.session.last_message(self.session.topic_status)
+            self.journal.record(topic, payload, cached.message if cached is not None else None)
+        self.session.send_message(topic, payload)
+
+    def on_mqtt_message(self, message, topic):
+        """Runs in MQTT thread: confirm journaled commands against new status/ messages"""
+        if topic == self.session.topic_status:
+            self.journal.on_status(message, time.time())
+
+    def on_show(self):
+        self.controller.scheduler.set_active(self.journal_task, True)
+
+    def on_hide(self):
+        self.controller.scheduler.set_active(self.journal_task, False)
+
+    def refresh_journal(self):
+        """Redraw the journal panel when entries or outcomes changed - runs in main thread"""
+        self.journal.expire()
+        if self.journal.version == self.journal_version:
+            return
+        self.journal_version = self.journal.version
+
+        def ms(value):
+            return "" if value is None or value != value else f"{value:.0f}"  # value != value: NaN
+
+        self.journal_list.delete(*self.journal_list.get_children())
+        for entry in self.journal.recent(JOURNAL_ROWS * 4):
+            stamp = time.strftime("%H:%M:%S", time.localtime(entry.sent_at))
+            latency = ms(entry.latency * 1000) if entry.latency is not None else ""
+            self.journal_list.insert("", tk.END, values=(stamp, entry.command, entry.value, entry.outcome, latency),
+                                     tags=(entry.outcome,))
+        self.journal_stats.delete(*self.journal_stats.get_children())
+        for command, stats in sorted(self.journal.stats().items()):
+            self.journal_stats.insert("", tk.END, values=(
+                command, stats["sent"], stats[CONFIRMED], stats[UNCONFIRMED],
+                ms(stats["p50_ms"]), ms(stats["p95_ms"]), ms(stats["max_ms"]), stats["histogram"]),
+                tags=(UNCONFIRMED,) if stats[UNCONFIRMED] else ())
 
     def send_arm_rov(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"ARM_ROV": 1})
+        self.send_message(self.session.topic_commands, {"ARM_ROV": 1})
 
     def send_axes_zero(self):
-        self.send_message(MQTT_TOPIC_AXES, {"X": 0, "Y": 0, "Z": 0, "PITCH": 0, "ROLL": 0, "YAW": 0})
+        self.send_message(self.session.topic_axes, {"X": 0, "Y": 0, "Z": 0, "PITCH": 0, "ROLL": 0, "YAW": 0})
         # Reset sliders to 0
         self.slider_x.set(0)
         self.slider_y.set(0)
@@ -145,33 +220,33 @@ class SendTestMQTTPage(tk.Frame):
             label_widget.config(text="0")
 
     def send_axes_x(self):
-        self.send_message(MQTT_TOPIC_AXES, {"X": 10000, "Y": 0, "Z": 0, "PITCH": 0, "ROLL": 0, "YAW": 0})
+        self.send_message(self.session.topic_axes, {"X": 10000, "Y": 0, "Z": 0, "PITCH": 0, "ROLL": 0, "YAW": 0})
 
     def send_axes_z(self):
-        self.send_message(MQTT_TOPIC_AXES, {"X": 0, "Y": 0, "Z": 10000, "PITCH": 0, "ROLL": 0, "YAW": 0})
+        self.send_message(self.session.topic_axes, {"X": 0, "Y": 0, "Z": 10000, "PITCH": 0, "ROLL": 0, "YAW": 0})
 
     def change_controller_status(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"CHANGE_CONTROLLER_STATUS": 0})
+        self.send_message(self.session.topic_commands, {"CHANGE_CONTROLLER_STATUS": 0})
         
     def send_toggle_depth_status(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"CHANGE_DEPTH_STATUS": 0})
+        self.send_message(self.session.topic_commands, {"CHANGE_DEPTH_STATUS": 0})
 
     def send_toggle_roll_status(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"CHANGE_ROLL_STATUS": 0})
+        self.send_message(self.session.topic_commands, {"CHANGE_ROLL_STATUS": 0})
 
     def send_toggle_pitch_status(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"CHANGE_PITCH_STATUS": 0})
+        self.send_message(self.session.topic_commands, {"CHANGE_PITCH_STATUS": 0})
         
     def send_work_mode(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"WORK_MODE": 1})
+        self.send_message(self.session.topic_commands, {"WORK_MODE": 1})
         
     def send_vertical_mode(self):
-        self.send_message(MQTT_TOPIC_COMMANDS, {"VERTICAL_MODE_TOGGLE": 1})
+        self.send_message(self.session.topic_commands, {"VERTICAL_MODE_TOGGLE": 1})
         
     def update_depth_reference(self):
         try:
             depth_value = float(self.depth_entry.get())
-            self.send_message(MQTT_TOPIC_COMMANDS, {"DEPTH_REFERENCE_UPDATE": depth_value})
+            self.send_message(self.session.topic_commands, {"DEPTH_REFERENCE_UPDATE": depth_value})
         except ValueError:
             print("Invalid depth value. Please enter a number.")
 
@@ -183,7 +258,7 @@ class SendTestMQTTPage(tk.Frame):
         pitch_value = self.slider_pitch.get()
         roll_value = self.slider_roll.get()
         yaw_value = self.slider_yaw.get()
-        self.send_message(MQTT_TOPIC_AXES, {
+        self.send_message(self.session.topic_axes, {
             "X": x_value, 
             "Y": y_value, 
             "Z": z_value, 
@@ -193,25 +268,25 @@ class SendTestMQTTPage(tk.Frame):
         })
     
     def rotate_wrist_ccw(self):
-        self.send_message(MQTT_TOPIC_ARM, {"ROTATE_WRIST_CCW": 0})
+        self.send_message(self.session.topic_arm, {"ROTATE_WRIST_CCW": 0})
 
     def rotate_wrist_cw(self):
-        self.send_message(MQTT_TOPIC_ARM, {"ROTATE_WRIST_CW": 0})
+        self.send_message(self.session.topic_arm, {"ROTATE_WRIST_CW": 0})
 
     def stop_wrist(self):
-        self.send_message(MQTT_TOPIC_ARM, {"STOP_WRIST": 0})
+        self.send_message(self.session.topic_arm, {"STOP_WRIST": 0})
 
     def open_nipper(self):
-        self.send_message(MQTT_TOPIC_ARM, {"OPEN_NIPPER": 0})
+        self.send_message(self.session.topic_arm, {"OPEN_NIPPER": 0})
 
     def close_nipper(self):
-        self.send_message(MQTT_TOPIC_ARM, {"CLOSE_NIPPER": 0})
+        self.send_message(self.session.topic_arm, {"CLOSE_NIPPER": 0})
 
     def stop_nipper(self):
-        self.send_message(MQTT_TOPIC_ARM, {"STOP_NIPPER": 0})
+        self.send_message(self.session.topic_arm, {"STOP_NIPPER": 0})
 
     def torque_wrist_on(self):
-        self.send_message(MQTT_TOPIC_ARM, {"TORQUE_WRIST_ON": 0})
+        self.send_message(self.session.topic_arm, {"TORQUE_WRIST_ON": 0})
 
     def torque_wrist_off(self):
-        self.send_message(MQTT_TOPIC_ARM, {"TORQUE_WRIST_OFF": 0})
\ No newline at end of file
+        self.send_message(self.session.topic_arm, {"TORQUE_WRIST_OFF": 0})
\ No newline at end of file
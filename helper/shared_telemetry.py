@@ -0,0 +1,93 @@
+# shared_telemetry.py
+from multiprocessing import shared_memory
+import numpy as np
+
+HEADER_SLOTS = 4  # [total_written, capacity, write_claim, generation]
+READ_RETRIES = 3  # Attempts of latest() when a clear() happens during the copy
+
+
+class SharedTelemetryRing:
+    """Ring buffer of float sample rows in shared memory, one writer and any number of readers.
+
+    A seqlock without the lock: the writer first claims the rows it is about to write
+    (write_claim), fills them and then publishes them by bumping total_written.
+    Readers copy the rows they want, re-read the claim and drop the prefix the
+    writer may have been overwriting meanwhile; clear() bumps the generation, which
+    makes a reader start over. No lock is shared between processes.
+    """
+    def __init__(self, shm, columns, owner):
+        self.shm = shm
+        self.columns = tuple(columns)
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        self.owner = owner
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self.capacity = int(self.header[1])
+        self.data = np.ndarray((self.capacity, len(self.columns)), dtype=np.float64,
+                               buffer=shm.buf, offset=HEADER_SLOTS * 8)
+
+    @classmethod
+    def create(cls, columns, capacity):
+        """Allocate a new ring; the creating process is the writer and owns the segment"""
+        size = HEADER_SLOTS * 8 + capacity * len(columns) * 8
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[1] = capacity
+        del header
+        return cls(shm, columns, owner=True)
+
+    @classmethod
+    def attach(cls, name, columns):
+        """Open an existing ring by shared memory name (reader side)"""
+        return cls(shared_memory.SharedMemory(name=name), columns, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total_written(self):
+        return int(self.header[0])
+
+    def append_rows(self, rows):
+        """Append a (n, n_columns) block of rows - writer only"""
+        rows = np.asarray(rows, dtype=np.float64)[-self.capacity:]
+        n = len(rows)
+        if n == 0:
+            return
+        start = self.total_written
+        slots = (start + np.arange(n)) % self.capacity
+        self.header[2] = start + n  # Claim before touching the rows: they're torn until published
+        self.data[slots] = rows
+        self.header[0] = start + n  # Publish after the rows are in place
+
+    def clear(self):
+        """Forget all rows (readers see an empty ring) - writer only"""
+        self.header[0] = 0
+        self.header[2] = 0
+        self.header[3] += 1  # Readers copying across the reset retry
+
+    def latest(self, n):
+        """Copy of up to the last n rows, oldest first, and the total_written it was taken at"""
+        for _ in range(READ_RETRIES):
+            generation = int(self.header[3])
+            end = self.total_written
+            start = max(0, end - min(n, self.capacity))
+            rows = self.data[np.arange(start, end) % self.capacity]
+            # Rows the writer claimed during the copy may have been overwritten, also half-way
+            claimed = int(self.header[2])
+            if int(self.header[3]) != generation:
+                continue
+            overwritten = claimed - self.capacity
+            if overwritten > start:
+                rows = rows[overwritten - start:]
+            return rows, end
+        return self.data[:0].copy(), self.total_written
+
+    def close(self):
+        """Release this process's mapping; the owner also frees the segment"""
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
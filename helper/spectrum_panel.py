@@ -0,0 +1,192 @@
+# spectrum_panel.py
+import tkinter as tk
+from tkinter import ttk
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import numpy as np
+
+# (state signal, force signal) shown together in each spectrum subplot
+SPECTRUM_SIGNALS = (
+    ("depth", "force_z"),
+    ("pitch", "force_pitch"),
+    ("roll", "force_roll"),
+)
+
+
+class SlidingSpectrum:
+    """Sliding DFT over the last window_size samples of several signals.
+
+    Each new sample updates every bin in O(window_size) instead of a full FFT:
+        X_k <- (X_k + x_new - x_old) * exp(2j*pi*k/N)
+    A Hann window is applied in the frequency domain (3-tap kernel on the bins).
+    The state is resynchronised with a full FFT every few windows to cancel
+    the rounding error the recursion accumulates.
+    """
+    def __init__(self, n_signals, window_size, resync_windows=8):
+        self.n_signals = n_signals
+        self.window_size = window_size
+        self.resync_interval = resync_windows * window_size
+        k = np.arange(window_size)
+        self.twiddle = np.exp(2j * np.pi * k / window_size)
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros((self.n_signals, self.window_size))  # Ring of the last N samples
+        self.position = 0  # Index of the oldest sample in history
+        self.bins = np.zeros((self.n_signals, self.window_size), dtype=complex)
+        self.samples_seen = 0
+        self.since_resync = 0
+
+    def _recompute(self):
+        ordered = np.roll(self.history, -self.position, axis=1)
+        self.bins = np.fft.fft(ordered, axis=1)
+        self.since_resync = 0
+
+    def update(self, samples):
+        """Add a (m, n_signals) block of samples, oldest first"""
+        samples = np.asarray(samples, dtype=float)
+        m = len(samples)
+        if m == 0:
+            return
+        n = self.window_size
+        if m >= n:
+            # A whole window of new data: a single FFT is cheaper than sliding
+            self.history = samples[-n:].T.copy()
+            self.position = 0
+            self.samples_seen += m
+            self._recompute()
+            return
+
+        slots = (self.position + np.arange(m)) % n
+        delta = samples.T - self.history[:, slots]  # (n_signals, m)
+        self.history[:, slots] = samples.T
+        self.position = (self.position + m) % n
+
+        # Apply all m recursion steps at once: sample i is rotated (m - i) times
+        powers = self.twiddle[np.newaxis, :] ** np.arange(m, 0, -1)[:, np.newaxis]  # (m, n)
+        self.bins = self.bins * self.twiddle ** m + delta @ powers
+
+        self.samples_seen += m
+        self.since_resync += m
+        if self.since_resync >= self.resync_interval:
+            self._recompute()
+
+    def magnitude(self):
+        """Hann-windowed, mean-removed magnitude spectrum, bins 0..N/2, shape (n_signals, N/2 + 1)"""
+        windowed = 0.5 * self.bins - 0.25 * (np.roll(self.bins, 1, axis=1) + np.roll(self.bins, -1, axis=1))
+        half = windowed[:, :self.window_size // 2 + 1]
+        magnitude = np.abs(half) * (4.0 / self.window_size)  # Hann coherent gain 0.5, single-sided x2
+        # The mean leaks into bins 0 and 1 through the window; drop it so peaks are oscillations
+        magnitude[:, :2] = 0.0
+        return magnitude
+
+
+def find_peaks(magnitude, count, min_fraction=0.1):
+    """Indices of the `count` largest local maxima of a 1D spectrum, largest first.
+    Maxima below min_fraction of the largest bin are ignored as noise."""
+    inner = magnitude[1:-1]
+    threshold = min_fraction * magnitude.max()
+    is_peak = (inner > magnitude[:-2]) & (inner >= magnitude[2:]) & (inner > threshold)
+    peaks = np.flatnonzero(is_peak) + 1
+    if len(peaks) > count:
+        peaks = peaks[np.argpartition(magnitude[peaks], -count)[-count:]]
+    return peaks[np.argsort(magnitude[peaks])[::-1]]
+
+
+class SpectrumPanel(ttk.Frame):
+    """Live spectrum of depth/pitch/roll and their forces, fed from PlottingPage's sample buffer"""
+    def __init__(self, parent, window_size=256, peak_count=3):
+        super().__init__(parent, padding=5)
+        self.peak_count = peak_count
+        self.columns = [name for pair in SPECTRUM_SIGNALS for name in pair]
+        self.spectrum = SlidingSpectrum(len(self.columns), window_size)
+        self.sample_rate = None
+        self.dirty = False
+        self.needs_history = True  # Ask the feeder for a full window instead of only new rows
+
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X)
+        ttk.Label(controls, text="FFT window (samples):").pack(side=tk.LEFT, padx=5)
+        self.window_selector = ttk.Combobox(controls, values=[64, 128, 256, 512, 1024], width=6, state="readonly")
+        self.window_selector.set(window_size)
+        self.window_selector.pack(side=tk.LEFT, padx=5)
+        self.window_selector.bind("<<ComboboxSelected>>", self.change_window_size)
+        self.resolution_var = tk.StringVar(value="")
+        ttk.Label(controls, textvariable=self.resolution_var).pack(side=tk.LEFT, padx=10)
+
+        self.fig = Figure(figsize=(4, 8), dpi=100)
+        self.fig.subplots_adjust(hspace=0.5, left=0.2)
+        self.axes = []
+        self.lines = []
+        self.peak_markers = []
+        self.peak_labels = []
+        for i, (state_name, force_name) in enumerate(SPECTRUM_SIGNALS):
+            ax = self.fig.add_subplot(len(SPECTRUM_SIGNALS), 1, i + 1)
+            state_line, = ax.plot([], [], 'b-', label=state_name)
+            force_line, = ax.plot([], [], 'm-', label=force_name, alpha=0.7)
+            markers, = ax.plot([], [], 'rv')
+            ax.set_title(f'{state_name.capitalize()} spectrum')
+            ax.set_xlabel('Frequency (Hz)')
+            ax.set_ylabel('Amplitude')
+            ax.set_yscale('log')
+            ax.grid(True)
+            ax.legend(fontsize='small')
+            self.axes.append(ax)
+            self.lines.append((state_line, force_line))
+            self.peak_markers.append(markers)
+            self.peak_labels.append([ax.annotate("", (0, 0), xytext=(0, 6), textcoords="offset points",
+                                                 ha="center", fontsize="x-small", color="r")
+                                     for _ in range(peak_count)])
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def change_window_size(self, event=None):
+        """Restart the sliding DFT with a new window; history is refilled by the next feed"""
+        self.spectrum = SlidingSpectrum(len(self.columns), int(self.window_selector.get()))
+        self.needs_history = True
+
+    def feed(self, rows, column_index, sample_rate):
+        """Add new sample-buffer rows (oldest first) and remember the current sample rate.
+        When needs_history is set, rows must be the latest full window and replace the state."""
+        if sample_rate:
+            self.sample_rate = sample_rate
+        if self.needs_history:
+            self.spectrum.reset()
+            self.needs_history = False
+        if len(rows) == 0:
+            return
+        self.spectrum.update(rows[:, [column_index[name] for name in self.columns]])
+        self.dirty = True
+
+    def redraw(self):
+        """Redraw lines and peak marks if anything changed since the last frame"""
+        if not self.dirty or not self.sample_rate:
+            return
+        self.dirty = False
+        magnitude = self.spectrum.magnitude()
+        window_size = self.spectrum.window_size
+        freqs = np.arange(magnitude.shape[1]) * self.sample_rate / window_size
+        self.resolution_var.set(f"Resolution: {self.sample_rate / window_size:.3f} Hz")
+        floor = 1e-6  # Keeps the log axis finite where a bin is exactly zero
+
+        for i, ax in enumerate(self.axes):
+            state_mag = magnitude[2 * i]
+            force_mag = magnitude[2 * i + 1]
+            state_line, force_line = self.lines[i]
+            state_line.set_data(freqs[2:], np.maximum(state_mag[2:], floor))
+            force_line.set_data(freqs[2:], np.maximum(force_mag[2:], floor))
+
+            peaks = find_peaks(state_mag, self.peak_count)
+            self.peak_markers[i].set_data(freqs[peaks], state_mag[peaks])
+            for j, label in enumerate(self.peak_labels[i]):
+                if j < len(peaks):
+                    label.xy = (freqs[peaks[j]], state_mag[peaks[j]])
+                    label.set_text(f"{freqs[peaks[j]]:.2f} Hz")
+                    label.set_visible(True)
+                else:
+                    label.set_visible(False)
+
+            ax.relim()
+            ax.autoscale_view()
+        self.canvas.draw_idle()
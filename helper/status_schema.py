@@ -0,0 +1,192 @@
+# status_schema.py
+# Declarative layout of the status/ message, compiled once into fast extractors
+# shared by every page (and any storage) that reads status samples.
+import collections
+import math
+
+MOTOR_KEYS = ("FDX", "FSX", "RDX", "RSX", "UPFDX", "UPFSX", "UPRDX", "UPRSX")
+
+MISSING_TEXT = "N/A"
+
+
+class StatusField:
+    """One status value: flat name, path in the message, type, unit, display format and default.
+
+    kind is "float", "int" or "state" (passed through as received, e.g. bar_state).
+    The default is used in typed records and NumPy rows when the value is missing or invalid;
+    display text shows MISSING_TEXT instead.
+    """
+    __slots__ = ("name", "path", "kind", "unit", "fmt", "default")
+
+    def __init__(self, name, path, kind="float", unit="", fmt=None, default=None):
+        self.name = name
+        self.path = tuple(path)
+        self.kind = kind
+        self.unit = unit
+        if fmt is None:
+            fmt = "{:.3f}" if kind == "float" else "{}"
+        self.fmt = fmt
+        if default is None:
+            default = {"float": 0.0, "int": 0, "state": MISSING_TEXT}[kind]
+        self.default = default
+
+    @property
+    def numeric(self):
+        return self.kind != "state"
+
+
+def _field(name, *path, **kwargs):
+    return StatusField(name, path or (name,), **kwargs)
+
+
+STATUS_FIELDS = (
+    # Vehicle state
+    _field("rov_armed", kind="state"),
+    _field("work_mode", kind="state"),
+    _field("bar_state", kind="state"),
+    _field("imu_state", kind="state"),
+    _field("controller_state_depth", "controller_state", "DEPTH", kind="state"),
+    _field("controller_state_pitch", "controller_state", "PITCH", kind="state"),
+    _field("controller_state_roll", "controller_state", "ROLL", kind="state"),
+    # Navigation
+    _field("depth", unit="m"),
+    _field("Zspeed", unit="m/s"),
+    _field("pitch", unit="deg", fmt="{:.2f}"),
+    _field("angular_y", unit="deg/s"),
+    _field("roll", unit="deg", fmt="{:.2f}"),
+    _field("angular_x", unit="deg/s"),
+    _field("yaw", unit="deg", fmt="{:.2f}"),
+    # Control
+    _field("reference_z", unit="m"),
+    _field("reference_pitch", unit="deg", fmt="{:.2f}"),
+    _field("reference_roll", unit="deg", fmt="{:.2f}"),
+    _field("force_z"),
+    _field("force_pitch"),
+    _field("force_roll"),
+    _field("error_integral_z", "error_integral", "Z"),
+    _field("error_integral_pitch", "error_integral", "PITCH"),
+    _field("error_integral_roll", "error_integral", "ROLL"),
+    _field("obs_z", "obs_states", "z"),
+    _field("obs_roll", "obs_states", "roll"),
+    _field("obs_pitch", "obs_states", "pitch"),
+    _field("motor_thrust_max_xy", fmt="{:.2f}"),
+    _field("motor_thrust_max_z", fmt="{:.2f}"),
+    # Motors
+    *(_field(f"motor_thrust_{key}", "motor_thrust", key, fmt="{:.2f}") for key in MOTOR_KEYS),
+    *(_field(f"pwm_{key}", "pwm", key, kind="int", unit="us") for key in MOTOR_KEYS),
+    # System
+    _field("cpu_temp", unit="degC", fmt="{:.1f}"),
+    _field("cpu_usage", unit="%", fmt="{:.1f}"),
+    _field("ram_total_mb", unit="MB", fmt="{:.0f}"),
+    _field("ram_used_mb", unit="MB", fmt="{:.0f}"),
+    _field("internal_temperature", unit="degC", fmt="{:.1f}"),
+    _field("external_temperature", unit="degC", fmt="{:.1f}"),
+    # ROV-side sample time, when Oceanix publishes it
+    _field("timestamp", unit="s", default=math.nan),
+)
+
+FIELDS_BY_NAME = {field.name: field for field in STATUS_FIELDS}
+FIELD_INDEX = {field.name: i for i, field in enumerate(STATUS_FIELDS)}
+NUMERIC_FIELDS = tuple(field for field in STATUS_FIELDS if field.numeric)
+NUMERIC_FIELD_NAMES = tuple(field.name for field in NUMERIC_FIELDS)
+NUMERIC_INDEX = {name: i for i, name in enumerate(NUMERIC_FIELD_NAMES)}
+
+StatusRecord = collections.namedtuple("StatusRecord", [field.name for field in STATUS_FIELDS])
+
+_EMPTY = {}
+
+
+def _to_float(value, default):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def _to_int(value, default):
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def _to_state(value, default):
+    return default if value is None else value
+
+
+def _to_text(value, fmt):
+    if value is None:
+        return MISSING_TEXT
+    try:
+        return fmt.format(value)
+    except (ValueError, TypeError):
+        return str(value)
+
+
+def _compile(fields, expression):
+    """Generate a flat function over the message: one dict lookup per nested group,
+    then one expression per field built by expression(field_index, field, value_code)."""
+    lines = ["def extract(message):", "    get = message.get"]
+    groups = {}
+    for field in fields:
+        if len(field.path) == 2 and field.path[0] not in groups:
+            group = f"group_{len(groups)}"
+            groups[field.path[0]] = group
+            lines.append(f"    {group} = get({field.path[0]!r})")
+            lines.append(f"    {group} = {group} if type({group}) is dict else _EMPTY")
+    values = []
+    for i, field in enumerate(fields):
+        if len(field.path) == 1:
+            value_code = f"get({field.path[0]!r})"
+        elif len(field.path) == 2:
+            value_code = f"{groups[field.path[0]]}.get({field.path[1]!r})"
+        else:
+            raise ValueError(f"Status paths deeper than two levels are not supported: {field.path}")
+        values.append(expression(i, field, value_code))
+    lines.append("    return (" + ", ".join(values) + ",)")
+    namespace = {
+        "_EMPTY": _EMPTY,
+        "_to_float": _to_float,
+        "_to_int": _to_int,
+        "_to_state": _to_state,
+        "_to_text": _to_text,
+        "_defaults": tuple(field.default for field in fields),
+        "_formats": tuple(field.fmt for field in fields),
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["extract"]
+
+
+_CONVERTERS = {"float": "_to_float", "int": "_to_int", "state": "_to_state"}
+
+_extract_values = _compile(
+    STATUS_FIELDS, lambda i, field, value: f"{_CONVERTERS[field.kind]}({value}, _defaults[{i}])")
+_extract_numeric = _compile(
+    NUMERIC_FIELDS, lambda i, field, value: f"_to_float({value}, _defaults[{i}])")
+_extract_texts = _compile(
+    STATUS_FIELDS, lambda i, field, value: f"_to_text({value}, _formats[{i}])")
+
+
+def extract_record(message):
+    """Typed StatusRecord for one status message (defaults for missing or invalid values)"""
+    return StatusRecord._make(_extract_values(message))
+
+
+def extract_row(message):
+    """Tuple of floats, one per NUMERIC_FIELDS entry"""
+    return _extract_numeric(message)
+
+
+def extract_rows(messages):
+    """(n, len(NUMERIC_FIELDS)) float array for a batch of status messages"""
+    import numpy as np  # Deferred so text-only users don't pay for numpy
+    return np.array([_extract_numeric(message) for message in messages], dtype=float).reshape(-1, len(NUMERIC_FIELDS))
+
+
+def extract_texts(message):
+    """Display strings for every STATUS_FIELDS entry, MISSING_TEXT where absent"""
+    return _extract_texts(message)
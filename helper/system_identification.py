@@ -0,0 +1,312 @@
+# system_identification.py
+# Fits first-order rate models force -> speed for heave, pitch and roll from recorded
+# telemetry, designs PID (augmented LQR) gains and observers for them, and writes them
+# as a .mat file the Config page's "Load .mat File" imports.
+#
+#   python system_identification.py recordings/telemetry-*.jsonl --vehicle ROV --output gains.mat
+#   python system_identification.py plots_20250101_120000.npz --output gains.mat
+#   python system_identification.py recordings/*.jsonl --config config.json --section z=DEPTH_PID,DEPTH_KF
+import argparse
+import json
+import math
+import os
+import time
+import numpy as np
+from status_schema import extract_row, NUMERIC_INDEX
+
+# Axis: (position field, rate field, force field)
+AXES = {
+    "z": ("depth", "Zspeed", "force_z"),
+    "pitch": ("pitch", "angular_y", "force_pitch"),
+    "roll": ("roll", "angular_x", "force_roll"),
+}
+# Config sections of each axis, also used by controller_sandbox.py. The controller section holds
+# Kp, Ki, Kd (and optionally max_integral, max_force), the observer section the identified model
+# (A, B, C, L, tau, gain, bias, delay, dt); max_force optionally names the axis' force limit as
+# SECTION.key. The defaults are rov_simulator.py's layout. controller_sections.json next to this
+# file overrides them per axis for a real vehicle:
+# {"z": {"controller": ..., "observer": ..., "max_force": "SECTION.key"}, ...}
+SECTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "controller_sections.json")
+DEFAULT_SECTIONS = {
+    "z": {"controller": "DEPTH_CONTROLLER", "observer": "DEPTH_OBSERVER", "max_force": "THRUSTERS.max_force_z"},
+    "pitch": {"controller": "PITCH_CONTROLLER", "observer": "PITCH_OBSERVER"},
+    "roll": {"controller": "ROLL_CONTROLLER", "observer": "ROLL_OBSERVER"},
+}
+# Largest acceptable error per axis (Bryson's rule weights for the LQR design)
+MAX_ERROR = {"z": 0.1, "pitch": 5.0, "roll": 5.0}
+MAX_ERROR_INTEGRAL_TIME = 5.0  # Integral weight: the error may persist this many seconds
+MAX_DELAY_SAMPLES = 10  # Input delays tried by the fit
+GAP_S = 0.5  # Longer gaps between samples split the recording into segments
+MIN_SAMPLES = 200
+
+
+def load_sections(path=SECTIONS_FILE):
+    """Axis -> section names, from controller_sections.json if present, otherwise DEFAULT_SECTIONS"""
+    sections = {axis: dict(names) for axis, names in DEFAULT_SECTIONS.items()}
+    if not os.path.exists(path):
+        return sections
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read controller sections from {path}, using defaults: {e}")
+        return sections
+    for axis, names in overrides.items():
+        if axis in sections and isinstance(names, dict):
+            sections[axis].update(names)
+        else:
+            print(f"Ignored controller sections for unknown axis {axis!r} in {path}")
+    return sections
+
+
+def parse_section_options(specs, sections):
+    """Apply ["axis=CONTROLLER,OBSERVER", ...] to a copy of sections"""
+    sections = {axis: dict(names) for axis, names in sections.items()}
+    for spec in specs:
+        axis, _, names = spec.partition("=")
+        controller, _, observer = names.partition(",")
+        if axis not in sections or not controller or not observer:
+            raise ValueError(f"Expected axis=CONTROLLER,OBSERVER with axis one of {', '.join(sections)}, got {spec!r}")
+        sections[axis].update(controller=controller.strip(), observer=observer.strip())
+    return sections
+
+
+def missing_sections(sections, config):
+    """{axis: [section names absent from a nested config document]}"""
+    missing = {}
+    for axis, names in sections.items():
+        absent = [names[role] for role in ("controller", "observer") if not isinstance(config.get(names[role]), dict)]
+        if absent:
+            missing[axis] = absent
+    return missing
+
+
+def read_npz(path):
+    """Time and fields of a plot export (.npz with one array per column)"""
+    data = np.load(path)
+    return {name: np.asarray(data[name], dtype=float) for name in data.files}
+
+
+def read_jsonl(paths, vehicle=None):
+    """Time and fields of the status/ messages in telemetry_daemon recordings, in time order.
+    Uses the ROV's timestamp when it publishes one, otherwise the arrival time."""
+    times, rows = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if 'status/"' not in line:  # Cheap filter before parsing
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not record["topic"].endswith("status/") or (vehicle and record.get("vehicle") != vehicle):
+                    continue
+                message = record["message"]
+                if not isinstance(message, dict):
+                    continue
+                row = extract_row(message)
+                stamp = row[NUMERIC_INDEX["timestamp"]]
+                times.append(stamp if math.isfinite(stamp) else record["time"])
+                rows.append(row)
+    if not rows:
+        return {}
+    rows = np.array(rows, dtype=float)
+    times = np.array(times)
+    order = np.argsort(times, kind="stable")
+    columns = {name: rows[order, i] for name, i in NUMERIC_INDEX.items()}
+    columns["time"] = times[order]
+    return columns
+
+
+def resample(columns, names, dt=None):
+    """Interpolate the named fields onto a uniform grid; returns (dt, {name: array}, valid mask).
+    Grid points inside gaps longer than GAP_S are invalid."""
+    t = columns["time"]
+    keep = np.concatenate(([True], np.diff(t) > 0))  # Drop duplicate timestamps
+    t = t[keep]
+    if dt is None:
+        dt = float(np.median(np.diff(t)))
+    grid = np.arange(t[0], t[-1], dt)
+    right = np.clip(np.searchsorted(t, grid, side="right"), 1, len(t) - 1)
+    valid = (t[right] - t[right - 1]) <= GAP_S
+    return dt, {name: np.interp(grid, t, columns[name][keep]) for name in names}, valid
+
+
+def fit_rate_models(signals, valid, axes=AXES, max_delay=MAX_DELAY_SAMPLES):
+    """Least-squares fit of v[k+1] = a v[k] + b u[k-d] + c for every axis and delay d at once.
+
+    The 3x3 normal equations of all axes and delays are accumulated with vectorized
+    sums (one pass per delay over all axes) and solved as one batch; the delay with
+    the smallest residual wins per axis. Returns {axis: {"a", "b", "c", "delay", "r2", "residual_std"}}.
+    """
+    names = list(axes)
+    n = len(valid)
+    k = np.arange(max_delay, n - 1)  # Sample index of each regression row
+    rates = np.stack([signals[axes[axis][1]] for axis in names])  # (axes, n)
+    forces = np.stack([signals[axes[axis][2]] for axis in names])
+    v, v_next = rates[:, k], rates[:, k + 1]
+    both_valid = valid[k + 1] & valid[k]
+
+    delays = max_delay + 1
+    XtX = np.empty((len(names), delays, 3, 3))
+    Xty = np.empty((len(names), delays, 3))
+    yy = np.empty((len(names), delays))
+    counts = np.empty(delays)
+    for d in range(delays):
+        # Rows whose samples all lie outside gaps
+        w = (both_valid & valid[k - d]).astype(float)
+        u = forces[:, k - d]
+        columns = (v, u, np.broadcast_to(w, v.shape))
+        for i in range(3):
+            for j in range(i, 3):
+                XtX[:, d, i, j] = XtX[:, d, j, i] = (columns[i] * columns[j] * w).sum(axis=1)
+            Xty[:, d, i] = (columns[i] * v_next * w).sum(axis=1)
+        yy[:, d] = (v_next ** 2 * w).sum(axis=1)
+        counts[d] = w.sum()
+    XtX += np.eye(3) * 1e-9  # Keeps constant inputs from making the system singular
+    theta = np.linalg.solve(XtX, Xty[..., None])[..., 0]  # (axes, delays, 3)
+    # Residual sum of squares from the normal equations: y'y - 2 theta'X'y + theta'X'X theta
+    sse = yy - 2 * np.einsum("adi,adi->ad", theta, Xty) + np.einsum("adi,adij,adj->ad", theta, XtX, theta)
+    sse = np.maximum(sse, 0.0)
+    best = np.argmin(sse, axis=1)
+
+    models = {}
+    for i, axis in enumerate(names):
+        d = best[i]
+        a, b, c = theta[i, d]
+        count = max(counts[d], 1.0)
+        mean = Xty[i, d, 2] / count  # The constant column sums v_next
+        variance = yy[i, d] / count - mean ** 2
+        models[axis] = {
+            "a": float(a), "b": float(b), "c": float(c), "delay": int(d),
+            "r2": float(1 - sse[i, d] / (variance * count)) if variance > 0 else float("nan"),
+            "residual_std": float(math.sqrt(sse[i, d] / count)),
+        }
+    return models
+
+
+def continuous_model(model, dt):
+    """Time constant tau, gain K and bias of tau v' = -v + K u + bias from the discrete fit"""
+    a = min(max(model["a"], 1e-6), 1 - 1e-9)
+    tau = -dt / math.log(a)
+    gain = model["b"] / (1 - a)
+    bias = model["c"] / (1 - a)
+    return tau, gain, bias
+
+
+def design_axis(axis, model, dt, max_force, measurement_std, sections=DEFAULT_SECTIONS):
+    """PID gains from an LQR on [error integral, position, rate] and a steady-state Kalman observer on
+    [position, rate] measuring position. Returns {section: {key: value}} for the axis."""
+    from scipy.linalg import solve_continuous_are  # Deferred: only needed for the design step
+
+    tau, gain, bias = continuous_model(model, dt)
+    A = np.array([[0.0, 1.0], [0.0, -1.0 / tau]])
+    B = np.array([[0.0], [gain / tau]])
+    C = np.array([[1.0, 0.0]])
+
+    # Integral augmentation: z' = position error, so u = -(Ki z + Kp e + Kd v) is a PID on the error
+    A_aug = np.block([[np.zeros((1, 1)), C], [np.zeros((2, 1)), A]])
+    B_aug = np.vstack([np.zeros((1, 1)), B])
+    max_error = MAX_ERROR[axis]
+    Q = np.diag([1 / (max_error * MAX_ERROR_INTEGRAL_TIME) ** 2, 1 / max_error ** 2, 0.0])
+    R = np.array([[1 / max_force ** 2]])
+    P = solve_continuous_are(A_aug, B_aug, Q, R)
+    ki, kp, kd = (np.linalg.solve(R, B_aug.T @ P))[0]
+
+    # Process noise from the fit residual (per step, in rate units), measurement noise given
+    process_variance = (model["residual_std"] / dt) ** 2 * dt
+    Qn = np.diag([1e-9, process_variance])
+    Rn = np.array([[max(measurement_std, 1e-6) ** 2]])
+    Pn = solve_continuous_are(A.T, C.T, Qn, Rn)
+    L = Pn @ C.T @ np.linalg.inv(Rn)
+
+    controller, observer = sections[axis]["controller"], sections[axis]["observer"]
+    return {
+        controller: {"Kp": float(kp), "Ki": float(ki), "Kd": float(kd)},
+        observer: {"A": A, "B": B, "C": C, "L": L, "tau": tau, "gain": gain, "bias": bias,
+                   "delay": model["delay"] * dt, "dt": dt},
+    }
+
+
+def estimate_measurement_std(position, rate, dt, valid):
+    """Position noise from what position steps disagree with the integrated rate"""
+    mismatch = np.diff(position) - dt * rate[:-1]
+    mismatch = mismatch[valid[1:] & valid[:-1]]
+    return float(np.std(np.diff(mismatch)) / math.sqrt(6)) if len(mismatch) > 2 else 0.0
+
+
+def identify(columns, axes=AXES, dt=None, sections=DEFAULT_SECTIONS):
+    """Fit every excited axis and design its controller and observer.
+    Returns (models, {section: {key: value}}, dt); axes whose force or rate never changes are left out."""
+    names = sorted({name for fields in axes.values() for name in fields})
+    dt, signals, valid = resample(columns, names, dt)
+    if valid.sum() < MIN_SAMPLES:
+        raise ValueError(f"Only {int(valid.sum())} usable samples, need at least {MIN_SAMPLES}")
+    axes = {axis: fields for axis, fields in axes.items()
+            if np.ptp(signals[fields[1]][valid]) > 0 and np.ptp(signals[fields[2]][valid]) > 0}
+    if not axes:
+        raise ValueError("No axis was excited: force and rate are constant in the recording")
+    models = fit_rate_models(signals, valid, axes)
+    design = {}
+    for axis, (position, rate, force) in axes.items():
+        max_force = float(np.max(np.abs(signals[force][valid]))) or 1.0
+        measurement_std = estimate_measurement_std(signals[position], signals[rate], dt, valid)
+        design.update(design_axis(axis, models[axis], dt, max_force, measurement_std, sections))
+    return models, design, dt
+
+
+def mat_variables(design):
+    """{SECTION__key: value} as Load .mat File matches them by full path"""
+    from config_model import MAT_PATH_SEPARATOR
+    return {f"{section}{MAT_PATH_SEPARATOR}{key}": value
+            for section, values in design.items() for key, value in values.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Identify heave/pitch/roll models from telemetry and design gains")
+    parser.add_argument("recordings", nargs="+", help="telemetry_daemon .jsonl files or one plot export .npz")
+    parser.add_argument("--vehicle", help="Only use this vehicle's messages from .jsonl recordings")
+    parser.add_argument("--dt", type=float, help="Resampling step (default: median sample interval)")
+    parser.add_argument("--output", default="identified_gains.mat", help=".mat file for the Config page")
+    parser.add_argument("--section", action="append", default=[], metavar="AXIS=CONTROLLER,OBSERVER",
+                        help="Config sections the results of an axis (z, pitch, roll) are written to")
+    parser.add_argument("--config", help="Vehicle config.json (e.g. saved from the Config tab) to check the sections against")
+    args = parser.parse_args()
+
+    try:
+        sections = parse_section_options(args.section, load_sections())
+    except ValueError as e:
+        parser.error(str(e))
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+        missing = missing_sections(sections, config)
+        if len(missing) == len(sections):
+            raise SystemExit(f"None of the controller sections are in {args.config} (its sections: {', '.join(config)}); "
+                             "name them with --section or controller_sections.json")
+        for axis, absent in missing.items():
+            print(f"Warning: {', '.join(absent)} ({axis}) not in {args.config}; Load .mat File will list those variables as unmatched")
+
+    start = time.perf_counter()
+    if len(args.recordings) == 1 and args.recordings[0].endswith(".npz"):
+        columns = read_npz(args.recordings[0])
+    else:
+        columns = read_jsonl(args.recordings, args.vehicle)
+    if not columns:
+        raise SystemExit("No status/ samples found")
+    loaded = time.perf_counter()
+    models, design, dt = identify(columns, dt=args.dt, sections=sections)
+    fitted = time.perf_counter()
+
+    print(f"{len(columns['time'])} samples, dt {dt * 1000:.1f} ms; read in {loaded - start:.2f} s, "
+          f"fitted and designed in {fitted - loaded:.2f} s")
+    for axis, model in models.items():
+        tau, gain, bias = continuous_model(model, dt)
+        controller = design[sections[axis]["controller"]]
+        print(f"{axis:>5}: tau {tau:.3f} s, gain {gain:.4g}, bias {bias:.4g}, delay {model['delay'] * dt * 1000:.0f} ms, "
+              f"R^2 {model['r2']:.3f} -> Kp {controller['Kp']:.4g} Ki {controller['Ki']:.4g} Kd {controller['Kd']:.4g}")
+
+    import scipy.io  # Deferred like the Config page's .mat import
+    scipy.io.savemat(args.output, mat_variables(design))
+    print(f"Wrote {args.output}")
@@ -0,0 +1,242 @@
+# telemetry_daemon.py
+# Headless mode: record every vehicle's MQTT traffic to rotating JSONL files and
+# serve current status values and ingest counters on a local Prometheus-style endpoint.
+#
+#   python telemetry_daemon.py --output recordings --port 9108
+#   curl http://127.0.0.1:9108/metrics
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from mqtt_handler import create_sessions, load_vehicles
+from status_schema import NUMERIC_FIELD_NAMES, NUMERIC_INDEX, extract_row
+
+RECORD_QUEUE_SIZE = 10000  # Lines waiting for the writer; beyond this new lines are dropped and counted
+RECONNECT_INTERVAL_S = 5  # Between first connection attempts while a broker is unreachable
+RECONNECT_MAX_DELAY_S = 30  # Longest wait of paho's own reconnects once a session is up
+
+
+class RotatingRecorder:
+    """Appends JSON lines from a writer thread to size-rotated files, keeping at most max_files.
+
+    record() never blocks the MQTT thread: when the queue is full the line is dropped.
+    """
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, max_files=20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.queue = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.write_latency_sum = 0.0  # Seconds from arrival to the line being written
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.writer, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, arrival, vehicle, topic, message):
+        try:
+            self.queue.put_nowait((arrival, vehicle, topic, message))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def open_new_file(self):
+        if self.file is not None:
+            self.file.close()
+        name = time.strftime("telemetry-%Y%m%d-%H%M%S", time.localtime())
+        path = os.path.join(self.directory, f"{name}.jsonl")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{name}-{suffix}.jsonl")
+            suffix += 1
+        self.file = open(path, "a", encoding="utf-8")
+        # Drop the oldest recordings beyond max_files
+        recordings = sorted(glob.glob(os.path.join(self.directory, "telemetry-*.jsonl")), key=os.path.getmtime)
+        for old in recordings[:-self.max_files]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                print(f"Failed to remove old recording {old}: {e}")
+
+    def writer(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            arrival, vehicle, topic, message = item
+            if self.file is None or self.file.tell() >= self.max_bytes:
+                self.open_new_file()
+            self.file.write(json.dumps({"time": arrival, "vehicle": vehicle, "topic": topic, "message": message}) + "\n")
+            if self.queue.empty():
+                self.file.flush()
+            with self.lock:
+                self.written += 1
+                self.write_latency_sum += time.time() - arrival
+        if self.file is not None:
+            self.file.close()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5.0)
+
+
+class TelemetryMetrics:
+    """Latest status values and ingest counters per vehicle, rendered as Prometheus text"""
+    def __init__(self, recorder=None):
+        self.recorder = recorder
+        self.lock = threading.Lock()
+        self.messages = {}  # (vehicle, topic) -> count
+        self.last_arrival = {}  # (vehicle, topic) -> wall time
+        self.status = {}  # vehicle -> latest numeric status row
+        self.connected = {}  # vehicle -> bool
+        self.transport_latency = {}  # vehicle -> [last, sum, count] from the status timestamp field
+        self.started = time.time()
+
+    def on_message(self, vehicle, topic, message, arrival, is_status):
+        row = extract_row(message) if is_status and isinstance(message, dict) else None
+        with self.lock:
+            key = (vehicle, topic)
+            self.messages[key] = self.messages.get(key, 0) + 1
+            self.last_arrival[key] = arrival
+            if row is not None:
+                self.status[vehicle] = row
+                sent = row[NUMERIC_INDEX["timestamp"]]
+                if sent == sent:  # Not NaN: the ROV stamped the sample
+                    latency = self.transport_latency.setdefault(vehicle, [0.0, 0.0, 0])
+                    latency[0] = arrival - sent
+                    latency[1] += arrival - sent
+                    latency[2] += 1
+
+    def on_connection(self, vehicle, connected):
+        with self.lock:
+            self.connected[vehicle] = connected
+
+    def render(self):
+        now = time.time()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        def summary(name, help_text, samples):
+            """samples: (labels, sum, count)"""
+            metric(name, "summary", help_text, [])
+            for labels, total, count in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}_sum{label_text} {total}")
+                lines.append(f"{name}_count{label_text} {count}")
+
+        with self.lock:
+            metric("helper_uptime_seconds", "gauge", "Seconds since the daemon started",
+                   [({}, now - self.started)])
+            metric("helper_mqtt_connected", "gauge", "1 while the vehicle's broker is connected",
+                   [({"vehicle": vehicle}, int(connected)) for vehicle, connected in self.connected.items()])
+            metric("helper_messages_received_total", "counter", "MQTT messages received",
+                   [({"vehicle": vehicle, "topic": topic}, count) for (vehicle, topic), count in self.messages.items()])
+            metric("helper_message_age_seconds", "gauge", "Seconds since the last message on the topic",
+                   [({"vehicle": vehicle, "topic": topic}, now - arrival)
+                    for (vehicle, topic), arrival in self.last_arrival.items()])
+            metric("helper_status_transport_latency_last_seconds", "gauge",
+                   "Arrival time minus the status timestamp of the last sample (needs synchronized clocks)",
+                   [({"vehicle": vehicle}, latency[0]) for vehicle, latency in self.transport_latency.items()])
+            summary("helper_status_transport_latency_seconds", "Arrival time minus the status timestamp",
+                    [({"vehicle": vehicle}, latency[1], latency[2]) for vehicle, latency in self.transport_latency.items()])
+            metric("rov_status", "gauge", "Latest value of each numeric status field",
+                   [({"vehicle": vehicle, "field": name}, row[i])
+                    for vehicle, row in self.status.items() for i, name in enumerate(NUMERIC_FIELD_NAMES)])
+        if self.recorder is not None:
+            recorder = self.recorder
+            with recorder.lock:
+                written, dropped, latency_sum = recorder.written, recorder.dropped, recorder.write_latency_sum
+            metric("helper_recorded_lines_total", "counter", "Messages written to the recording", [({}, written)])
+            metric("helper_recording_dropped_total", "counter", "Messages dropped because the writer fell behind",
+                   [({}, dropped)])
+            metric("helper_recording_queue_depth", "gauge", "Messages waiting to be written",
+                   [({}, recorder.queue.qsize())])
+            summary("helper_recording_latency_seconds", "Delay from arrival to the line being written",
+                    [({}, latency_sum, written)])
+        return "\n".join(lines) + "\n"
+
+
+def make_handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # One line per scrape would fill the console on long runs
+
+    return MetricsHandler
+
+
+def run(output, port, max_bytes, max_files, record=True):
+    recorder = RotatingRecorder(output, max_bytes, max_files) if record else None
+    metrics = TelemetryMetrics(recorder)
+    sessions = create_sessions(load_vehicles())
+
+    for session in sessions:
+        def on_message(message, topic, session=session):
+            arrival = time.time()
+            metrics.on_message(session.name, topic, message, arrival, topic == session.topic_status)
+            if recorder is not None:
+                recorder.record(arrival, session.name, topic, message)
+        session.register_callback(on_message)
+        session.register_connection_callback(
+            lambda connected, session=session: metrics.on_connection(session.name, connected))
+        metrics.on_connection(session.name, False)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(metrics))
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    try:
+        # Retry each session until its first connect succeeds; from then on paho's network
+        # loop reconnects by itself, and a second connect() would race with it
+        waiting = list(sessions)
+        while True:
+            for session in list(waiting):
+                try:
+                    if session.connect() >= 0:
+                        session.client.reconnect_delay_set(min_delay=1, max_delay=RECONNECT_MAX_DELAY_S)
+                        waiting.remove(session)
+                except Exception as e:
+                    print(f"Error connecting to {session.name}: {e}")
+            time.sleep(RECONNECT_INTERVAL_S)
+    except KeyboardInterrupt:
+        print("Stopping telemetry daemon")
+    finally:
+        server.shutdown()
+        for session in sessions:
+            session.disconnect()
+        if recorder is not None:
+            recorder.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record ROV telemetry and serve metrics without the GUI")
+    parser.add_argument("--output", default="recordings", help="Directory for the JSONL recordings")
+    parser.add_argument("--port", type=int, default=9108, help="Local port of the /metrics endpoint")
+    parser.add_argument("--max-file-mb", type=float, default=50, help="Size at which a recording is rotated")
+    parser.add_argument("--max-files", type=int, default=20, help="Recordings kept; older ones are deleted")
+    parser.add_argument("--no-record", action="store_true", help="Only serve metrics")
+    args = parser.parse_args()
+    run(args.output, args.port, int(args.max_file_mb * 1024 * 1024), args.max_files, not args.no_record)
@@ -1,20 +1,51 @@
 # update_configuration_page.py
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import collections
 import json
-import copy
-import numpy as np
-import scipy.io
-from mqtt_handler import register_callback, mqtt_send_message, MQTT_TOPIC_COMMANDS, MQTT_TOPIC_CONFIG
+import queue
+import threading
+import time
+from mqtt_handler import get_default_session
+from frame_scheduler import PRIORITY_LOW
+from config_model import ConfigModel, parse_text
+from matrix_editor import MatrixEditor, shape_text
+from config_history import ConfigSnapshotStore, ConfigHistoryWindow
+from mat_import import read_mat_variables
+from controller_sandbox import ControllerSandboxWindow
+
+ACK_TIMEOUT_S = 5.0  # Sent changes not echoed back by the ROV within this time are reported
+CONFIG_APPLY_INTERVAL_MS = 100  # How often received configs are processed, and shown while visible
+DIRTY_COLOR = "lightyellow"  # Background of entries edited but not yet sent
 
 class UpdateConfigurationPage(tk.Frame):
-    def __init__(self, parent, controller):
+    def __init__(self, parent, controller, session=None):
         super().__init__(parent)
         self.controller = controller
-        self.current_config = {}
-        self.entry_widgets = {}
-        self.labels = {}
-        self.key_paths = {}  # Stores the full path [section, subsection, ..., key] for each parameter key
+        self.session = session or get_default_session()
+        self.model = None  # ConfigModel of the last received configuration, plus imported values
+        # Widgets by full path tuple: section labels, and (label, entry) per parameter
+        self.section_labels = {}
+        self.param_widgets = {}
+        self.entry_widgets = {}  # Full path tuple -> Entry
+        self.array_edits = {}  # Full path tuple -> edited vector/matrix not yet sent
+        self.received_text = {}  # Full path tuple -> text of the last received value
+        self.widget_rows = {}  # Widget -> grid row, so unchanged rows aren't re-gridded
+        self.entry_background = None  # Default Entry background, restored once an edit is sent or reverted
+        self.button_background = None  # Same for the buttons of vector/matrix parameters
+        self.visible = False
+        # (config, arrival time) from the MQTT thread, every one processed and stored on the Tk thread
+        self.received_configs = collections.deque()
+        self.view_stale = False  # The model changed since the widgets were last reconciled
+        self.confirmed_values = {}  # Path -> value as last reported by the ROV; patches are computed against it
+        self.sent_payload = None  # Last payload we published, to drop our own echo on config/
+        self.pending_ack = None  # (expected values by path, send time) until the ROV reports them
+        self.sent_patch_paths = None  # Leaf paths of the patch just sent, until the next config/ arrives
+        self.history = ConfigSnapshotStore()  # Every full config received or sent, by content hash
+        self.history_window = None
+        self.mat_thread = None
+        self.mat_queue = queue.Queue()  # (fraction, message, result) from the import thread
+        self.mat_task = None
 
         # Create a canvas and scrollbar for scrollable interface
         self.canvas = tk.Canvas(self, borderwidth=0)
@@ -49,6 +80,10 @@ class UpdateConfigurationPage(tk.Frame):
         send_button = tk.Button(self.button_frame, text="Send Configuration", command=self.send_updated_configuration)
         send_button.pack(side='left', padx=5)
 
+        # Fallback for when the ROV side lost track: publish the whole document
+        send_full_button = tk.Button(self.button_frame, text="Send Full", command=lambda: self.send_updated_configuration(full=True))
+        send_full_button.pack(side='left', padx=5)
+
         # Add Save Config button
         save_button = tk.Button(self.button_frame, text="Save Config to File", command=self.save_configuration_to_file)
         save_button.pack(side='left', padx=5)
@@ -56,105 +91,219 @@ class UpdateConfigurationPage(tk.Frame):
         # Add Load .mat File button (conditionally enabled)
         self.load_mat_button = tk.Button(self.button_frame, text="Load .mat File", command=self.load_mat_file)
         self.load_mat_button.pack(side='left', padx=5)
+        self.mat_progress = ttk.Progressbar(self.button_frame, length=80, maximum=1.0)
+        self.mat_progress.pack(side='left', padx=5)
 
+        history_button = tk.Button(self.button_frame, text="History", command=self.open_history)
+        history_button.pack(side='left', padx=5)
 
-        # Register the callback to handle incoming MQTT messages
-        register_callback(self.load_config_into_gui)
-
-    def _populate_gui_recursive(self, parent_frame, config_level, current_path, row_index):
-        """Recursively populates the GUI based on nested configuration."""
-        indent_level = len(current_path)
-        indent_px = indent_level * 20 # Pixels of indentation per level
-
-        for key, value in config_level.items():
-            full_path = current_path + [key]
-
-            if isinstance(value, dict):
-                # Add a section/subsection label
-                section_label_text = f"{' ' * indent_level * 2}--- {key} ---" # Text indentation
-                section_label = tk.Label(parent_frame, text=section_label_text, font=("Arial", 10, "bold"))
-                # Grid indentation using padx
-                section_label.grid(row=row_index, column=0, columnspan=2, pady=(10, 5), sticky="w", padx=(10 + indent_px, 10))
-                self.labels["_section_" + "_".join(full_path)] = section_label # Store section labels if needed
-                row_index += 1
-                # Recursively process the nested dictionary
-                row_index = self._populate_gui_recursive(parent_frame, value, full_path, row_index)
-            else:
-                # Check if the value is a list (vector) and skip if it is
-                if isinstance(value, list):
-                    print(f"Skipping list parameter: {key}") # Optional: for debugging
-                    continue # Skip this parameter
-
-                # It's a parameter (and not a list)
-                param_key_str = str(key) # Ensure key is string for dict keys
-                self.key_paths[param_key_str] = full_path # Store the full path for this parameter key
-
-                # Create label
-                label_text = f"{' ' * indent_level * 2}{param_key_str}" # Text indentation
-                self.labels[param_key_str] = tk.Label(parent_frame, text=label_text)
-                # Grid indentation using padx
-                self.labels[param_key_str].grid(row=row_index, column=0, sticky='w', padx=(10 + indent_px, 10))
-
-                # Create entry
-                entry = tk.Entry(parent_frame)
-                entry.grid(row=row_index, column=1, padx=5, pady=2, sticky='ew')
-                self.entry_widgets[param_key_str] = entry
-
-                # Update entry value
-                entry.delete(0, tk.END)
-                entry.insert(0, str(value))
-
-                row_index += 1
-        return row_index
-
+        # Preview the edited controllers on perturbed plants before sending them
+        sandbox_button = tk.Button(self.button_frame, text="Sandbox", command=self.open_sandbox)
+        sandbox_button.pack(side='left', padx=5)
 
-    def load_config_into_gui(self, config, topic):
-        if topic != MQTT_TOPIC_CONFIG:
-            return
+        # Outcome of the last send: acknowledged changes and their round-trip time
+        self.send_status_var = tk.StringVar()
+        tk.Label(self.button_frame, textvariable=self.send_status_var).pack(side='left', padx=10)
 
-        self.current_config = config.copy() # Store the received config
-        self.key_paths.clear() # Clear previous paths
+        # Received configs update the model and the history from the frame clock whether or not
+        # the page is shown; only the widgets wait until it is visible
+        self.receive_task = controller.scheduler.add_task(
+            f"{self.session.name} config receive", self.process_received_configs, CONFIG_APPLY_INTERVAL_MS,
+            priority=PRIORITY_LOW, budget_ms=10)
+        self.apply_task = controller.scheduler.add_task(
+            f"{self.session.name} config view", self.refresh_view, CONFIG_APPLY_INTERVAL_MS,
+            priority=PRIORITY_LOW, budget_ms=10, active=False)
 
-        # Destroy existing widgets before creating new ones
-        for widget in self.scrollable_frame.winfo_children():
-             # Keep the button frame
-            if widget != self.button_frame:
-                widget.destroy()
-
-        # Clear references
-        self.labels.clear()
-        self.entry_widgets.clear()
+        # Register the callback to handle incoming MQTT messages
+        self.session.register_callback(self.load_config_into_gui)
+
+    def _place(self, widget, row, **grid_options):
+        """Grid a widget, touching the geometry manager only if its row changed"""
+        if self.widget_rows.get(widget) != row:
+            widget.grid(row=row, **grid_options)
+            self.widget_rows[widget] = row
+
+    def _reconcile_widgets(self, model):
+        """Bring the widgets in line with the model, creating, moving, updating or removing only what changed.
+        Entries the user edited (text differs from the last received value) keep their text."""
+        parent_frame = self.scrollable_frame
+        seen_sections = set()
+        seen_params = set()
+        for row_index, (kind, path, value) in enumerate(model.rows(), start=1):  # Row 0 holds the buttons
+            indent_level = len(path) - 1
+            indent_px = indent_level * 20 # Pixels of indentation per level
+            if kind == "section":
+                seen_sections.add(path)
+                section_label = self.section_labels.get(path)
+                if section_label is None:
+                    section_label_text = f"{' ' * indent_level * 2}--- {path[-1]} ---" # Text indentation
+                    section_label = tk.Label(parent_frame, text=section_label_text, font=("Arial", 10, "bold"))
+                    self.section_labels[path] = section_label
+                self._place(section_label, row_index, column=0, columnspan=2, pady=(10, 5), sticky="w", padx=(10 + indent_px, 10))
+                continue
 
-        # Start populating the GUI recursively from row 1 (below button frame)
-        self._populate_gui_recursive(self.scrollable_frame, self.current_config, [], 1)
+            seen_params.add(path)
+            is_array = model.kinds[path] == "array"
+            widgets = self.param_widgets.get(path)
+            if widgets is not None and isinstance(widgets[1], tk.Button) != is_array:
+                self._remove_param(path)  # The parameter changed between scalar and array
+                widgets = None
+            if is_array:
+                # Vectors and matrices open in the table editor; their button shows the shape
+                if widgets is None:
+                    label = tk.Label(parent_frame, text=f"{' ' * indent_level * 2}{path[-1]}")
+                    button = tk.Button(parent_frame, command=lambda path=path: self.edit_array(path))
+                    self.param_widgets[path] = widgets = (label, button)
+                self._update_array_button(path)
+                self._place(widgets[0], row_index, column=0, sticky='w', padx=(10 + indent_px, 10))
+                self._place(widgets[1], row_index, column=1, padx=5, pady=2, sticky='w')
+                continue
 
-        # Update the scroll region after adding all widgets
-        self.scrollable_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            text = str(value)
+            if widgets is None:
+                label = tk.Label(parent_frame, text=f"{' ' * indent_level * 2}{path[-1]}")
+                entry = tk.Entry(parent_frame)
+                self.entry_background = entry.cget("background")
+                entry.insert(0, text)
+                entry.bind("<KeyRelease>", lambda e, path=path: self._update_dirty_marker(path))
+                self.param_widgets[path] = (label, entry)
+                self.entry_widgets[path] = entry
+                self.received_text[path] = text
+            else:
+                label, entry = widgets
+                previous_text = self.received_text[path]
+                if text != previous_text:
+                    # Only overwrite entries the user hasn't edited since the last received value
+                    if entry.get() == previous_text:
+                        entry.delete(0, tk.END)
+                        entry.insert(0, text)
+                    self.received_text[path] = text
+                    self._update_dirty_marker(path)
+            self._place(label, row_index, column=0, sticky='w', padx=(10 + indent_px, 10))
+            self._place(entry, row_index, column=1, padx=5, pady=2, sticky='ew')
+
+        for path in [path for path in self.section_labels if path not in seen_sections]:
+            self._forget(self.section_labels.pop(path))
+        for path in [path for path in self.param_widgets if path not in seen_params]:
+            self._remove_param(path)
+
+    def _remove_param(self, path):
+        label, widget = self.param_widgets.pop(path)
+        self._forget(label)
+        self._forget(widget)
+        self.entry_widgets.pop(path, None)
+        self.received_text.pop(path, None)
+        self.array_edits.pop(path, None)
+
+    def _forget(self, widget):
+        self.widget_rows.pop(widget, None)
+        widget.destroy()
+
+    def _update_dirty_marker(self, path):
+        """Highlight entries whose text differs from the last received value"""
+        entry = self.entry_widgets[path]
+        dirty = entry.get() != self.received_text[path]
+        background = DIRTY_COLOR if dirty else self.entry_background
+        if entry.cget("background") != background:
+            entry.config(background=background)
+
+    def _update_array_button(self, path):
+        """Show the shape of a vector/matrix parameter and mark it until the ROV confirms an edit"""
+        button = self.param_widgets[path][1]
+        if self.button_background is None:
+            self.button_background = button.cget("background")
+        value = self.array_edits.get(path, self.model.get(path))
+        dirty = value != self.confirmed_values.get(path)
+        button.config(text=f"Edit [{shape_text(value)}]...", background=DIRTY_COLOR if dirty else self.button_background)
+
+    def edit_array(self, path):
+        """Open the table editor for a vector/matrix parameter; the result is sent with the next send"""
+        value = self.array_edits.get(path, self.model.get(path))
+
+        def apply(new_value):
+            if new_value == self.model.get(path):
+                self.array_edits.pop(path, None)
+            else:
+                self.array_edits[path] = new_value
+            if path in self.param_widgets:
+                self._update_array_button(path)
 
+        try:
+            MatrixEditor(self, '.'.join(path), value, apply)
+        except ValueError as e:
+            messagebox.showerror("Can't Edit Parameter", f"{'.'.join(path)}: {e}")
 
-    def _find_and_update_key(self, config_level, target_key, new_value):
-        """Recursively searches for target_key in config_level and updates its value."""
-        if not isinstance(config_level, dict):
-            return False
+    def on_show(self):
+        """Show configs that arrived while hidden and keep showing new ones"""
+        self.visible = True
+        self.refresh_view()
+        self.controller.scheduler.set_active(self.apply_task, True)
 
-        for key, value in config_level.items():
-            if key == target_key:
-                # Found the key, update its value directly
-                config_level[key] = new_value
-                print(f"Updated key '{target_key}' with new value.")
-                return True
-            elif isinstance(value, dict):
-                # Recurse into nested dictionary
-                if self._find_and_update_key(value, target_key, new_value):
-                    return True # Key was found and updated in nested dict
-        return False # Key not found at this level or its descendants
+    def on_hide(self):
+        self.visible = False
+        self.controller.scheduler.set_active(self.apply_task, False)
 
+    def load_config_into_gui(self, config, topic):
+        """Queue a config reported by the ROV - runs in MQTT thread, processed by process_received_configs"""
+        if topic != self.session.topic_config or not isinstance(config, dict):
+            return
+        if self.sent_payload is not None and config == self.sent_payload:
+            self.sent_payload = None  # Our own publish coming back from the broker, not the ROV
+            return
+        self.received_configs.append((config, time.perf_counter()))
+
+    def process_received_configs(self):
+        """Merge every received config into the model, store it in the history and check pending
+        acknowledgements - runs in main thread, also while the page is hidden"""
+        if not self.received_configs:
+            if self.pending_ack is not None and time.perf_counter() - self.pending_ack[1] > ACK_TIMEOUT_S:
+                self.send_status_var.set(f"No confirmation from the ROV after {ACK_TIMEOUT_S:.0f} s")
+                self.pending_ack = None
+                self.sent_patch_paths = None
+            return
+        while self.received_configs:
+            self._process_config(*self.received_configs.popleft())
+
+    def refresh_view(self):
+        """Bring the widgets in line with the model - runs in main thread while visible"""
+        if self.view_stale and self.model is not None:
+            self.view_stale = False
+            self._reconcile_widgets(self.model)
+
+    def _process_config(self, config, arrival):
+        incoming = ConfigModel.from_nested(config)
+        patch_paths, self.sent_patch_paths = self.sent_patch_paths, None
+        if self.model is not None and patch_paths and all(path in patch_paths for path in incoming.values):
+            # The ROV echoing the patch just sent: merge it into the last full config.
+            # Any other document is a full config, even one with fewer sections than before.
+            # Unsent edits live in the entries, so the model can go back to the confirmed values
+            self.confirmed_values.update(incoming.values)
+            for path, value in self.confirmed_values.items():
+                self.model.set(path, value)
+        else:
+            self.model = incoming
+            self.confirmed_values = dict(self.model.values)
+        self.view_stale = True
+        self._record_snapshot("received")
+        if self.pending_ack is not None:
+            self._check_ack(arrival)
+
+    def _check_ack(self, arrival):
+        """Compare the ROV's config with what we sent"""
+        expected, sent_at = self.pending_ack
+        self.pending_ack = None
+        rejected = [path for path, value in expected.items() if self.confirmed_values.get(path) != value]
+        rtt_ms = (arrival - sent_at) * 1000
+        if rejected:
+            self.send_status_var.set(f"ROV kept different values for: {', '.join('.'.join(path) for path in rejected)}")
+        else:
+            self.send_status_var.set(f"Applied {len(expected)} change(s), round trip {rtt_ms:.0f} ms")
+        print(f"Configuration acknowledged after {rtt_ms:.0f} ms ({len(rejected)} rejected of {len(expected)})")
 
     def load_mat_file(self):
-        """Loads data from a .mat file, flattens matrices, and updates corresponding keys in current_config."""
+        """Import the variables of a .mat file that match parameters, reading the file on a worker thread."""
 
-        if not self.current_config:
+        if self.model is None:
             messagebox.showwarning("No Configuration", "Load a configuration first before loading .mat data.")
             return
 
@@ -166,126 +315,190 @@ class UpdateConfigurationPage(tk.Frame):
         if not file_path:
             return # User cancelled
 
+        # Only variables named like a parameter (by leaf name or SECTION__key) are read from the file
+        wanted = set(self.model.by_name) | set(self.model.by_mat_name)
+        self.load_mat_button.config(state=tk.DISABLED)
+        self.mat_progress["value"] = 0
+        self.mat_thread = threading.Thread(target=self.mat_import_worker, args=(file_path, wanted), daemon=True)
+        self.mat_thread.start()
+        self.mat_task = self.controller.scheduler.add_task(
+            f"{self.session.name} mat import", self.poll_mat_import, 100, priority=PRIORITY_LOW, budget_ms=20)
+
+    def mat_import_worker(self, file_path, wanted):
+        """Runs in the import thread; reports progress and the result through mat_queue"""
         try:
-            mat_data = scipy.io.loadmat(file_path)
-            updated_keys = []
-            not_found_keys = []
-
-            for mat_key, mat_value in mat_data.items():
-                # Skip MATLAB's internal variables
-                if mat_key.startswith('__'):
-                    continue
-
-                # Process the value: flatten numpy arrays, convert numpy scalars
-                value_to_update = None
-                if isinstance(mat_value, np.ndarray):
-                    # Flatten multi-dimensional arrays into a 1D list
-                    value_to_update = mat_value.flatten().tolist()
-                    #print(f"Flattened matrix for key '{mat_key}'.")
-                elif isinstance(mat_value, np.generic):
-                     # Convert numpy scalar types (like np.float64) to Python native types
-                     value_to_update = mat_value.item()
-                     #print(f"Converted numpy scalar for key '{mat_key}'.")
-                else:
-                    # Use other types as is (e.g., strings, standard Python numbers if loadmat returns them)
-                    value_to_update = mat_value
-
-                # Attempt to find and update the key in the current config
-                if self._find_and_update_key(self.current_config, mat_key, value_to_update):
-                     updated_keys.append(mat_key)
-                else:
-                     not_found_keys.append(mat_key)
-
-
-            # --- Feedback Messages ---
-            if updated_keys:
-                 msg = f"Successfully processed and updated data for keys: {', '.join(updated_keys)}.\n"
-                 if not_found_keys:
-                     msg += f"Keys not found in the current configuration: {', '.join(not_found_keys)}."
-                 messagebox.showinfo("MAT File Loaded", msg)
-            elif not_found_keys:
-                 messagebox.showwarning("MAT File Processed", f"No matching keys found in the current configuration for variables in the .mat file.\nChecked for: {', '.join(not_found_keys)}")
-            else:
-                 messagebox.showinfo("MAT File Loaded", "No variables found in the .mat file (excluding internal ones) to process.")
-
-
+            result = read_mat_variables(file_path, wanted,
+                                        progress=lambda fraction, message: self.mat_queue.put((fraction, message, None)))
+            self.mat_queue.put((1.0, "", result))
         except Exception as e:
-            messagebox.showerror("Error Loading .mat File", f"Failed to load or process .mat file: {e}")
+            self.mat_queue.put((None, f"Failed to load or process .mat file: {e}", None))
 
-
-    def _convert_numpy_to_list(self, data):
-        """Recursively converts numpy arrays within a nested structure to Python lists."""
-        if isinstance(data, dict):
-            return {k: self._convert_numpy_to_list(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._convert_numpy_to_list(item) for item in data]
-        elif isinstance(data, np.ndarray):
-            return data.tolist()
+    def poll_mat_import(self):
+        """Show import progress and apply the result - runs in main thread until the import thread finishes"""
+        try:
+            while True:
+                fraction, message, result = self.mat_queue.get_nowait()
+                if fraction is None:
+                    messagebox.showerror("Error Loading .mat File", message)
+                    continue
+                self.mat_progress["value"] = fraction
+                self.send_status_var.set(message)
+                if result is not None:
+                    self.apply_mat_variables(*result)
+        except queue.Empty:
+            pass
+
+        if not self.mat_thread.is_alive() and self.mat_queue.empty():
+            self.controller.scheduler.remove_task(self.mat_task)
+            self.mat_task = None
+            self.load_mat_button.config(state=tk.NORMAL)
+
+    def apply_mat_variables(self, variables, unmatched, unreadable):
+        """Apply variables read by the import thread to the matching parameters in one pass."""
+        self.refresh_view()
+        updated_paths, not_found_keys, ambiguous_keys, rejected = self.model.update_from_mat(variables)
+        not_found_keys = unmatched + not_found_keys
+        unreadable = unreadable + [f"{name} ({reason})" for name, reason in rejected.items()]
+
+        # Show imported scalars in their entries; they stay marked until the ROV confirms them
+        for path in updated_paths:
+            if self.model.kinds[path] == "array":
+                self.array_edits[path] = self.model.get(path)
+                if path in self.param_widgets:
+                    self._update_array_button(path)
+                continue
+            entry = self.entry_widgets.get(path)
+            if entry is not None:
+                entry.delete(0, tk.END)
+                entry.insert(0, str(self.model.get(path)))
+                self._update_dirty_marker(path)
+
+        # --- Feedback Messages ---
+        if updated_paths:
+             msg = f"Successfully processed and updated {len(updated_paths)} parameters: {', '.join('.'.join(path) for path in updated_paths)}.\n"
+             if not_found_keys:
+                 msg += f"Keys not found in the current configuration: {', '.join(not_found_keys)}.\n"
+             if ambiguous_keys:
+                 msg += f"Names used in several sections (name them SECTION__key): {', '.join(ambiguous_keys)}.\n"
+             if unreadable:
+                 msg += f"Not imported (structs, cells, complex values or the wrong kind of value): {', '.join(unreadable)}."
+             messagebox.showinfo("MAT File Loaded", msg)
+        elif not_found_keys or ambiguous_keys or unreadable:
+             messagebox.showwarning("MAT File Processed", f"No matching keys found in the current configuration for variables in the .mat file.\nChecked for: {', '.join(not_found_keys + ambiguous_keys + unreadable)}")
         else:
-            return data
-
-    def send_updated_configuration(self):
-        # Start with the current config, potentially containing loaded .mat data (numpy arrays)
-        updated_config = copy.deepcopy(self.current_config)
+             messagebox.showinfo("MAT File Loaded", "No variables found in the .mat file (excluding internal ones) to process.")
 
-        # Merge changes from GUI entries into the updated_config
-        for param_key, entry in self.entry_widgets.items():
-            value_str = entry.get()
-            path = self.key_paths.get(str(param_key))
-
-            if not path:
-                print(f"Warning: Path not found for GUI parameter '{param_key}' during send.")
-                continue
+    def _record_snapshot(self, source):
+        """Store the model's full configuration in the history; failures only cost the history"""
+        try:
+            added = self.history.add(self.model.to_nested(), self.session.name, source)
+        except OSError as e:
+            print(f"Could not store configuration snapshot: {e}")
+            return
+        if added and self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.add_latest()
 
-            # Convert value from GUI string to appropriate type
-            try:
-                if value_str.lower() in ['true', 'false']:
-                    converted_value = value_str.lower() == 'true'
-                elif '.' in value_str:
-                    converted_value = float(value_str)
-                else:
-                    converted_value = int(value_str)
-            except ValueError:
-                converted_value = value_str # Keep as string if conversion fails
-
-            # Navigate the nested structure and update the value
-            current_level = updated_config
+    def open_history(self):
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.lift()
+            return
+        self.history_window = ConfigHistoryWindow(self, self.history, self.session.name, self.rollback_to)
+
+    def edited_values(self):
+        """Flat {path: value} of the configuration as edited (entries and array edits), without changing the model;
+        raises ValueError listing the entries that don't parse"""
+        self.refresh_view()  # The model may have moved on since the last frame
+        values = dict(self.model.values)
+        errors = []
+        for path, entry in self.entry_widgets.items():
             try:
-                for key in path[:-1]:
-                    key_str = str(key)
-                    # Ensure intermediate dictionaries exist if somehow missing (shouldn't happen with deepcopy)
-                    if key_str not in current_level or not isinstance(current_level[key_str], dict):
-                         print(f"Warning: Structure inconsistency for path {path}. Creating intermediate dict.")
-                         current_level[key_str] = {}
-                    current_level = current_level[key_str]
-
-                final_key = str(path[-1])
-                current_level[final_key] = converted_value
-            except KeyError as e:
-                 messagebox.showerror("Configuration Error", f"Error updating structure for key '{param_key}' at path '{path}'. Missing key: {e}")
-                 return
-            except TypeError as e:
-                 messagebox.showerror("Configuration Error", f"Structure conflict for key '{param_key}' at path '{path}'. Expected a dictionary level. Error: {e}")
-                 return
-
+                values[path] = parse_text(self.model.kinds[path], entry.get())
+            except ValueError as e:
+                errors.append(f"{'.'.join(path)}: {e}")
+        if errors:
+            raise ValueError("; ".join(errors))
+        values.update(self.array_edits)
+        return values
+
+    def sandbox_configs(self):
+        """(running, edited) configuration values for the sandbox"""
+        if self.model is None:
+            raise ValueError("load a configuration first")
+        return dict(self.confirmed_values), self.edited_values()
+
+    def open_sandbox(self):
+        if self.model is None:
+            messagebox.showwarning("No Configuration", "Load a configuration first.")
+            return
+        ControllerSandboxWindow(self, self.controller.scheduler, self.session.name, self.sandbox_configs)
 
-        # Update the internal state to reflect the merged configuration
-        self.current_config = updated_config # Keep numpy arrays here if they exist
+    def rollback_to(self, config):
+        """Put a snapshot's values into the editors and send what differs from the ROV's config"""
+        if self.model is None:
+            messagebox.showwarning("No Configuration", "Load a configuration first.")
+            return
+        self.refresh_view()
+        target = ConfigModel.from_nested(config)
+        skipped = []
+        for path, value in target.values.items():
+            if path not in self.model:
+                skipped.append('.'.join(path))
+            elif self.model.kinds[path] == "array":
+                self.array_edits[path] = value
+                self._update_array_button(path)
+            elif path in self.entry_widgets:
+                entry = self.entry_widgets[path]
+                entry.delete(0, tk.END)
+                entry.insert(0, str(value))
+                self._update_dirty_marker(path)
+        if skipped:
+            print(f"Rollback skipped parameters the current configuration doesn't have: {', '.join(skipped)}")
+        self.send_updated_configuration(source="rollback")
+
+    def send_updated_configuration(self, full=False, source="sent"):
+        """Send what changed since the ROV's last reported config as a partial document,
+        or the whole document with full=True; source labels the snapshot in the history"""
+        if self.model is None:
+            messagebox.showwarning("No Configuration", "Load a configuration first.")
+            return
+        self.refresh_view()  # Entries must match the model before they're read back
 
-        # Prepare a version for sending (convert numpy arrays to lists)
-        config_to_send = self._convert_numpy_to_list(copy.deepcopy(self.current_config))
+        # Merge changes from GUI entries into the model, converted to each parameter's type
+        errors = []
+        for path, entry in self.entry_widgets.items():
+            try:
+                self.model.set_text(path, entry.get())
+            except ValueError as e:
+                errors.append(f"{'.'.join(path)}: {e}")
+        if errors:
+            messagebox.showerror("Configuration Error", "Invalid values, nothing was sent:\n" + "\n".join(errors))
+            return
+        for path, value in self.array_edits.items():
+            self.model.set(path, value)
 
-        print(f"Sending updated configuration: {config_to_send}")
-        mqtt_send_message(MQTT_TOPIC_CONFIG, config_to_send)
+        changed = self.model.changed_paths(self.confirmed_values)
+        if not changed and not full:
+            self.send_status_var.set("No changes to send")
+            return
+        config_to_send = self.model.to_nested() if full else self.model.to_patch(changed)
+        self.pending_ack = ({path: self.model.get(path) for path in changed}, time.perf_counter())
+        self.sent_payload = config_to_send
+        self.sent_patch_paths = None if full else set(changed)
+        self.send_status_var.set(f"Sent {'full configuration' if full else f'{len(changed)} change(s)'}, waiting for the ROV...")
+        print(f"Sending {'full' if full else 'partial'} configuration: {config_to_send}")
+        self.session.send_message(self.session.topic_config, config_to_send)
+        # Edited arrays are now in the model; their buttons stay marked until the ROV confirms them
+        self.array_edits.clear()
+        self._record_snapshot(source)
 
     def request_configuration(self):
         request_message = {"REQUEST_CONFIG": 0}
         print(f"Requesting configuration: {request_message}")
-        mqtt_send_message(MQTT_TOPIC_COMMANDS, request_message)
+        self.session.send_message(self.session.topic_commands, request_message)
 
     def save_configuration_to_file(self):
-        """Saves the current configuration (self.current_config) to a JSON file, converting numpy arrays."""
-        if not self.current_config:
+        """Saves the current configuration model to a JSON file."""
+        if self.model is None:
             messagebox.showwarning("No Configuration", "No configuration loaded to save.")
             return
 
@@ -300,8 +513,7 @@ class UpdateConfigurationPage(tk.Frame):
             return
 
         try:
-            # Create a deep copy and convert numpy arrays to lists for JSON compatibility
-            config_to_save = self._convert_numpy_to_list(copy.deepcopy(self.current_config))
+            config_to_save = self.model.to_nested()
 
             with open(file_path, 'w') as f:
                 json.dump(config_to_save, f, indent=4)
@@ -0,0 +1,197 @@
+# websocket_bridge.py
+# Read-only fan-out of status/ and log/ to local WebSocket viewers over a single
+# upstream MQTT subscription, so extra viewers add no load on the tether or the ROV.
+#
+#   python websocket_bridge.py --port 8765            # bridge the first vehicle
+#   python websocket_bridge.py --synthetic 100        # fake 100 Hz status/, for load tests
+#
+# Each client receives JSON text frames {"topic", "time", "message"}.
+import argparse
+import asyncio
+import collections
+import json
+import math
+import socket
+import time
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from mqtt_handler import create_sessions, find_session, load_vehicles
+from status_schema import STATUS_FIELDS
+
+LOG_QUEUE_SIZE = 200  # log/ lines kept per client; the oldest are dropped for slow clients
+STATS_INTERVAL_S = 10
+# Bytes buffered per viewer socket before send() waits; small so conflation, not buffering, absorbs slow viewers
+WRITE_LIMIT = 1024
+SOCKET_SEND_BUFFER = 4096
+CONNECT_RETRY_S = (1, 2, 5, 10, 30)  # Waits between attempts while the broker is unreachable; the last repeats
+
+
+class ClientQueue:
+    """Outgoing frames for one viewer.
+
+    status/ is conflated: only the newest frame is kept, so a slow viewer skips
+    samples instead of falling behind. log/ lines go through a bounded deque.
+    """
+    def __init__(self, log_size=LOG_QUEUE_SIZE):
+        self.status = None
+        self.log = collections.deque(maxlen=log_size)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def put_status(self, frame):
+        if self.status is not None:
+            self.dropped += 1
+        self.status = frame
+        self.ready.set()
+
+    def put_log(self, frame):
+        if len(self.log) == self.log.maxlen:
+            self.dropped += 1
+        self.log.append(frame)
+        self.ready.set()
+
+    async def get_batch(self):
+        """Wait for frames and take everything pending, log lines first"""
+        await self.ready.wait()
+        self.ready.clear()
+        batch = list(self.log)
+        self.log.clear()
+        if self.status is not None:
+            batch.append(self.status)
+            self.status = None
+        return batch
+
+
+class TelemetryBridge:
+    """Holds the client queues; frames are encoded once and shared by every client"""
+    def __init__(self, loop, topic_status, topic_log):
+        self.loop = loop
+        self.topic_status = topic_status
+        self.topic_log = topic_log
+        self.clients = set()
+        self.received = 0
+
+    def on_mqtt_message(self, message, topic):
+        """Runs in the MQTT thread: encode, then hand over to the event loop"""
+        if topic != self.topic_status and topic != self.topic_log:
+            return
+        frame = json.dumps({"topic": topic, "time": time.time(), "message": message})
+        self.loop.call_soon_threadsafe(self.publish, topic, frame)
+
+    def publish(self, topic, frame):
+        self.received += 1
+        if topic == self.topic_status:
+            for client in self.clients:
+                client.put_status(frame)
+        else:
+            for client in self.clients:
+                client.put_log(frame)
+
+    async def handle_client(self, websocket):
+        client = ClientQueue()
+        sock = websocket.transport.get_extra_info("socket")
+        if sock is not None:
+            # Keep the kernel from queueing seconds of frames for a viewer that reads slowly
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SEND_BUFFER)
+        self.clients.add(client)
+        print(f"Viewer connected from {websocket.remote_address}, {len(self.clients)} connected")
+        sender = asyncio.create_task(self.send_frames(websocket, client))
+        try:
+            async for _ in websocket:
+                pass  # Read-only bridge: anything the viewer sends is ignored
+        except ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            print(f"Viewer {websocket.remote_address} left after {client.sent} frames "
+                  f"({client.dropped} dropped), {len(self.clients)} connected")
+
+    async def send_frames(self, websocket, client):
+        try:
+            while True:
+                for frame in await client.get_batch():
+                    # Waits only while this viewer's socket buffer is full; other viewers keep going
+                    await websocket.send(frame)
+                    client.sent += 1
+        except ConnectionClosed:
+            pass
+
+    async def print_stats(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL_S)
+            dropped = sum(client.dropped for client in self.clients)
+            print(f"Bridge: {self.received} messages in, {len(self.clients)} viewers, {dropped} frames dropped")
+
+
+async def synthetic_status(bridge, rate):
+    """Feed fake status/ messages at rate Hz (and a log/ line per second) without a broker"""
+    period = 1.0 / rate
+    start = time.time()
+    next_time = time.perf_counter()
+    count = 0
+    while True:
+        t = time.time() - start
+        # Same shape and size as a real status/ message: every schema field, values drifting with t
+        message = {}
+        for i, field in enumerate(STATUS_FIELDS):
+            value = round(math.sin(0.5 * t + i), 4) if field.numeric else "ENABLED"
+            if len(field.path) == 2:
+                message.setdefault(field.path[0], {})[field.path[1]] = value
+            else:
+                message[field.path[0]] = value
+        message["timestamp"] = time.time()
+        bridge.publish(bridge.topic_status, json.dumps({"topic": bridge.topic_status, "time": time.time(), "message": message}))
+        count += 1
+        if count % max(1, int(rate)) == 0:
+            bridge.publish(bridge.topic_log, json.dumps({"topic": bridge.topic_log, "time": time.time(),
+                                                         "message": f"synthetic sample {count}"}))
+        next_time += period
+        await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+
+async def connect_with_retry(session):
+    """Connect off the event loop, retrying with backoff until the broker answers; once connected,
+    paho's network loop reconnects by itself"""
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while await loop.run_in_executor(None, session.connect) < 0:
+        delay = CONNECT_RETRY_S[min(attempt, len(CONNECT_RETRY_S) - 1)]
+        print(f"Broker of {session.name} unreachable, retrying in {delay} s")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def run(host, port, session, synthetic_rate=0):
+    loop = asyncio.get_running_loop()
+    bridge = TelemetryBridge(loop, session.topic_status, session.topic_log)
+
+    if synthetic_rate > 0:
+        feed = synthetic_status(bridge, synthetic_rate)
+    else:
+        session.register_callback(bridge.on_mqtt_message)
+        feed = connect_with_retry(session)  # The session's own thread delivers messages afterwards
+
+    async with serve(bridge.handle_client, host, port, max_size=2 ** 16, max_queue=4,
+                     write_limit=WRITE_LIMIT) as server:
+        print(f"Bridging {session.name} on ws://{host}:{port}")
+        # gather holds the background tasks and raises the first exception any of them hits
+        await asyncio.gather(server.serve_forever(), feed, bridge.print_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fan status/ and log/ out to WebSocket viewers")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 for the whole LAN)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--vehicle", help="Vehicle name from vehicles.json (default: the first)")
+    parser.add_argument("--synthetic", type=float, default=0, help="Serve fake status/ at this rate instead of MQTT")
+    args = parser.parse_args()
+    try:
+        session = find_session(create_sessions(load_vehicles()), args.vehicle)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(run(args.host, args.port, session, args.synthetic))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,119 @@
+# websocket_load_test.py
+# Synthetic viewers for websocket_bridge.py: checks that slow viewers only lose
+# their own frames while fast viewers keep the full rate and low latency.
+# A slow viewer's latency includes what its own socket and client library read
+# ahead before backpressure reached the bridge; the bridge itself never queues
+# more than one status/ frame per viewer.
+#
+#   python websocket_load_test.py --clients 50 --slow 10 --rate 100 --duration 20
+#
+# Without --url a bridge is started with --synthetic on a local port. Exits with 1
+# when a criterion fails (--min-rate-fraction, --max-p95-ms), for use as a regression check.
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import os
+import time
+from websockets.asyncio.client import connect
+
+
+class ViewerStats:
+    def __init__(self, slow):
+        self.slow = slow
+        self.status = 0
+        self.log = 0
+        self.latencies = []
+
+
+async def viewer(url, stats, duration, slow_delay):
+    deadline = time.time() + duration
+    async with connect(url, max_queue=4) as websocket:
+        while time.time() < deadline:
+            try:
+                frame = await asyncio.wait_for(websocket.recv(), timeout=deadline - time.time())
+            except asyncio.TimeoutError:
+                break
+            data = json.loads(frame)
+            if data["topic"].endswith("status/"):
+                stats.status += 1
+                stats.latencies.append(time.time() - data["time"])
+            else:
+                stats.log += 1
+            if stats.slow:
+                await asyncio.sleep(slow_delay)  # Simulates a viewer that can't keep up
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(group, viewers, duration):
+    if not viewers:
+        return
+    rates = [stats.status / duration for stats in viewers]
+    latencies = [latency for stats in viewers for latency in stats.latencies]
+    print(f"{group:>5} viewers: {len(viewers):4d}  status/ rate min {min(rates):7.1f} Hz  mean {sum(rates) / len(rates):7.1f} Hz  "
+          f"latency p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  "
+          f"log/ lines {sum(stats.log for stats in viewers)}")
+
+
+def check(fast, slow, args):
+    """Failed criteria: fast viewers keep the rate and a low latency, slow viewers still get frames"""
+    failures = []
+    min_rate = args.rate * args.min_rate_fraction
+    for i, stats in enumerate(fast):
+        rate = stats.status / args.duration
+        if rate < min_rate:
+            failures.append(f"fast viewer {i}: {rate:.1f} Hz, expected at least {min_rate:.1f} Hz")
+    p95 = percentile([latency for stats in fast for latency in stats.latencies], 0.95) * 1000
+    if not p95 <= args.max_p95_ms:  # Also fails when nothing arrived (nan)
+        failures.append(f"fast viewers: p95 latency {p95:.1f} ms, expected at most {args.max_p95_ms:.1f} ms")
+    starved = sum(1 for stats in slow if stats.status == 0)
+    if starved:
+        failures.append(f"{starved} slow viewers received no status/ frames")
+    return failures
+
+
+async def main(args):
+    url = args.url or f"ws://127.0.0.1:{args.port}"
+    bridge = None
+    if args.url is None:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "websocket_bridge.py")
+        bridge = subprocess.Popen([sys.executable, script, "--port", str(args.port), "--synthetic", str(args.rate)])
+        await asyncio.sleep(1.0)  # Let the bridge start listening
+    try:
+        viewers = [ViewerStats(slow=i < args.slow) for i in range(args.clients)]
+        await asyncio.gather(*(viewer(url, stats, args.duration, args.slow_delay) for stats in viewers))
+    finally:
+        if bridge is not None:
+            bridge.terminate()
+            bridge.wait()
+
+    print(f"{args.clients} viewers for {args.duration} s at {args.rate} Hz")
+    report("fast", [stats for stats in viewers if not stats.slow], args.duration)
+    report("slow", [stats for stats in viewers if stats.slow], args.duration)
+    failures = check([stats for stats in viewers if not stats.slow], [stats for stats in viewers if stats.slow], args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("FAILED" if failures else "PASSED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for websocket_bridge.py")
+    parser.add_argument("--url", help="Bridge to test (default: start a synthetic bridge)")
+    parser.add_argument("--port", type=int, default=8766, help="Port of the bridge started by the test")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=10, help="How many of the clients are slow")
+    parser.add_argument("--slow-delay", type=float, default=0.1, help="Seconds a slow client spends per frame")
+    parser.add_argument("--rate", type=float, default=100, help="status/ rate of the synthetic bridge")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--min-rate-fraction", type=float, default=0.9,
+                        help="Every fast viewer must receive at least this fraction of --rate")
+    parser.add_argument("--max-p95-ms", type=float, default=50, help="Largest allowed p95 status/ latency of fast viewers")
+    sys.exit(asyncio.run(main(parser.parse_args())))